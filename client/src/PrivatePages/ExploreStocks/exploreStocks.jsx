@@ -62,7 +62,8 @@ function ExploreStocks() {
       if (response.ok) {
         const data = await response.json()
         console.log("Received stocks data:", data)
-        return Array.isArray(data) ? data : []
+        // Response is { stocks: [...], prices_as_of: <ISO timestamp> }
+        return Array.isArray(data.stocks) ? data.stocks : []
       } else {
         console.error("Error fetching stock data:", response.status, response.statusText)
         const errorData = await response.json().catch(() => ({}))
@@ -1,6 +1,9 @@
 from decimal import Decimal
+from django.db import transaction
 from rest_framework.response import Response
-from catalog.models import League, LeagueParticipant, Stock, UserLeagueStock
+from catalog.models import League, LeagueParticipant, Stock, Trade
+from catalog.trade_execution import MAX_QUANTITY, TradeError, execute_buy, execute_sell, lock_prices, parse_quantity
+from api.apiUtils.leagueResolver import resolve_participant
 from api.apiUtils.utils import getOwnedStocks
 
 
@@ -11,53 +14,28 @@ def buy_stock(league_id, user, ticker, shares):
     """
     try:
         # Get league and participant
-        league = League.objects.get(league_id=league_id)
-        participant = LeagueParticipant.objects.get(league=league, user=user)
-        
+        participant = resolve_participant(league_id, user)
+
         # Get stock
         stock = Stock.objects.get(ticker=ticker)
-        
+
         # Validate shares
         shares_decimal = Decimal(str(shares))
         if shares_decimal <= 0:
             return False, {'error': 'Shares must be greater than 0'}, 400
-        
-        # Calculate cost
-        cost = stock.current_price * shares_decimal
-        
-        # Check if user has enough balance
-        if participant.current_balance < cost:
-            return False, {'error': 'Insufficient balance'}, 400
-        
-        # Get or create UserLeagueStock entry
-        user_stock, created = UserLeagueStock.objects.get_or_create(
-            league_participant=participant,
-            stock=stock,
-            defaults={'shares': Decimal('0.00'), 'avg_price_per_share': stock.current_price}
-        )
-        
-        # Calculate new average price per share (weighted average)
-        if created:
-            user_stock.avg_price_per_share = stock.current_price
-        else:
-            total_cost = (user_stock.avg_price_per_share * user_stock.shares) + cost
-            total_shares = user_stock.shares + shares_decimal
-            user_stock.avg_price_per_share = total_cost / total_shares
-        
-        # Update shares
-        user_stock.shares += shares_decimal
-        user_stock.save()
-        
-        participant.current_balance -= cost
-        participant.save()
-        
+
+        trade, new_balance, total_shares = execute_buy(participant, stock, shares_decimal)
+        participant.current_balance = new_balance
+
         return True, {
             'message': f'Successfully bought {shares} shares of {ticker}',
             'new_balance': float(participant.current_balance),
-            'total_shares': float(user_stock.shares),
-            'cost': float(cost)
+            'total_shares': float(total_shares),
+            'cost': float(trade.amount)
         }, 200
-        
+
+    except TradeError as e:
+        return False, {'error': str(e)}, e.status
     except League.DoesNotExist:
         return False, {'error': 'League not found'}, 404
     except LeagueParticipant.DoesNotExist:
@@ -75,52 +53,28 @@ def sell_stock(league_id, user, ticker, shares):
     """
     try:
         # Get league and participant
-        league = League.objects.get(league_id=league_id)
-        participant = LeagueParticipant.objects.get(league=league, user=user)
-        
+        participant = resolve_participant(league_id, user)
+
         # Get stock
         stock = Stock.objects.get(ticker=ticker)
-        
+
         # Validate shares
         shares_decimal = Decimal(str(shares))
         if shares_decimal <= 0:
             return False, {'error': 'Shares must be greater than 0'}, 400
-        
-        # Get UserLeagueStock entry
-        try:
-            user_stock = UserLeagueStock.objects.get(
-                league_participant=participant,
-                stock=stock
-            )
-        except UserLeagueStock.DoesNotExist:
-            return False, {'error': 'You do not own this stock'}, 404
-        
-        # Check if user has enough shares
-        if user_stock.shares < shares_decimal:
-            return False, {'error': f'Insufficient shares. You own {user_stock.shares} shares'}, 400
-        
-        # Calculate revenue
-        revenue = stock.current_price * shares_decimal
-        
-        # Update shares and balance
-        user_stock.shares -= shares_decimal
-        remaining_shares = user_stock.shares
-        if user_stock.shares <= 0:
-            user_stock.delete()
-            remaining_shares = Decimal('0.00')
-        else:
-            user_stock.save()
-        
-        participant.current_balance += revenue
-        participant.save()
-        
+
+        trade, new_balance, remaining_shares = execute_sell(participant, stock, shares_decimal)
+        participant.current_balance = new_balance
+
         return True, {
             'message': f'Successfully sold {shares} shares of {ticker}',
             'new_balance': float(participant.current_balance),
             'remaining_shares': float(remaining_shares),
-            'revenue': float(revenue)
+            'revenue': float(trade.amount)
         }, 200
-        
+
+    except TradeError as e:
+        return False, {'error': str(e)}, e.status
     except League.DoesNotExist:
         return False, {'error': 'League not found'}, 404
     except LeagueParticipant.DoesNotExist:
@@ -130,3 +84,110 @@ def sell_stock(league_id, user, ticker, shares):
     except Exception as e:
         return False, {'error': f'Failed to sell stock: {str(e)}'}, 500
 
+
+MAX_BATCH_ORDERS = 50
+
+
+def _batch_order_error(order):
+    """Returns an error message for a malformed batch order, or None."""
+    if not isinstance(order, dict):
+        return 'Each order must be an object'
+    if order.get('side') not in (Trade.BUY, Trade.SELL):
+        return 'side must be buy or sell'
+    if not order.get('ticker'):
+        return 'ticker is required'
+    if parse_quantity(order.get('shares')) is None:
+        return f'shares must be a number between 0.01 and {MAX_QUANTITY}'
+    return None
+
+
+def batch_trade(league_id, user, orders, all_or_nothing=True):
+    """
+    Utility function to execute several buys and sells for one league at once.
+    The batch's stock rows are locked together and every order is priced from that one read of
+    the stored prices, so a refresh can't reprice part of the batch. Every order is executed in
+    a single transaction: sells first (so they can fund the buys),
+    then buys, each group in request order. With all_or_nothing a single failed order rolls the
+    whole batch back (400); otherwise the other orders still go through and a batch where some
+    orders failed is answered with 207 Multi-Status. Results are returned in request order, each
+    with its own success flag and status, and `failed` counts the orders that did not execute.
+    Returns a tuple: (success: bool, response_data: dict, status_code: int)
+    """
+    if not isinstance(orders, list) or not orders:
+        return False, {'error': 'orders must be a non-empty list'}, 400
+    if len(orders) > MAX_BATCH_ORDERS:
+        return False, {'error': f'At most {MAX_BATCH_ORDERS} orders per batch'}, 400
+
+    try:
+        participant = resolve_participant(league_id, user)
+
+        tickers = {
+            order.get('ticker') for order in orders if isinstance(order, dict) and isinstance(order.get('ticker'), str)
+        }
+
+        results = [None] * len(orders)
+        with transaction.atomic():
+            # One price snapshot for the whole batch, held until it commits
+            prices = lock_prices(tickers)
+            execution_order = sorted(
+                range(len(orders)),
+                key=lambda i: 0 if isinstance(orders[i], dict) and orders[i].get('side') == Trade.SELL else 1,
+            )
+            for i in execution_order:
+                order = orders[i]
+                error = _batch_order_error(order)
+                if error:
+                    results[i] = {'success': False, 'status': 400, 'error': error}
+                    continue
+                price = prices.get(order['ticker']) if isinstance(order['ticker'], str) else None
+                if price is None:
+                    results[i] = {'success': False, 'status': 404, 'error': 'Stock not found'}
+                    continue
+
+                shares = parse_quantity(order['shares'])
+                execute = execute_buy if order['side'] == Trade.BUY else execute_sell
+                try:
+                    trade, _, shares_after = execute(participant, Stock(ticker=order['ticker']), shares, price=price)
+                except TradeError as e:
+                    results[i] = {'success': False, 'status': e.status, 'error': str(e)}
+                    continue
+                results[i] = {
+                    'success': True,
+                    'status': 200,
+                    'price': float(trade.price),
+                    'amount': float(trade.amount),
+                    'total_shares': float(shares_after),
+                }
+
+            failed = any(not result['success'] for result in results)
+            if failed and all_or_nothing:
+                transaction.set_rollback(True)
+                for result in results:
+                    if result['success']:
+                        result.update(success=False, status=409, error='Rolled back: another order in the batch failed')
+                        for key in ('price', 'amount', 'total_shares'):
+                            del result[key]
+
+        for order, result in zip(orders, results):
+            if isinstance(order, dict):
+                result.update(ticker=order.get('ticker'), side=order.get('side'), shares=order.get('shares'))
+
+        new_balance = LeagueParticipant.objects.values_list('current_balance', flat=True).get(pk=participant.pk)
+        executed = sum(1 for result in results if result['success'])
+        if not failed:
+            status_code = 200
+        else:
+            status_code = 400 if all_or_nothing else 207
+        return not failed, {
+            'results': results,
+            'executed': executed,
+            'failed': len(results) - executed,
+            'new_balance': float(new_balance),
+        }, status_code
+
+    except League.DoesNotExist:
+        return False, {'error': 'League not found'}, 404
+    except LeagueParticipant.DoesNotExist:
+        return False, {'error': 'You are not a participant in this league'}, 404
+    except Exception as e:
+        return False, {'error': f'Failed to execute batch: {str(e)}'}, 500
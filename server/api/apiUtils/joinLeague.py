@@ -2,8 +2,10 @@ from decimal import Decimal
 import uuid
 from datetime import date, timedelta
 from rest_framework.response import Response
+from catalog.trade_ledger import STARTING_BALANCE
 from catalog.models import League, LeagueParticipant
 from api.serializer import LeaguesSerializer
+from api.apiUtils.leagueResolver import resolve_league
 
 
 def join_league(league_id, user):
@@ -24,7 +26,7 @@ def join_league(league_id, user):
     
     # Get the league
     try:
-        league = League.objects.get(league_id=league_id)
+        league = resolve_league(league_id)
     except League.DoesNotExist:
         return False, {'error': 'League not found'}, 404
     
@@ -47,7 +49,7 @@ def join_league(league_id, user):
         participant = LeagueParticipant.objects.create(
             league=league,
             user=user,
-            current_balance=Decimal('10000.00'),
+            current_balance=STARTING_BALANCE,
             leagueAdmin=False
         )
         
@@ -0,0 +1,109 @@
+"""Shared league / participant resolution for the league endpoints.
+
+resolve_participant loads the requesting user's LeagueParticipant together with its league
+(and valuation) in one query. League UUID -> pk and (league, user) -> participant pk are kept
+in Django's cache for LEAGUE_RESOLVER_CACHE_TTL seconds, and within a request every result is
+memoized (LeagueResolverMiddleware), so repeated lookups in one request cost nothing.
+api.signals drops the cached entries when participants join, leave or change (e.g. admin
+flag) and when leagues are deleted.
+
+Lookups raise League.DoesNotExist / LeagueParticipant.DoesNotExist like the ORM calls they
+replace, so callers keep their existing error handling.
+"""
+import contextvars
+
+from django.conf import settings
+from django.core.cache import cache
+
+from catalog.models import League, LeagueParticipant
+
+# Cached in place of a participant pk for users known not to be in a league
+NOT_A_MEMBER = 0
+
+_request_memo = contextvars.ContextVar('league_resolver_memo', default=None)
+
+
+def league_key(league_id):
+    return f'league:pk:{league_id}'
+
+
+def member_key(league_pk, user_id):
+    return f'league:member:{league_pk}:{user_id}'
+
+
+class LeagueResolverMiddleware:
+    """Gives each request its own resolver memo."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _request_memo.set({})
+        try:
+            return self.get_response(request)
+        finally:
+            _request_memo.reset(token)
+
+
+def clear_request_memo():
+    memo = _request_memo.get()
+    if memo is not None:
+        memo.clear()
+
+
+def _participants():
+    return LeagueParticipant.objects.select_related('league', 'valuation')
+
+
+def resolve_league(league_id):
+    """Returns the League with this UUID. Raises League.DoesNotExist."""
+    memo = _request_memo.get()
+    memo_key = ('league', str(league_id))
+    if memo is not None and memo_key in memo:
+        return memo[memo_key]
+
+    league_pk = cache.get(league_key(league_id))
+    if league_pk is not None:
+        league = League.objects.get(pk=league_pk)
+    else:
+        league = League.objects.get(league_id=league_id)
+        cache.set(league_key(league_id), league.pk, settings.LEAGUE_RESOLVER_CACHE_TTL)
+
+    if memo is not None:
+        memo[memo_key] = league
+    return league
+
+
+def resolve_participant(league_id, user):
+    """Returns the user's LeagueParticipant in the league, with league and valuation loaded.
+    Raises League.DoesNotExist if the league doesn't exist and LeagueParticipant.DoesNotExist
+    if the user isn't a participant."""
+    memo = _request_memo.get()
+    memo_key = ('participant', str(league_id), user.pk)
+    if memo is not None and memo_key in memo:
+        return memo[memo_key]
+
+    participant = None
+    league_pk = cache.get(league_key(league_id))
+    if league_pk is not None:
+        participant_pk = cache.get(member_key(league_pk, user.pk))
+        if participant_pk == NOT_A_MEMBER:
+            raise LeagueParticipant.DoesNotExist("You are not a participant in this league")
+        if participant_pk is not None:
+            participant = _participants().filter(pk=participant_pk).first()
+
+    if participant is None:
+        participant = _participants().filter(league__league_id=league_id, user=user).first()
+        if participant is None:
+            league = resolve_league(league_id)
+            cache.set(member_key(league.pk, user.pk), NOT_A_MEMBER, settings.LEAGUE_RESOLVER_CACHE_TTL)
+            raise LeagueParticipant.DoesNotExist("You are not a participant in this league")
+        cache.set_many({
+            league_key(league_id): participant.league_id,
+            member_key(participant.league_id, user.pk): participant.pk,
+        }, settings.LEAGUE_RESOLVER_CACHE_TTL)
+
+    if memo is not None:
+        memo[memo_key] = participant
+        memo[('league', str(league_id))] = participant.league
+    return participant
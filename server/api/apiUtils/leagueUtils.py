@@ -1,65 +1,64 @@
 from decimal import Decimal
-from catalog.models import League, LeagueParticipant, Stock, UserLeagueStock
+from django.db.models import Count, Exists, OuterRef, Subquery
+from catalog.trade_ledger import STARTING_BALANCE
+from catalog.models import League, LeagueParticipant, ParticipantValuation, Stock, UserLeagueStock
 from api.serializer import LeaguesSerializer
 from api.apiUtils.utils import getOwnedStocks, getTotalStockValue
+from catalog.stock_board import get_board_prices
+from catalog.valuations import get_valuation, recompute_valuations
+from api.apiUtils.leagueResolver import resolve_participant
 
 
-def get_user_leagues_data(user):
+def get_user_leagues_data(user, after=None, limit=None):
     """
     Get all leagues for a user, with special handling for superusers.
+    Built from a single query: participant counts and the user's membership/admin flags are
+    annotated onto the leagues, so the query count doesn't grow with the number of leagues.
     
     Args:
         user: User object
+        after: (superusers only) cursor from a previous page's next_cursor
+        limit: (superusers only) page size; all leagues are returned if not given
     
     Returns:
-        dict with is_superuser flag and leagues list
+        dict with is_superuser flag and leagues list (plus next_cursor when paginating)
     """
+    membership = LeagueParticipant.objects.filter(league=OuterRef('pk'), user=user)
+    leagues = League.objects.annotate(
+        num_participants=Count('participants'),
+        is_participant=Exists(membership),
+        is_league_admin=Exists(membership.filter(leagueAdmin=True)),
+    ).order_by('id')
+
+    next_cursor = None
     if user.is_superuser:
-        all_leagues = League.objects.all()
-        leagues = []
-        for league in all_leagues:
-            league_serializer = LeaguesSerializer(league)
-            # Check if superuser is a participant in this league
-            participant = LeagueParticipant.objects.filter(
-                league=league,
-                user=user
-            ).first()
-            
-            if participant:
-                # Superuser is a participant, show like normal user
-                data = {
-                    "league": league_serializer.data,
-                    "leagueAdmin": participant.leagueAdmin,
-                    "isParticipant": True
-                }
-            else:
-                # Superuser is not a participant, show as view-only
-                data = {
-                    "league": league_serializer.data,
-                    "leagueAdmin": False,
-                    "isParticipant": False
-                }
-            leagues.append(data)
-        
-        return {
-            "is_superuser": True,
-            "leagues": leagues
-        }
+        # Superusers see every league; the ones they haven't joined are view-only.
+        # Keyset pagination on the primary key keeps every page a single indexed query.
+        if after is not None:
+            leagues = leagues.filter(id__gt=after)
+        if limit is not None:
+            leagues = list(leagues[:limit + 1])
+            if len(leagues) > limit:
+                leagues = leagues[:limit]
+                next_cursor = leagues[-1].id
     else:
-        current_leagues = LeagueParticipant.objects.filter(user=user).distinct()
-        leagues = []
-        for league_participant in current_leagues:
-            league_serializer = LeaguesSerializer(league_participant.league)
-            data = {
-                "league": league_serializer.data,
-                "leagueAdmin": league_participant.leagueAdmin,
-                "isParticipant": True
+        leagues = leagues.filter(is_participant=True)
+
+    league_data = LeaguesSerializer(leagues, many=True).data
+    data = {
+        "is_superuser": user.is_superuser,
+        "leagues": [
+            {
+                "league": serialized,
+                "leagueAdmin": league.is_league_admin,
+                "isParticipant": league.is_participant,
             }
-            leagues.append(data)
-        return {
-            "is_superuser": False,
-            "leagues": leagues
-        }
+            for league, serialized in zip(leagues, league_data)
+        ],
+    }
+    if user.is_superuser and limit is not None:
+        data["next_cursor"] = next_cursor
+    return data
 
 
 def create_league_for_user(league_data, user):
@@ -79,87 +78,55 @@ def create_league_for_user(league_data, user):
         LeagueParticipant.objects.create(
             league=league,
             user=user,
-            current_balance=Decimal('10000.00'),
+            current_balance=STARTING_BALANCE,
             leagueAdmin=True
         )
         return True, serializer.data, 201
     return False, {'errors': serializer.errors}, 400
 
 
-# Cache for all stocks data (30-minute cooldown)
-_stocks_cache = None
-_stocks_cache_timestamp = None
-CACHE_DURATION = 30 * 60  # 30 minutes in seconds
+def _owned_stocks_payload(participant, holdings, all_stocks_data):
+    """Builds the owned-stocks response from a participant (with its valuation), their holdings
+    (with stocks) and the board prices."""
+    stocks = []
 
-def _get_cached_all_stocks():
-    """Get cached all stocks data if still valid, otherwise None."""
-    global _stocks_cache, _stocks_cache_timestamp
-    import time
-    
-    if _stocks_cache is not None and _stocks_cache_timestamp is not None:
-        age = time.time() - _stocks_cache_timestamp
-        if age < CACHE_DURATION:
-            return _stocks_cache
-        else:
-            # Cache expired
-            _stocks_cache = None
-            _stocks_cache_timestamp = None
-    return None
-
-def _update_all_stocks_cache():
-    """Update all stocks and cache the data."""
-    global _stocks_cache, _stocks_cache_timestamp
-    import time
-    import update_stocks as update_stocks_module
-    from catalog.models import Stock
-    
-    # Always update stocks before caching
-    try:
-        update_stocks_module.update_stocks(force=True)
-    except Exception:
-        pass  # Continue even if update fails
-    
-    # Get all stocks from database
-    stock_queryset = Stock.objects.all()
-    stocks_data = {}
-    
-    for stock in stock_queryset:
+    for stock in holdings:
         try:
-            current = float(stock.current_price) if stock.current_price else 0.0
-            start = float(stock.start_price) if stock.start_price else 0.0
+            ticker = stock.stock.ticker
             
-            # Calculate daily change
-            if start > 0:
-                daily_change = current - start
-                try:
-                    daily_change_percent = (daily_change / start) * 100 if start != 0 else None
-                except Exception:
-                    daily_change_percent = None
-            else:
-                daily_change = None
-                daily_change_percent = None
+            # Get stock data from the board (ensures prices align with explore stocks)
+            stock_data = all_stocks_data.get(ticker, {})
             
-            stocks_data[stock.ticker] = {
-                "ticker": stock.ticker,
-                "name": stock.name,
-                "start_price": start,
-                "current_price": current,
-                "daily_change": daily_change,
-                "daily_change_percent": daily_change_percent,
+            # Merge cached stock data with owned stock details from DB
+            data = {
+                "shares": float(stock.shares),
+                "avg_price_per_share": float(stock.avg_price_per_share),
+                "ticker": ticker,
+                "name": stock_data.get("name", stock.stock.name),
+                "current_price": stock_data.get("current_price", float(stock.stock.current_price)),
+                "start_price": stock_data.get("start_price", float(stock.stock.start_price)),
+                "daily_change": stock_data.get("daily_change"),
+                "daily_change_percent": stock_data.get("daily_change_percent"),
             }
-        except Exception:
+            stocks.append(data)
+        except Exception as e:
+            print(f"Error processing stock {stock.stock.ticker}: {str(e)}")
             continue
     
-    # Cache the data
-    _stocks_cache = stocks_data
-    _stocks_cache_timestamp = time.time()
-    
-    return stocks_data
+    # Totals come from the materialized valuation (kept current by trades and refreshes)
+    valuation = get_valuation(participant)
+    return {
+        "stocks": stocks,
+        "current_balance": float(participant.current_balance),
+        "total_stock_value": float(valuation.holdings_value),
+        "net_worth": float(valuation.net_worth)
+    }
+
 
 def get_owned_stocks_data(league_id, user):
     """
     Get all owned stocks data for a user in a league.
-    Uses cached all stocks data (30-minute cooldown) to ensure prices align with explore stocks.
+    Prices come from the shared stock board snapshot so they align with explore stocks.
     
     Args:
         league_id: UUID of the league
@@ -170,63 +137,14 @@ def get_owned_stocks_data(league_id, user):
     """
     try:
         # Get league and participant first
-        league = League.objects.get(league_id=league_id)
-        participant = LeagueParticipant.objects.get(league=league, user=user)
-        current_balance = float(participant.current_balance)
+        participant = resolve_participant(league_id, user)
         
-        # Get cached all stocks data (or update if cache expired)
-        cached_stocks = _get_cached_all_stocks()
-        if cached_stocks is None:
-            # Cache expired or doesn't exist, update and cache
-            all_stocks_data = _update_all_stocks_cache()
-        else:
-            # Use cached data
-            all_stocks_data = cached_stocks
+        # Same snapshot /api/stocks/ serves (published by the price refresher)
+        all_stocks_data = get_board_prices()
         
         # Get owned stocks from database (always fresh from DB)
-        owned_stocks = getOwnedStocks(league_id, user)
-        stocks = []
-
-        for stock in owned_stocks:
-            try:
-                ticker = stock.stock.ticker
-                
-                # Get stock data from cache (ensures prices align with explore stocks)
-                stock_data = all_stocks_data.get(ticker, {})
-                
-                # Merge cached stock data with owned stock details from DB
-                data = {
-                    "shares": float(stock.shares),
-                    "avg_price_per_share": float(stock.avg_price_per_share),
-                    "ticker": ticker,
-                    "name": stock_data.get("name", stock.stock.name),
-                    "current_price": stock_data.get("current_price", float(stock.stock.current_price)),
-                    "start_price": stock_data.get("start_price", float(stock.stock.start_price)),
-                    "daily_change": stock_data.get("daily_change"),
-                    "daily_change_percent": stock_data.get("daily_change_percent"),
-                }
-                stocks.append(data)
-            except Exception as e:
-                print(f"Error processing stock {stock.stock.ticker}: {str(e)}")
-                continue
-        
-        # Calculate total stock value using cached prices
-        total_stock_value = 0.0
-        for stock in owned_stocks:
-            try:
-                ticker = stock.stock.ticker
-                stock_data = all_stocks_data.get(ticker, {})
-                current_price = stock_data.get("current_price", float(stock.stock.current_price))
-                total_stock_value += current_price * float(stock.shares)
-            except Exception:
-                continue
-        
-        return True, {
-            "stocks": stocks,
-            "current_balance": current_balance,
-            "total_stock_value": total_stock_value,
-            "net_worth": total_stock_value + current_balance
-        }, 200
+        holdings = UserLeagueStock.objects.filter(league_participant=participant).select_related('stock')
+        return True, _owned_stocks_payload(participant, holdings, all_stocks_data), 200
         
     except League.DoesNotExist:
         return False, {'error': 'League not found'}, 404
@@ -239,6 +157,68 @@ def get_owned_stocks_data(league_id, user):
         return False, {'error': f'An error occurred: {str(e)}'}, 500
 
 
+def _leaderboard(user, **league):
+    """Returns the leaderboard entries for the league matching `league` (a filter such as
+    league_id=...) in one query. The league's participant count is read in the same query;
+    if some participants have no valuation row, the league's rows are rebuilt first."""
+    participant_count = Subquery(
+        LeagueParticipant.objects.filter(league_id=OuterRef('league_id')).order_by()
+        .values('league_id').annotate(count=Count('id')).values('count')
+    )
+    valuations = (
+        ParticipantValuation.objects.filter(**league)
+        .order_by('-net_worth', 'participant__user__username')
+        .values_list('participant__user_id', 'participant__user__username', 'net_worth', 'rank')
+    )
+    rows = list(valuations.annotate(participant_count=participant_count))
+    expected = rows[0][-1] if rows else LeagueParticipant.objects.filter(**league).count()
+    if len(rows) < expected:
+        recompute_valuations(list(LeagueParticipant.objects.filter(**league).values_list('league_id', flat=True).distinct()))
+        rows = list(valuations.annotate(participant_count=participant_count))
+    return [
+        {
+            'username': username,
+            'net_worth': round(float(net_worth), 2),
+            'rank': rank,
+            'is_current_user': user_id == user.id,
+        }
+        for user_id, username, net_worth, rank, _ in rows
+    ]
+
+
+def get_league_leaderboard_data(league_id, user):
+    """
+    Get the leaderboard for a league sorted by net worth.
+    Net worth and rank come from the materialized participant valuations, read in a single
+    query, so the query count doesn't grow with the number of participants or holdings
+    (missing valuation rows are rebuilt first, see _leaderboard).
+    
+    Args:
+        league_id: UUID of the league
+        user: User object (must be a participant)
+    
+    Returns:
+        tuple: (success: bool, response_data: dict, status_code: int)
+    """
+    leaderboard_data = _leaderboard(user, league__league_id=league_id)
+
+    # Verify user is a participant
+    if not any(entry['is_current_user'] for entry in leaderboard_data):
+        if not League.objects.filter(league_id=league_id).exists():
+            return False, {'error': 'League not found'}, 404
+        return False, {'error': 'You are not a participant in this league'}, 404
+
+    return True, {'leaderboard': leaderboard_data}, 200
+
+
+def _stock_info_payload(participant, stock, owned_shares):
+    return {
+        'balance': float(participant.current_balance),
+        'owned_shares': float(owned_shares) if owned_shares is not None else 0,
+        'current_price': float(stock.current_price)
+    }
+
+
 def get_stock_info_data(league_id, ticker, user):
     """
     Get stock information for a user in a league.
@@ -252,25 +232,16 @@ def get_stock_info_data(league_id, ticker, user):
         tuple: (success: bool, response_data: dict, status_code: int)
     """
     try:
-        league = League.objects.get(league_id=league_id)
-        participant = LeagueParticipant.objects.get(league=league, user=user)
+        participant = resolve_participant(league_id, user)
         stock = Stock.objects.get(ticker=ticker)
         
         # Get owned shares if any
-        try:
-            user_stock = UserLeagueStock.objects.get(
-                league_participant=participant,
-                stock=stock
-            )
-            owned_shares = float(user_stock.shares)
-        except UserLeagueStock.DoesNotExist:
-            owned_shares = 0
+        owned_shares = UserLeagueStock.objects.filter(
+            league_participant=participant,
+            stock=stock
+        ).values_list('shares', flat=True).first()
         
-        return True, {
-            'balance': float(participant.current_balance),
-            'owned_shares': owned_shares,
-            'current_price': float(stock.current_price)
-        }, 200
+        return True, _stock_info_payload(participant, stock, owned_shares), 200
         
     except League.DoesNotExist:
         return False, {'error': 'League not found'}, 404
@@ -279,3 +250,84 @@ def get_stock_info_data(league_id, ticker, user):
     except Stock.DoesNotExist:
         return False, {'error': 'Stock not found'}, 404
 
+
+
+# Sub-requests the league batch endpoint can answer
+BATCH_RESOURCES = ('owned_stocks', 'leaderboard', 'stock_info')
+MAX_BATCH_REQUESTS = 20
+
+
+def get_league_batch_data(league_id, user, sub_requests):
+    """
+    Answer several reads for one league in a single request.
+    The league and participant are resolved once, and the data the sub-requests share
+    (holdings, board prices, stocks) is loaded at most once for the whole batch.
+    
+    Args:
+        league_id: UUID of the league
+        user: User object (must be a participant)
+        sub_requests: list of dicts like {"type": "owned_stocks"}, {"type": "leaderboard"}
+            or {"type": "stock_info", "ticker": "AAPL"}; an optional "id" is echoed back
+    
+    Returns:
+        tuple: (success: bool, response_data: dict, status_code: int)
+        response_data["responses"] holds one {"type", "status", "body"} per sub-request, in order
+    """
+    if not isinstance(sub_requests, list) or not sub_requests:
+        return False, {'error': 'requests must be a non-empty list'}, 400
+    if len(sub_requests) > MAX_BATCH_REQUESTS:
+        return False, {'error': f'At most {MAX_BATCH_REQUESTS} requests per batch'}, 400
+
+    try:
+        participant = resolve_participant(league_id, user)
+    except League.DoesNotExist:
+        return False, {'error': 'League not found'}, 404
+    except LeagueParticipant.DoesNotExist:
+        return False, {'error': 'You are not a participant in this league'}, 404
+
+    try:
+        valid = [sub for sub in sub_requests if isinstance(sub, dict) and sub.get('type') in BATCH_RESOURCES]
+        types = {sub['type'] for sub in valid}
+        tickers = {sub['ticker'] for sub in valid if sub['type'] == 'stock_info' and isinstance(sub.get('ticker'), str)}
+
+        # Shared data, each loaded once for the whole batch
+        holdings = []
+        if types & {'owned_stocks', 'stock_info'}:
+            holdings = list(UserLeagueStock.objects.filter(league_participant=participant).select_related('stock'))
+        shares_by_ticker = {holding.stock_id: holding.shares for holding in holdings}
+        stocks = Stock.objects.in_bulk(list(tickers)) if tickers else {}
+        owned_stocks = None
+        leaderboard = None
+
+        responses = []
+        for sub in sub_requests:
+            if not isinstance(sub, dict) or sub.get('type') not in BATCH_RESOURCES:
+                result = {'status': 400, 'body': {'error': f'type must be one of: {", ".join(BATCH_RESOURCES)}'}}
+            elif sub['type'] == 'owned_stocks':
+                if owned_stocks is None:
+                    owned_stocks = _owned_stocks_payload(participant, holdings, get_board_prices())
+                result = {'status': 200, 'body': owned_stocks}
+            elif sub['type'] == 'leaderboard':
+                if leaderboard is None:
+                    leaderboard = _leaderboard(user, league_id=participant.league_id)
+                result = {'status': 200, 'body': {'leaderboard': leaderboard}}
+            elif not isinstance(sub.get('ticker'), str) or not sub['ticker']:
+                result = {'status': 400, 'body': {'error': 'ticker is required'}}
+            elif sub['ticker'] not in stocks:
+                result = {'status': 404, 'body': {'error': 'Stock not found'}}
+            else:
+                stock = stocks[sub['ticker']]
+                result = {'status': 200, 'body': _stock_info_payload(participant, stock, shares_by_ticker.get(stock.ticker))}
+
+            if isinstance(sub, dict):
+                result = {'type': sub.get('type'), **result}
+                if 'id' in sub:
+                    result['id'] = sub['id']
+            responses.append(result)
+
+        return True, {'responses': responses}, 200
+    except Exception as e:
+        import traceback
+        print(f"Error in get_league_batch_data: {str(e)}")
+        print(traceback.format_exc())
+        return False, {'error': f'An error occurred: {str(e)}'}, 500
@@ -0,0 +1,92 @@
+from catalog.models import League, LeagueParticipant, Order, Stock
+from catalog.trade_execution import MAX_QUANTITY, parse_quantity
+from api.apiUtils.leagueResolver import resolve_participant
+
+ORDER_SIDES = {Order.BUY, Order.SELL}
+ORDER_TYPES = {Order.LIMIT, Order.STOP}
+
+
+def _order_payload(order):
+    return {
+        "id": order.id,
+        "ticker": order.ticker,
+        "side": order.side,
+        "order_type": order.order_type,
+        "shares": float(order.shares),
+        "trigger_price": float(order.trigger_price),
+        "status": order.status,
+        "reason": order.reason,
+        "created_at": order.created_at,
+        "closed_at": order.closed_at,
+    }
+
+
+def place_order(league_id, user, data):
+    """
+    Place a resting limit or stop order; it is filled by the next price refresh that crosses
+    its trigger price (balance and shares are checked when it fills, not now).
+    Returns a tuple: (success: bool, response_data: dict, status_code: int)
+    """
+    try:
+        participant = resolve_participant(league_id, user)
+
+        side = data.get('side')
+        order_type = data.get('order_type')
+        if side not in ORDER_SIDES or order_type not in ORDER_TYPES:
+            return False, {'error': 'side must be buy or sell and order_type must be limit or stop'}, 400
+        # Rounded to the 2 decimal places the order is stored with, so the response matches the row
+        shares = parse_quantity(data.get('shares'))
+        trigger_price = parse_quantity(data.get('trigger_price'))
+        if shares is None or trigger_price is None:
+            return False, {'error': f'shares and trigger_price must be numbers between 0.01 and {MAX_QUANTITY}'}, 400
+
+        stock = Stock.objects.get(ticker=data.get('ticker'))
+
+        order = Order.objects.create(
+            participant=participant, league_id=participant.league_id, ticker=stock.ticker,
+            side=side, order_type=order_type, shares=shares, trigger_price=trigger_price,
+        )
+        return True, _order_payload(order), 201
+
+    except League.DoesNotExist:
+        return False, {'error': 'League not found'}, 404
+    except LeagueParticipant.DoesNotExist:
+        return False, {'error': 'You are not a participant in this league'}, 404
+    except Stock.DoesNotExist:
+        return False, {'error': 'Stock not found'}, 404
+
+
+def get_orders_data(league_id, user, status=None):
+    """
+    Get the user's orders in a league, newest first, optionally only those with `status`.
+    Returns a tuple: (success: bool, response_data: list, status_code: int)
+    """
+    try:
+        participant = resolve_participant(league_id, user)
+        orders = Order.objects.filter(participant=participant).order_by('-id')
+        if status:
+            orders = orders.filter(status=status)
+        return True, [_order_payload(order) for order in orders], 200
+
+    except League.DoesNotExist:
+        return False, {'error': 'League not found'}, 404
+    except LeagueParticipant.DoesNotExist:
+        return False, {'error': 'You are not a participant in this league'}, 404
+
+
+def cancel_order(order_id, user):
+    """
+    Cancel one of the user's open orders.
+    Returns a tuple: (success: bool, response_data: dict, status_code: int)
+    """
+    order = Order.objects.filter(pk=order_id, participant__user=user).first()
+    if order is None:
+        return False, {'error': 'Order not found'}, 404
+
+    # Conditional so an order filled by a concurrent refresh stays filled
+    if not Order.objects.filter(pk=order.pk, status=Order.OPEN).update(status=Order.CANCELLED):
+        order.refresh_from_db()
+        return False, {'error': f'Order is already {order.status}'}, 400
+
+    order.refresh_from_db()
+    return True, _order_payload(order), 200
@@ -0,0 +1,47 @@
+from catalog.models import League, LeagueParticipant, Trade
+from catalog.trade_ledger import trade_history
+from api.apiUtils.leagueResolver import resolve_participant
+
+TRADE_HISTORY_PAGE_SIZE = 50
+TRADE_HISTORY_MAX_PAGE_SIZE = 500
+
+
+def get_trade_history_data(league_id, user, mine=False, before=None, limit=None):
+    """
+    Get a page of a league's trades, newest first; with mine=True only the user's own trades.
+    Pass the previous page's next_cursor as `before` to get the next page.
+    Returns a tuple: (success: bool, response_data: dict, status_code: int)
+    """
+    try:
+        participant = resolve_participant(league_id, user)
+
+        if mine:
+            trades = Trade.objects.filter(participant=participant)
+        else:
+            trades = Trade.objects.filter(league_id=participant.league_id)
+        # Opening entries only seed the ledger for pre-ledger state; they aren't trades
+        trades = trades.exclude(side=Trade.OPEN).select_related('participant__user')
+
+        page, next_cursor = trade_history(trades, before=before, limit=limit or TRADE_HISTORY_PAGE_SIZE)
+
+        return True, {
+            "trades": [
+                {
+                    "id": trade.id,
+                    "username": trade.participant.user.username,
+                    "ticker": trade.ticker,
+                    "side": trade.side,
+                    "shares": float(trade.shares),
+                    "price": float(trade.price),
+                    "amount": float(trade.amount),
+                    "executed_at": trade.executed_at,
+                }
+                for trade in page
+            ],
+            "next_cursor": next_cursor,
+        }, 200
+
+    except League.DoesNotExist:
+        return False, {'error': 'League not found'}, 404
+    except LeagueParticipant.DoesNotExist:
+        return False, {'error': 'You are not a participant in this league'}, 404
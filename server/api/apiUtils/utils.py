@@ -2,10 +2,11 @@ from datetime import date
 
 from django.db import models
 from catalog.models import League, Stock, UserLeagueStock, LeagueParticipant
+from api.apiUtils.leagueResolver import resolve_league
 
 def getOwnedStocks(league_id, user):
-    current_league = League.objects.get(league_id=league_id)
-    return UserLeagueStock.objects.filter(league_participant__user=user,league_participant__league=current_league)
+    current_league = resolve_league(league_id)
+    return UserLeagueStock.objects.filter(league_participant__user=user,league_participant__league=current_league).select_related('stock')
 
 def getTotalStockValue(league_id, user):
     from decimal import Decimal
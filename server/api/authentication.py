@@ -0,0 +1,101 @@
+"""JWT authentication that skips the per-request User lookup.
+
+The token signature and expiry are verified as usual; the user is then taken from a bounded,
+short-TTL in-process LRU keyed by (user id, auth version). The auth version lives in the
+shared cache and is bumped whenever the user row changes (username or password change,
+deactivation; see api.signals), so every worker stops using its cached copy at once. A miss
+falls back to the normal database lookup.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class TTLCache:
+    """Thread-safe LRU with a maximum size and a per-entry time to live."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard_matching(self, predicate):
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = TTLCache(settings.AUTH_USER_CACHE_SIZE, settings.AUTH_USER_CACHE_TTL)
+
+
+def _version_key(user_id):
+    return f'auth:user_version:{user_id}'
+
+
+def get_auth_version(user_id):
+    return cache.get(_version_key(user_id), 0)
+
+
+def invalidate_user(user_id):
+    """Drops cached copies of a user in every process."""
+    key = _version_key(user_id)
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+    user_cache.discard_matching(lambda cached: cached[0] == str(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        key = (str(user_id), get_auth_version(user_id))
+        user = user_cache.get(key)
+        if user is None:
+            # Database lookup plus simplejwt's active / revoked-token checks
+            user = super().get_user(validated_token)
+            user_cache.set(key, user)
+        elif api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        # Each request gets its own copy so views can't leak changes into the cache
+        return copy.copy(user)
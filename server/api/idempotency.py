@@ -0,0 +1,103 @@
+"""Idempotency-Key support for POST endpoints that change state (trades, orders, joins).
+
+A client may send an `Idempotency-Key` header with a unique value per logical request and
+retry with the same key. Keys are stored in the IdempotencyKey table, unique per
+(user, endpoint, key), the same way RefreshLease coordinates refreshes across processes:
+- inserting the row claims the key, so exactly one request runs; duplicates that arrive while
+  it runs get 409 (a claim left by a dead worker is taken over after IDEMPOTENCY_LOCK_TTL);
+- the first response (anything but a 5xx) is stored on the row and replayed to retries for
+  IDEMPOTENCY_KEY_TTL seconds without running the view again (marked with an
+  `Idempotent-Replayed: true` header);
+- a retry whose body doesn't match the stored fingerprint is rejected with 422.
+5xx responses release the key so the request can be retried. Requests without the header
+behave exactly as before. Expired keys are removed by manage.py purge_idempotency_keys.
+"""
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.response import Response
+
+from catalog.models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def _fingerprint(data, kwargs):
+    body = json.dumps({'data': data, 'kwargs': kwargs}, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _claim(user, scope, key, fingerprint):
+    """Claims the key by inserting its row (expired rows are replaced). Returns (row, True) if
+    this request now owns the key, or (existing row or None, False) if another request has it."""
+    now = timezone.now()
+    locked_until = now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_TTL)
+    for _ in range(2):
+        existing = IdempotencyKey.objects.filter(user=user, scope=scope, key=key).first()
+        if existing is None:
+            try:
+                with transaction.atomic():
+                    return IdempotencyKey.objects.create(
+                        user=user, scope=scope, key=key, fingerprint=fingerprint, locked_until=locked_until,
+                        expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+                    ), True
+            except IntegrityError:
+                continue  # A concurrent request claimed it first
+        if existing.expires_at <= now:
+            IdempotencyKey.objects.filter(pk=existing.pk, expires_at__lte=now).delete()
+            continue
+        if existing.status_code is None and existing.locked_until <= now and existing.fingerprint == fingerprint:
+            # The request that claimed the key died without finishing: take it over
+            taken = IdempotencyKey.objects.filter(
+                pk=existing.pk, status_code__isnull=True, locked_until=existing.locked_until
+            ).update(locked_until=locked_until)
+            return existing, bool(taken)
+        return existing, False
+    return None, False
+
+
+def idempotent(scope):
+    """Decorates a view's post(self, request, ...) so retries carrying the same
+    Idempotency-Key replay the first response. `scope` names the endpoint."""
+
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            key = request.headers.get(HEADER)
+            if not key:
+                return view_method(self, request, *args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return Response({'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'}, status=400)
+
+            fingerprint = _fingerprint(request.data, kwargs)
+            row, owned = _claim(request.user, scope, key, fingerprint)
+            if not owned:
+                if row is None or row.status_code is None:
+                    return Response({'error': f'A request with this {HEADER} is already in progress'}, status=409)
+                if row.fingerprint != fingerprint:
+                    return Response({'error': f'{HEADER} was already used with a different request'}, status=422)
+                response = Response(row.response, status=row.status_code)
+                response['Idempotent-Replayed'] = 'true'
+                return response
+
+            try:
+                response = view_method(self, request, *args, **kwargs)
+            except Exception:
+                IdempotencyKey.objects.filter(pk=row.pk).delete()
+                raise
+            if response.status_code < 500:
+                IdempotencyKey.objects.filter(pk=row.pk).update(status_code=response.status_code, response=response.data)
+            else:
+                IdempotencyKey.objects.filter(pk=row.pk).delete()
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,29 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.authentication import invalidate_user
+from api.apiUtils.leagueResolver import clear_request_memo, league_key, member_key
+from catalog.models import League, LeagueParticipant
+
+
+@receiver(post_save, sender=LeagueParticipant)
+@receiver(post_delete, sender=LeagueParticipant)
+def forget_membership(sender, instance, **kwargs):
+    """Joins, leaves and admin changes drop the cached membership."""
+    cache.delete(member_key(instance.league_id, instance.user_id))
+    clear_request_memo()
+
+
+@receiver(post_delete, sender=League)
+def forget_league(sender, instance, **kwargs):
+    cache.delete(league_key(instance.league_id))
+    clear_request_memo()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_authenticated_user(sender, instance, **kwargs):
+    """Username and password changes and deactivation must not be served from the auth cache."""
+    invalidate_user(instance.pk)
@@ -1,3 +1,691 @@
-from django.test import TestCase
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.forms import ValidationError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.apiUtils.buySellStock import buy_stock, sell_stock
+from api.apiUtils.leagueResolver import resolve_participant
+from api.idempotency import _fingerprint
+from catalog.models import IdempotencyKey, League, LeagueParticipant, Order, Stock, Trade, UserLeagueStock
+from catalog.stock_board import publish_board
+from catalog.valuations import recompute_valuations
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
 
 # Create your tests here.
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ViewAllStocksTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        Stock.objects.create(ticker='AAPL', name='Apple Inc.', start_price=Decimal('100.00'), current_price=Decimal('110.00'))
+
+    @patch('catalog.stock_populator.update_stock_prices')
+    def test_reads_stored_prices_only(self, mock_update):
+        response = self.client.get('/api/stocks/')
+
+        self.assertEqual(response.status_code, 200)
+        mock_update.assert_not_called()
+        self.assertIsNotNone(response.json()['prices_as_of'])
+        self.assertEqual(response.json()['stocks'][0]['ticker'], 'AAPL')
+        self.assertAlmostEqual(response.json()['stocks'][0]['daily_change_percent'], 10.0)
+
+    def test_conditional_requests_get_304_until_next_version(self):
+        response = self.client.get('/api/stocks/')
+        etag = response['ETag']
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+        with self.assertNumQueries(0):
+            not_modified = self.client.get('/api/stocks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+        self.assertEqual(self.client.get('/api/stocks/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+        Stock.objects.filter(ticker='AAPL').update(current_price=Decimal('120.00'))
+        publish_board()
+        changed = self.client.get('/api/stocks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class StockBoardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='trader', password='pw')
+        self.league = League.objects.create(name='Test League')
+        participant = LeagueParticipant.objects.create(league=self.league, user=self.user, current_balance=Decimal('1000.00'))
+        self.stock = Stock.objects.create(ticker='AAPL', name='Apple Inc.', start_price=Decimal('100.00'), current_price=Decimal('110.00'))
+        UserLeagueStock.objects.create(league_participant=participant, stock=self.stock, avg_price_per_share=Decimal('90.00'), shares=2)
+        self.client.force_authenticate(self.user)
+
+    def _prices(self):
+        board = self.client.get('/api/stocks/').json()['stocks'][0]['current_price']
+        owned = self.client.get(f'/api/owned-stocks/{self.league.league_id}/').data['stocks'][0]['current_price']
+        return board, owned
+
+    def test_endpoints_share_snapshot_until_refresher_publishes(self):
+        self.assertEqual(self._prices(), (110.0, 110.0))
+
+        # A price change alone isn't visible until the refresher publishes a new snapshot
+        Stock.objects.filter(ticker='AAPL').update(current_price=Decimal('120.00'))
+        self.assertEqual(self._prices(), (110.0, 110.0))
+
+        publish_board()
+        self.assertEqual(self._prices(), (120.0, 120.0))
+
+    def test_missing_valuation_is_rebuilt(self):
+        from catalog.models import ParticipantValuation
+
+        ParticipantValuation.objects.all().delete()
+        response = self.client.get(f'/api/owned-stocks/{self.league.league_id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['net_worth'], 1220.0)
+        self.assertTrue(ParticipantValuation.objects.exists())
+
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class StockBoardVersionTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_publishers_each_get_a_version(self):
+        from catalog.stock_board import VERSION_KEY, _current_version, _next_version
+
+        def bump(_):
+            try:
+                return _next_version()
+            finally:
+                connection.close()
+
+        start = _next_version()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            versions = list(pool.map(bump, range(50)))
+        self.assertEqual(sorted(versions), list(range(start + 1, start + 51)))
+        self.assertEqual(cache.get(VERSION_KEY), start + 50)
+
+        # A lost cached version is recovered from the database counter
+        cache.delete(VERSION_KEY)
+        self.assertEqual(_current_version(), start + 50)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.league = League.objects.create(name='Big League')
+        stocks = [
+            Stock.objects.create(ticker=f'T{i}', name=f'Stock {i}', start_price=Decimal('10.00'), current_price=Decimal(10 + i))
+            for i in range(5)
+        ]
+        for i in range(30):
+            user = User.objects.create(username=f'user{i:02d}')
+            participant = LeagueParticipant.objects.create(league=self.league, user=user, current_balance=Decimal('1000.00'))
+            for stock in stocks[:i % 4]:
+                UserLeagueStock.objects.create(league_participant=participant, stock=stock, avg_price_per_share=Decimal('10.00'), shares=Decimal(i))
+        recompute_valuations()
+        self.user = User.objects.get(username='user00')
+        self.client.force_authenticate(self.user)
+
+    def test_single_query_regardless_of_league_size(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/leagues/{self.league.league_id}/leaderboard/')
+
+        leaderboard = response.data['leaderboard']
+        self.assertEqual(len(leaderboard), 30)
+        # user27 holds 27 shares each of T0 (10.00), T1 (11.00) and T2 (12.00)
+        self.assertEqual(leaderboard[0], {'username': 'user27', 'net_worth': 1891.0, 'rank': 1, 'is_current_user': False})
+        # The 8 participants without holdings tie for the last rank and are listed by username
+        self.assertEqual(leaderboard[-8], {'username': 'user00', 'net_worth': 1000.0, 'rank': 23, 'is_current_user': True})
+        self.assertEqual([entry['username'] for entry in leaderboard if entry['is_current_user']], ['user00'])
+
+    def test_missing_valuation_rows_are_rebuilt(self):
+        from catalog.models import ParticipantValuation
+
+        ParticipantValuation.objects.filter(participant__user=self.user).delete()
+        response = self.client.get(f'/api/leagues/{self.league.league_id}/leaderboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['leaderboard']), 30)
+        self.assertIn({'username': 'user00', 'net_worth': 1000.0, 'rank': 23, 'is_current_user': True}, response.data['leaderboard'])
+
+        ParticipantValuation.objects.all().delete()
+        batch = self.client.post(f'/api/leagues/{self.league.league_id}/batch/', {'requests': [{'type': 'leaderboard'}]}, format='json')
+        self.assertEqual(batch.data['responses'][0]['body'], response.data)
+
+    def test_non_participant_rejected(self):
+        self.client.force_authenticate(User.objects.create(username='outsider'))
+
+        response = self.client.get(f'/api/leagues/{self.league.league_id}/leaderboard/')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['error'], 'You are not a participant in this league')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LeagueListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(username='player')
+        self.admin = User.objects.create(username='root', is_superuser=True)
+        self.leagues = [League.objects.create(name=f'League {i}') for i in range(12)]
+        for i, league in enumerate(self.leagues):
+            for j in range(i % 3):
+                LeagueParticipant.objects.create(league=league, user=User.objects.create(username=f'u{i}-{j}'), current_balance=Decimal('10000.00'))
+        LeagueParticipant.objects.create(league=self.leagues[1], user=self.user, current_balance=Decimal('10000.00'), leagueAdmin=True)
+        LeagueParticipant.objects.create(league=self.leagues[4], user=self.user, current_balance=Decimal('10000.00'))
+        LeagueParticipant.objects.create(league=self.leagues[4], user=self.admin, current_balance=Decimal('10000.00'))
+
+    def test_participant_listing_single_query(self):
+        self.client.force_authenticate(self.user)
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/leagues/')
+
+        leagues = response.data['leagues']
+        self.assertEqual([entry['league']['name'] for entry in leagues], ['League 1', 'League 4'])
+        self.assertEqual([entry['leagueAdmin'] for entry in leagues], [True, False])
+        self.assertEqual([entry['league']['participant_count'] for entry in leagues], [2, 3])
+
+    def test_superuser_keyset_pagination(self):
+        self.client.force_authenticate(self.admin)
+        seen = []
+        after = ''
+        while True:
+            with self.assertNumQueries(1):
+                response = self.client.get(f'/api/leagues/?limit=5&after={after}')
+            seen.extend(response.data['leagues'])
+            after = response.data['next_cursor']
+            if after is None:
+                break
+
+        self.assertEqual(len(seen), 12)
+        self.assertEqual([entry['league']['name'] for entry in seen], [league.name for league in self.leagues])
+        self.assertEqual([entry['league']['name'] for entry in seen if entry['isParticipant']], ['League 4'])
+        # Without a limit every league is returned at once
+        self.assertEqual(len(self.client.get('/api/leagues/').data['leagues']), 12)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LeagueBatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(username='trader')
+        self.league = League.objects.create(name='Test League')
+        participant = LeagueParticipant.objects.create(league=self.league, user=self.user, current_balance=Decimal('1000.00'))
+        LeagueParticipant.objects.create(league=self.league, user=User.objects.create(username='rival'), current_balance=Decimal('500.00'))
+        for ticker, price in [('AAPL', '110.00'), ('MSFT', '50.00')]:
+            stock = Stock.objects.create(ticker=ticker, name=ticker, start_price=Decimal('100.00'), current_price=Decimal(price))
+            UserLeagueStock.objects.create(league_participant=participant, stock=stock, avg_price_per_share=Decimal('90.00'), shares=2)
+        recompute_valuations()
+        self.client.force_authenticate(self.user)
+
+    def _batch(self, requests):
+        return self.client.post(f'/api/leagues/{self.league.league_id}/batch/', {'requests': requests}, format='json')
+
+    def test_combined_payload_matches_individual_endpoints(self):
+        requests = [
+            {'type': 'owned_stocks'},
+            {'type': 'leaderboard'},
+            {'type': 'stock_info', 'ticker': 'AAPL', 'id': 'aapl'},
+            {'type': 'stock_info', 'ticker': 'NOPE'},
+            {'type': 'bogus'},
+        ]
+        self._batch(requests)  # Warm the board snapshot
+
+        # Participant, holdings, stocks, leaderboard
+        with self.assertNumQueries(4):
+            response = self._batch(requests)
+
+        self.assertEqual(response.status_code, 200)
+        owned, leaderboard, info, missing, bogus = response.data['responses']
+        self.assertEqual(owned['body'], self.client.get(f'/api/owned-stocks/{self.league.league_id}/').data)
+        self.assertEqual(leaderboard['body'], self.client.get(f'/api/leagues/{self.league.league_id}/leaderboard/').data)
+        self.assertEqual((info['id'], info['status']), ('aapl', 200))
+        self.assertEqual(info['body'], self.client.get(f'/api/stocks/info/{self.league.league_id}/AAPL/').data)
+        self.assertEqual(missing['status'], 404)
+        self.assertEqual(bogus['status'], 400)
+
+    def test_rejects_non_participants_and_bad_bodies(self):
+        self.assertEqual(self._batch([]).status_code, 400)
+        self.client.force_authenticate(User.objects.create(username='outsider'))
+        self.assertEqual(self._batch([{'type': 'leaderboard'}]).status_code, 404)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TradeLedgerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(username='trader')
+        self.rival = User.objects.create(username='rival')
+        self.league = League.objects.create(name='Test League')
+        self.participant = LeagueParticipant.objects.create(league=self.league, user=self.user, current_balance=Decimal('10000.00'))
+        LeagueParticipant.objects.create(league=self.league, user=self.rival, current_balance=Decimal('10000.00'))
+        self.stock = Stock.objects.create(ticker='AAPL', name='Apple Inc.', start_price=Decimal('10.00'), current_price=Decimal('10.00'))
+        self.client.force_authenticate(self.user)
+
+    def _trade(self, side, shares, user=None):
+        trade = buy_stock if side == Trade.BUY else sell_stock
+        success, data, status = trade(self.league.league_id, user or self.user, 'AAPL', shares)
+        self.assertEqual(status, 200, data)
+
+    def test_trades_are_recorded_and_paginated(self):
+        self._trade(Trade.BUY, 3)
+        self.stock.current_price = Decimal('12.50')
+        self.stock.save()
+        self._trade(Trade.SELL, 2)
+        self._trade(Trade.BUY, 1, user=self.rival)
+
+        trades = list(Trade.objects.order_by('id').values_list('side', 'shares', 'price', 'amount'))
+        self.assertEqual(trades, [
+            (Trade.BUY, Decimal('3'), Decimal('10.00'), Decimal('30.00')),
+            (Trade.SELL, Decimal('2'), Decimal('12.50'), Decimal('25.00')),
+            (Trade.BUY, Decimal('1'), Decimal('12.50'), Decimal('12.50')),
+        ])
+
+        url = f'/api/leagues/{self.league.league_id}/trades/'
+        first = self.client.get(url, {'limit': 2}).data
+        self.assertEqual([trade['username'] for trade in first['trades']], ['rival', 'trader'])
+        second = self.client.get(url, {'limit': 2, 'before': first['next_cursor']}).data
+        self.assertEqual([trade['side'] for trade in second['trades']], [Trade.BUY])
+        self.assertIsNone(second['next_cursor'])
+
+        mine = self.client.get(f'/api/leagues/{self.league.league_id}/my-trades/').data
+        self.assertEqual([trade['side'] for trade in mine['trades']], [Trade.SELL, Trade.BUY])
+        self.assertEqual(self.client.get(url, {'limit': 'x'}).status_code, 400)
+
+        with self.assertRaises(ValidationError):
+            Trade.objects.first().save()
+
+    def test_rebuild_restores_positions_from_ledger(self):
+        from catalog.trade_ledger import rebuild_positions
+
+        self._trade(Trade.BUY, 4)
+        self.stock.current_price = Decimal('20.00')
+        self.stock.save()
+        self._trade(Trade.BUY, 1)
+        self._trade(Trade.SELL, 2)
+        self.assertEqual(rebuild_positions(), [])
+
+        LeagueParticipant.objects.filter(pk=self.participant.pk).update(current_balance=Decimal('1.00'))
+        UserLeagueStock.objects.filter(league_participant=self.participant).delete()
+        self.assertEqual(len(rebuild_positions()), 2)
+        self.assertEqual(len(rebuild_positions(apply=True)), 2)
+        self.assertEqual(rebuild_positions(), [])
+
+        self.participant.refresh_from_db()
+        position = UserLeagueStock.objects.get(league_participant=self.participant)
+        self.assertEqual(self.participant.current_balance, Decimal('9980.00'))
+        self.assertEqual((position.shares, position.avg_price_per_share), (Decimal('3'), Decimal('12.00')))
+
+    def test_rebuild_keeps_state_that_predates_the_ledger(self):
+        import importlib
+
+        from django.apps import apps
+
+        from catalog.trade_ledger import rebuild_positions
+
+        # State built before trades were recorded: no Trade rows explain it
+        LeagueParticipant.objects.filter(pk=self.participant.pk).update(current_balance=Decimal('9950.00'))
+        UserLeagueStock.objects.create(
+            league_participant=self.participant, stock=self.stock, avg_price_per_share=Decimal('8.00'), shares=5
+        )
+        self.assertEqual(len(rebuild_positions()), 2)
+        # A trade recorded after the ledger started but before it was opened
+        self._trade(Trade.SELL, 2)
+
+        importlib.import_module('catalog.migrations.0021_open_ledger').open_ledger(apps, None)
+        self.assertEqual(rebuild_positions(apply=True), [])
+        self._trade(Trade.BUY, 1)
+        self.assertEqual(rebuild_positions(), [])
+
+        self.participant.refresh_from_db()
+        self.assertEqual(self.participant.current_balance, Decimal('9960.00'))
+        self.assertEqual(UserLeagueStock.objects.get(league_participant=self.participant).shares, Decimal('4'))
+        mine = self.client.get(f'/api/leagues/{self.league.league_id}/my-trades/').data
+        self.assertEqual([trade['side'] for trade in mine['trades']], [Trade.BUY, Trade.SELL])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class BatchTradeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(username='trader')
+        self.league = League.objects.create(name='Test League')
+        self.participant = LeagueParticipant.objects.create(league=self.league, user=self.user, current_balance=Decimal('100.00'))
+        for ticker, price in [('AAPL', '50.00'), ('MSFT', '30.00')]:
+            Stock.objects.create(ticker=ticker, name=ticker, start_price=Decimal(price), current_price=Decimal(price))
+        UserLeagueStock.objects.create(
+            league_participant=self.participant, stock_id='AAPL', avg_price_per_share=Decimal('50.00'), shares=2
+        )
+        self.client.force_authenticate(self.user)
+
+    def _batch(self, orders, **flags):
+        return self.client.post('/api/stocks/batch/', {'league_id': str(self.league.league_id), 'orders': orders, **flags}, format='json')
+
+    def _holdings(self):
+        self.participant.refresh_from_db()
+        shares = dict(UserLeagueStock.objects.filter(league_participant=self.participant).values_list('stock_id', 'shares'))
+        return self.participant.current_balance, shares
+
+    def test_sells_fund_buys_in_one_batch(self):
+        # 200 of buys on a 100 balance only works because the sale runs first
+        response = self._batch([
+            {'ticker': 'MSFT', 'side': 'buy', 'shares': 5},
+            {'ticker': 'AAPL', 'side': 'buy', 'shares': 1},
+            {'ticker': 'AAPL', 'side': 'sell', 'shares': 2},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['status'] for result in response.data['results']], [200, 200, 200])
+        self.assertEqual(response.data['results'][0]['amount'], 150.0)
+        self.assertEqual(self._holdings(), (Decimal('0.00'), {'AAPL': Decimal('1'), 'MSFT': Decimal('5')}))
+        self.assertEqual(Trade.objects.count(), 3)
+
+    def test_all_or_nothing_rolls_back_and_best_effort_continues(self):
+        orders = [
+            {'ticker': 'AAPL', 'side': 'sell', 'shares': 1},
+            {'ticker': 'MSFT', 'side': 'buy', 'shares': 100},
+            {'ticker': 'NOPE', 'side': 'buy', 'shares': 1},
+        ]
+        response = self._batch(orders)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result['status'] for result in response.data['results']], [409, 400, 404])
+        self.assertEqual(self._holdings(), (Decimal('100.00'), {'AAPL': Decimal('2')}))
+        self.assertEqual(Trade.objects.count(), 0)
+
+        response = self._batch(orders, all_or_nothing=False)
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual((response.data['executed'], response.data['failed']), (1, 2))
+        self.assertEqual([result['success'] for result in response.data['results']], [True, False, False])
+        self.assertEqual(self._holdings(), (Decimal('150.00'), {'AAPL': Decimal('1')}))
+        self.assertEqual(self._batch([]).status_code, 400)
+
+    def test_invalid_share_counts_are_rejected(self):
+        for shares in ('Infinity', 'NaN', '0.001', '1e12', 'abc'):
+            response = self._batch([{'ticker': 'MSFT', 'side': 'buy', 'shares': shares}], all_or_nothing=False)
+            self.assertEqual(response.status_code, 207, shares)
+            self.assertEqual(response.data['results'][0]['status'], 400, shares)
+        self.assertEqual(Trade.objects.count(), 0)
+
+        # Sub-cent amounts are rounded to the 2 decimal places positions are stored with
+        response = self._batch([{'ticker': 'MSFT', 'side': 'buy', 'shares': '1.005'}])
+        self.assertEqual(response.data['results'][0]['total_shares'], 1.01)
+
+    def test_batch_is_priced_from_one_locked_snapshot(self):
+        from catalog import trade_execution
+
+        orders = [{'ticker': 'MSFT', 'side': 'buy', 'shares': 1}, {'ticker': 'AAPL', 'side': 'sell', 'shares': 1}]
+        with patch('api.apiUtils.buySellStock.lock_prices', wraps=trade_execution.lock_prices) as batch_lock, \
+                patch('catalog.trade_execution.lock_prices') as trade_lock:
+            response = self._batch(orders)
+
+        self.assertEqual(response.status_code, 200)
+        batch_lock.assert_called_once_with({'AAPL', 'MSFT'})
+        trade_lock.assert_not_called()
+        self.assertEqual([result['price'] for result in response.data['results']], [30.0, 50.0])
+
+    def test_database_error_is_a_json_error_and_rolls_back(self):
+        orders = [{'ticker': 'AAPL', 'side': 'sell', 'shares': 1}, {'ticker': 'MSFT', 'side': 'buy', 'shares': 1}]
+        with patch('api.apiUtils.buySellStock.execute_buy', side_effect=DatabaseError('disk I/O error')):
+            response = self._batch(orders, all_or_nothing=False)
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.data, {'error': 'Failed to execute batch: disk I/O error'})
+        self.assertEqual(self._holdings(), (Decimal('100.00'), {'AAPL': Decimal('2')}))
+        self.assertEqual(Trade.objects.count(), 0)
+
+
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(username='trader')
+        self.league = League.objects.create(name='Test League')
+        LeagueParticipant.objects.create(league=self.league, user=self.user, current_balance=Decimal('1000.00'))
+        Stock.objects.create(ticker='AAPL', name='Apple Inc.', start_price=Decimal('10.00'), current_price=Decimal('10.00'))
+        self.client.force_authenticate(self.user)
+        self.order = {'league_id': str(self.league.league_id), 'ticker': 'AAPL', 'shares': 2}
+
+    def _buy(self, key=None, **data):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        return self.client.post('/api/stocks/buy/', {**self.order, **data}, format='json', **headers)
+
+    def _claim(self, key, locked_until):
+        return IdempotencyKey.objects.create(
+            user=self.user, scope='buy_stock', key=key, fingerprint='', locked_until=locked_until,
+            expires_at=timezone.now() + timedelta(days=1),
+        )
+
+    def test_retries_replay_the_first_response(self):
+        first = self._buy('order-1')
+        self.assertEqual(first.status_code, 200)
+
+        # Only the key lookup; the trade path isn't touched
+        with self.assertNumQueries(1):
+            retry = self._buy('order-1')
+        self.assertEqual((retry.status_code, retry.json()), (200, first.json()))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Trade.objects.count(), 1)
+
+        self.assertEqual(self._buy('order-1', shares=3).status_code, 422)
+        self.assertEqual(self._buy('order-2').status_code, 200)
+        self._buy()
+        self.assertEqual(Trade.objects.count(), 3)
+
+    def test_duplicate_in_flight_is_rejected_until_its_claim_expires(self):
+        claim = self._claim('order-1', timezone.now() + timedelta(seconds=30))
+        self.assertEqual(self._buy('order-1').status_code, 409)
+        self.assertEqual(Trade.objects.count(), 0)
+
+        # The worker holding the claim died: once it expires the retry runs
+        IdempotencyKey.objects.filter(pk=claim.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1), fingerprint=_fingerprint(self.order, {})
+        )
+        self.assertEqual(self._buy('order-1').status_code, 200)
+        self.assertEqual(self._buy('order-1')['Idempotent-Replayed'], 'true')
+        self.assertEqual(Trade.objects.count(), 1)
+
+    def test_join_league_is_idempotent(self):
+        self.client.force_authenticate(User.objects.create(username='joiner'))
+        data = {'league_id': str(self.league.league_id)}
+        first = self.client.post('/api/leagues/join/', data, format='json', HTTP_IDEMPOTENCY_KEY='join-1')
+        self.assertEqual(first.status_code, 201)
+        retry = self.client.post('/api/leagues/join/', data, format='json', HTTP_IDEMPOTENCY_KEY='join-1')
+        self.assertEqual((retry.status_code, retry.json()), (first.status_code, first.json()))
+        self.assertEqual(LeagueParticipant.objects.filter(league=self.league).count(), 2)
+
+
+class ConcurrentIdempotencyTests(TransactionTestCase):
+    def test_racing_retries_run_the_trade_once(self):
+        user = User.objects.create(username='trader')
+        league = League.objects.create(name='Test League')
+        LeagueParticipant.objects.create(league=league, user=user, current_balance=Decimal('1000.00'))
+        Stock.objects.create(ticker='AAPL', name='Apple Inc.', start_price=Decimal('10.00'), current_price=Decimal('10.00'))
+        barrier = threading.Barrier(8)
+
+        def retry(_):
+            try:
+                client = APIClient()
+                client.force_authenticate(user)
+                barrier.wait()
+                return client.post(
+                    '/api/stocks/buy/', {'league_id': str(league.league_id), 'ticker': 'AAPL', 'shares': 1},
+                    format='json', HTTP_IDEMPOTENCY_KEY='order-1',
+                ).status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            statuses = list(pool.map(retry, range(8)))
+        self.assertEqual(Trade.objects.count(), 1)
+        self.assertEqual(sorted(set(statuses) - {409}), [200])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class OrderEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(username='trader')
+        self.league = League.objects.create(name='Test League')
+        LeagueParticipant.objects.create(league=self.league, user=self.user, current_balance=Decimal('1000.00'))
+        Stock.objects.create(ticker='AAPL', name='Apple Inc.', start_price=Decimal('10.00'), current_price=Decimal('10.00'))
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/leagues/{self.league.league_id}/orders/'
+
+    def test_place_list_and_cancel(self):
+        order = {'ticker': 'AAPL', 'side': 'buy', 'order_type': 'limit', 'shares': 5, 'trigger_price': '9.50'}
+        response = self.client.post(self.url, order, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['status'], 'open')
+        self.assertEqual(self.client.post(self.url, {**order, 'order_type': 'market'}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(self.url, {**order, 'ticker': 'NOPE'}, format='json').status_code, 404)
+
+        self.assertEqual([o['id'] for o in self.client.get(self.url, {'status': 'open'}).data], [response.data['id']])
+        cancel_url = f"/api/orders/{response.data['id']}/cancel/"
+        self.assertEqual(self.client.post(cancel_url).data['status'], 'cancelled')
+        self.assertEqual(self.client.post(cancel_url).status_code, 400)
+
+        self.client.force_authenticate(User.objects.create(username='outsider'))
+        self.assertEqual(self.client.post(cancel_url).status_code, 404)
+
+    def test_order_values_are_rounded_and_range_checked(self):
+        order = {'ticker': 'AAPL', 'side': 'buy', 'order_type': 'limit', 'shares': '1.005', 'trigger_price': '9.499'}
+        response = self.client.post(self.url, order, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['shares'], response.data['trigger_price']), (1.01, 9.5))
+        stored = Order.objects.get(pk=response.data['id'])
+        self.assertEqual((stored.shares, stored.trigger_price), (Decimal('1.01'), Decimal('9.50')))
+
+        for bad in ({'trigger_price': '1e12'}, {'shares': '100000000'}, {'shares': '0.004'},
+                    {'trigger_price': 'NaN'}, {'trigger_price': 'Infinity'}, {'shares': '1e40'}):
+            self.assertEqual(self.client.post(self.url, {**order, **bad}, format='json').status_code, 400, bad)
+        self.assertEqual(Order.objects.count(), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LeagueResolverTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(username='player')
+        self.league = League.objects.create(name='Test League')
+
+    def test_membership_cached_and_invalidated_on_join(self):
+        with self.assertRaises(LeagueParticipant.DoesNotExist):
+            resolve_participant(self.league.league_id, self.user)
+        # Known non-members are answered from the cache
+        with self.assertNumQueries(0), self.assertRaises(LeagueParticipant.DoesNotExist):
+            resolve_participant(self.league.league_id, self.user)
+
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.post('/api/leagues/join/', {'league_id': str(self.league.league_id)}, format='json').status_code, 201)
+
+        with self.assertNumQueries(1):
+            participant = resolve_participant(self.league.league_id, self.user)
+        self.assertEqual(participant.league, self.league)
+        self.assertEqual(participant.valuation.net_worth, Decimal('10000'))
+
+    def test_unknown_league(self):
+        import uuid
+
+        with self.assertRaises(League.DoesNotExist):
+            resolve_participant(uuid.uuid4(), self.user)
+
+    def test_deleted_league_forgotten(self):
+        LeagueParticipant.objects.create(league=self.league, user=self.user, current_balance=Decimal('10000.00'), leagueAdmin=True)
+        resolve_participant(self.league.league_id, self.user)
+        self.client.force_authenticate(self.user)
+
+        self.assertEqual(self.client.delete(f'/api/leagues/{self.league.league_id}/delete/').status_code, 200)
+
+        with self.assertRaises(League.DoesNotExist):
+            resolve_participant(self.league.league_id, self.user)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        from api.authentication import user_cache
+
+        cache.clear()
+        user_cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='player', password='old-password')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_user_lookup_cached_until_user_changes(self):
+        # User lookup + league listing, then the listing alone
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get('/api/leagues/').status_code, 200)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/leagues/').status_code, 200)
+
+        response = self.client.put('/api/user/update-username/', {'username': 'renamed'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(2):
+            self.client.get('/api/leagues/')
+
+        self.user.refresh_from_db()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/leagues/').status_code, 401)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ConcurrentTradeTests(TransactionTestCase):
+    def test_concurrent_orders_keep_balances_consistent(self):
+        cache.clear()
+        user = User.objects.create(username='trader')
+        league = League.objects.create(name='Test League')
+        participant = LeagueParticipant.objects.create(league=league, user=user, current_balance=Decimal('1000.00'))
+        Stock.objects.create(ticker='AAPL', name='Apple Inc.', start_price=Decimal('10.00'), current_price=Decimal('10.00'))
+        statuses = []
+        lock = threading.Lock()
+
+        def order(i):
+            try:
+                # 3 buys for every sell; only 100 buys of one share are affordable
+                trade = sell_stock if i % 4 == 3 else buy_stock
+                success, data, status = trade(league.league_id, user, 'AAPL', 1)
+                with lock:
+                    statuses.append((trade.__name__, status, data))
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(order, range(400)))
+
+        # Lock contention would surface as 500s ("database is locked"), not just slowness
+        errors = [data for _, status, data in statuses if status not in (200, 400, 404)]
+        self.assertEqual(errors, [])
+        bought = sum(1 for name, status, _ in statuses if name == 'buy_stock' and status == 200)
+        sold = sum(1 for name, status, _ in statuses if name == 'sell_stock' and status == 200)
+        participant.refresh_from_db()
+        position = UserLeagueStock.objects.filter(league_participant=participant).first()
+
+        self.assertGreater(bought, 0)
+        self.assertGreaterEqual(participant.current_balance, 0)
+        self.assertEqual(participant.current_balance, Decimal('1000.00') - 10 * bought + 10 * sold)
+        self.assertEqual(position.shares if position else 0, bought - sold)
+        self.assertEqual(participant.valuation.net_worth, Decimal('1000'))
+        self.assertEqual(Trade.objects.filter(participant=participant).count(), bought + sold)
@@ -10,9 +10,15 @@ urlpatterns = [
     path('leagues/join/', views.JoinLeagueView.as_view(), name="join_league"),
     path('stocks/buy/', views.BuyStockView.as_view(), name="buy_stock"),
     path('stocks/sell/', views.SellStockView.as_view(), name="sell_stock"),
+    path('stocks/batch/', views.BatchTradeView.as_view(), name="batch_trade"),
     path('stocks/info/<uuid:league_id>/<str:ticker>/', views.GetStockInfoView.as_view(), name="get_stock_info"),
     path('leagues/<uuid:league_id>/set-start-date/', views.SetLeagueStartDateView.as_view(), name="set_league_start_date"),
     path('leagues/<uuid:league_id>/delete/', views.DeleteLeagueView.as_view(), name="delete_league"),
     path('leagues/<uuid:league_id>/leaderboard/', views.GetLeagueLeaderboardView.as_view(), name="get_league_leaderboard"),
+    path('leagues/<uuid:league_id>/batch/', views.LeagueBatchView.as_view(), name="league_batch"),
+    path('leagues/<uuid:league_id>/trades/', views.LeagueTradesView.as_view(), name="league_trades"),
+    path('leagues/<uuid:league_id>/my-trades/', views.MyLeagueTradesView.as_view(), name="my_league_trades"),
+    path('leagues/<uuid:league_id>/orders/', views.LeagueOrdersView.as_view(), name="league_orders"),
+    path('orders/<int:order_id>/cancel/', views.CancelOrderView.as_view(), name="cancel_order"),
     path('user/update-username/', views.UpdateUsernameView.as_view(), name="update_username"),
 ]
\ No newline at end of file
@@ -1,5 +1,9 @@
 from datetime import timedelta
 from decimal import Decimal
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from catalog.stock_board import get_board
 from django.contrib.auth.models import User
 from rest_framework import generics
 from api.serializer import LeaguesSerializer, StockSerializer, UserSerializer, UpdateUsernameSerializer
@@ -8,10 +12,11 @@ from rest_framework.response import Response
 from catalog.models import LeagueParticipant, Stock, UserLeagueStock, League
 from api.apiUtils.utils import getUserStockProfits, getOwnedStocks, getTotalStockValue
 from api.apiUtils.joinLeague import join_league
+from api.apiUtils.leagueResolver import resolve_league, resolve_participant
+from api.idempotency import idempotent
 from datetime import date, timedelta
 from catalog.views import get_daily_closing_price
 from catalog.stock_populator import update_stock_prices
-import update_stocks as update_stocks_module
 
 class CreateUserView(generics.CreateAPIView):
     queryset = User.objects.all()
@@ -24,57 +29,17 @@ class ViewAllStocks(generics.ListCreateAPIView):
     permission_classes = [AllowAny]
 
     def get(self, request, format=None):
-        # Get stocks from database first (before any updates)
-        stock_queryset = Stock.objects.all()
-        
-        # If no stocks exist, return empty list immediately
-        if not stock_queryset.exists():
-            return Response([], status=200)
-        
-        # Always update stocks before returning data
-        try:
-            update_stocks_module.update_stocks(force=True)
-        except Exception:
-            # Don't fail the request if update logic errors — just log and continue
-            # We'll return the existing data from the database
-            pass
-
-        # Refresh the queryset to get updated prices
-        stock_queryset = Stock.objects.all()
-        stocks = []
-        
-        for stock in stock_queryset:
-            try:
-                # Ensure we have valid numeric values
-                current = float(stock.current_price) if stock.current_price else 0.0
-                start = float(stock.start_price) if stock.start_price else 0.0
-            except (ValueError, TypeError):
-                current = 0.0
-                start = 0.0
-
-            # Calculate daily change based on start_price (which is yesterday's closing price)
-            if start > 0:
-                daily_change = current - start
-                try:
-                    daily_change_percent = (daily_change / start) * 100 if start != 0 else None
-                except Exception:
-                    daily_change_percent = None
-            else:
-                daily_change = None
-                daily_change_percent = None
-
-            data = {
-                "ticker": stock.ticker,
-                "name": stock.name,
-                "start_price": start,  # Yesterday's closing price (updated daily)
-                "current_price": current,  # Current price
-                "daily_change": daily_change,
-                "daily_change_percent": daily_change_percent,
-            }
-            stocks.append(data)
-
-        # Always return the stocks data, even if empty
-        return Response(stocks, status=200)
+        # Prices are refreshed by the background refresher (manage.py refresh_prices), which
+        # publishes the board snapshot every worker serves. The body is pre-rendered, and
+        # clients that already have this version get a 304.
+        board = get_board()
+        response = HttpResponse(board['body'], content_type='application/json')
+        response['ETag'] = board['etag']
+        response['Last-Modified'] = http_date(board['last_modified'])
+        response['Cache-Control'] = 'no-cache'
+        return get_conditional_response(
+            request, etag=board['etag'], last_modified=int(board['last_modified']), response=response,
+        )
 
 
 class ViewAllOwnedStocks(generics.ListCreateAPIView):
@@ -115,6 +80,9 @@ class LeagueView(generics.ListCreateAPIView):
         leagueUserData.sort(key=lambda x: x['net_worth'], reverse=True)
         return Response(leagueUserData)
 
+LEAGUE_LIST_MAX_PAGE_SIZE = 500
+
+
 class ViewAllLeagues(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     queryset = League.objects.all()
@@ -123,7 +91,16 @@ class ViewAllLeagues(generics.ListCreateAPIView):
     def get(self, request, *args, **kwargs):
         from api.apiUtils.leagueUtils import get_user_leagues_data
         
-        response_data = get_user_leagues_data(request.user)
+        # Optional keyset pagination for the superuser listing: ?limit=100&after=<next_cursor>
+        try:
+            after = request.query_params.get('after')
+            after = int(after) if after else None
+            limit = request.query_params.get('limit')
+            limit = min(max(int(limit), 1), LEAGUE_LIST_MAX_PAGE_SIZE) if limit else None
+        except ValueError:
+            return Response({'error': 'after and limit must be integers'}, status=400)
+
+        response_data = get_user_leagues_data(request.user, after=after, limit=limit)
         return Response(response_data)
     
     def post(self, request, *args, **kwargs):
@@ -136,6 +113,7 @@ class ViewAllLeagues(generics.ListCreateAPIView):
 class JoinLeagueView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent('join_league')
     def post(self, request, *args, **kwargs):
         try:
             league_id = request.data.get('league_id')
@@ -152,6 +130,7 @@ class JoinLeagueView(generics.CreateAPIView):
 class BuyStockView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent('buy_stock')
     def post(self, request, *args, **kwargs):
         try:
             from api.apiUtils.buySellStock import buy_stock
@@ -175,6 +154,7 @@ class BuyStockView(generics.CreateAPIView):
 class SellStockView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent('sell_stock')
     def post(self, request, *args, **kwargs):
         try:
             from api.apiUtils.buySellStock import sell_stock
@@ -195,39 +175,49 @@ class SellStockView(generics.CreateAPIView):
             return Response({'error': f'An error occurred: {str(e)}'}, status=500)
 
 
+class BatchTradeView(generics.CreateAPIView):
+    permission_classes = [IsAuthenticated]
+
+    @idempotent('batch_trade')
+    def post(self, request, *args, **kwargs):
+        """Buy and sell several stocks in one league at once.
+        Body: {"league_id": ..., "all_or_nothing": true,
+               "orders": [{"ticker": "AAPL", "side": "sell", "shares": 2}, {"ticker": "MSFT", "side": "buy", "shares": 1}]}
+        Answers 200 when every order executed. If any failed: 400 with nothing executed when
+        all_or_nothing, otherwise 207 with the other orders executed. Check each result's
+        success/status, or the top-level executed/failed counts."""
+        try:
+            from api.apiUtils.buySellStock import batch_trade
+
+            league_id = request.data.get('league_id')
+            if not league_id:
+                return Response({'error': 'league_id is required'}, status=400)
+
+            all_or_nothing = request.data.get('all_or_nothing', True)
+            if not isinstance(all_or_nothing, bool):
+                return Response({'error': 'all_or_nothing must be true or false'}, status=400)
+
+            success, response_data, status_code = batch_trade(
+                league_id, request.user, request.data.get('orders'), all_or_nothing=all_or_nothing
+            )
+            return Response(response_data, status=status_code)
+        except Exception as e:
+            import traceback
+            print(f"Error executing batch trade: {str(e)}")
+            print(traceback.format_exc())
+            return Response({'error': f'An error occurred: {str(e)}'}, status=500)
+
+
 class GetLeagueLeaderboardView(generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, league_id, format=None):
         """Get the leaderboard for a league sorted by net worth"""
+        from api.apiUtils.leagueUtils import get_league_leaderboard_data
+
         try:
-            league = League.objects.get(league_id=league_id)
-            
-            # Verify user is a participant
-            try:
-                user_participant = LeagueParticipant.objects.get(league=league, user=request.user)
-            except LeagueParticipant.DoesNotExist:
-                return Response({'error': 'You are not a participant in this league'}, status=404)
-            
-            # Get all participants
-            participants = league.participants.all()
-            
-            leaderboard_data = []
-            for participant in participants:
-                net_worth = getTotalStockValue(league_id, participant.user) + float(participant.current_balance)
-                leaderboard_data.append({
-                    'username': participant.user.username,
-                    'net_worth': round(net_worth, 2),
-                    'is_current_user': participant == user_participant,
-                })
-            
-            # Sort by net worth descending
-            leaderboard_data.sort(key=lambda x: x['net_worth'], reverse=True)
-            
-            return Response({'leaderboard': leaderboard_data}, status=200)
-            
-        except League.DoesNotExist:
-            return Response({'error': 'League not found'}, status=404)
+            success, response_data, status_code = get_league_leaderboard_data(league_id, request.user)
+            return Response(response_data, status=status_code)
         except Exception as e:
             import traceback
             print(f"Error getting league leaderboard: {str(e)}")
@@ -235,6 +225,107 @@ class GetLeagueLeaderboardView(generics.RetrieveAPIView):
             return Response({'error': f'An error occurred: {str(e)}'}, status=500)
 
 
+class LeagueBatchView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, league_id, format=None):
+        """Answer several reads for one league at once.
+        Body: {"requests": [{"type": "owned_stocks"}, {"type": "leaderboard"},
+                            {"type": "stock_info", "ticker": "AAPL"}]}"""
+        from api.apiUtils.leagueUtils import get_league_batch_data
+
+        try:
+            success, response_data, status_code = get_league_batch_data(league_id, request.user, request.data.get('requests'))
+            return Response(response_data, status=status_code)
+        except Exception as e:
+            import traceback
+            print(f"Error in league batch request: {str(e)}")
+            print(traceback.format_exc())
+            return Response({'error': f'An error occurred: {str(e)}'}, status=500)
+
+
+class LeagueTradesView(generics.RetrieveAPIView):
+    permission_classes = [IsAuthenticated]
+    mine = False
+
+    def get(self, request, league_id, format=None):
+        """Get the league's trade history (or the user's own, for MyLeagueTradesView), newest first.
+        Pagination: ?limit=50&before=<next_cursor>"""
+        from api.apiUtils.tradeHistory import get_trade_history_data, TRADE_HISTORY_MAX_PAGE_SIZE
+
+        try:
+            before = request.query_params.get('before')
+            before = int(before) if before else None
+            limit = request.query_params.get('limit')
+            limit = min(max(int(limit), 1), TRADE_HISTORY_MAX_PAGE_SIZE) if limit else None
+        except ValueError:
+            return Response({'error': 'before and limit must be integers'}, status=400)
+
+        try:
+            success, response_data, status_code = get_trade_history_data(
+                league_id, request.user, mine=self.mine, before=before, limit=limit
+            )
+            return Response(response_data, status=status_code)
+        except Exception as e:
+            import traceback
+            print(f"Error getting trade history: {str(e)}")
+            print(traceback.format_exc())
+            return Response({'error': f'An error occurred: {str(e)}'}, status=500)
+
+
+class MyLeagueTradesView(LeagueTradesView):
+    mine = True
+
+
+class LeagueOrdersView(generics.ListCreateAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, league_id, format=None):
+        """Get the user's limit/stop orders in the league (?status=open to filter)"""
+        from api.apiUtils.orders import get_orders_data
+
+        try:
+            success, response_data, status_code = get_orders_data(league_id, request.user, request.query_params.get('status'))
+            return Response(response_data, status=status_code)
+        except Exception as e:
+            import traceback
+            print(f"Error getting orders: {str(e)}")
+            print(traceback.format_exc())
+            return Response({'error': f'An error occurred: {str(e)}'}, status=500)
+
+    @idempotent('place_order')
+    def post(self, request, league_id, format=None):
+        """Place a limit or stop order.
+        Body: {"ticker": "AAPL", "side": "buy", "order_type": "limit", "shares": 5, "trigger_price": 180}"""
+        from api.apiUtils.orders import place_order
+
+        try:
+            success, response_data, status_code = place_order(league_id, request.user, request.data)
+            return Response(response_data, status=status_code)
+        except Exception as e:
+            import traceback
+            print(f"Error placing order: {str(e)}")
+            print(traceback.format_exc())
+            return Response({'error': f'An error occurred: {str(e)}'}, status=500)
+
+
+class CancelOrderView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, order_id, format=None):
+        """Cancel an open order"""
+        from api.apiUtils.orders import cancel_order
+
+        try:
+            success, response_data, status_code = cancel_order(order_id, request.user)
+            return Response(response_data, status=status_code)
+        except Exception as e:
+            import traceback
+            print(f"Error cancelling order: {str(e)}")
+            print(traceback.format_exc())
+            return Response({'error': f'An error occurred: {str(e)}'}, status=500)
+
+
 class SetLeagueStartDateView(generics.UpdateAPIView):
     permission_classes = [IsAuthenticated]
 
@@ -244,11 +335,10 @@ class SetLeagueStartDateView(generics.UpdateAPIView):
             from datetime import datetime
             from catalog.models import LeagueParticipant
             
-            league = League.objects.get(league_id=league_id)
-            
             # Check if user is a participant and admin
             try:
-                participant = LeagueParticipant.objects.get(league=league, user=request.user)
+                participant = resolve_participant(league_id, request.user)
+                league = participant.league
                 if not participant.leagueAdmin:
                     return Response({'error': 'Only league admins can set dates'}, status=403)
             except LeagueParticipant.DoesNotExist:
@@ -305,10 +395,9 @@ class DeleteLeagueView(generics.DestroyAPIView):
     def delete(self, request, league_id, *args, **kwargs):
         """Delete a league (requires league admin or superuser)"""
         try:
-            league = League.objects.get(league_id=league_id)
-            
             # Check if user is superuser - superusers can delete any league
             if request.user.is_superuser:
+                league = resolve_league(league_id)
                 league_name = league.name
                 league.delete()
                 return Response({
@@ -317,11 +406,12 @@ class DeleteLeagueView(generics.DestroyAPIView):
             
             # Check if user is a participant and admin
             try:
-                participant = LeagueParticipant.objects.get(league=league, user=request.user)
+                participant = resolve_participant(league_id, request.user)
                 if not participant.leagueAdmin:
                     return Response({'error': 'Only league admins can delete leagues'}, status=403)
                 
                 # Admin can delete their league
+                league = participant.league
                 league_name = league.name
                 league.delete()
                 return Response({
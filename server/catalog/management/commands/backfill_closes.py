@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from catalog.models import Stock
+from catalog.price_history import backfill_daily_closes
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfills the local daily-close index. Safe to re-run: each ticker resumes from the "
+        "last stored day, and tickers that are already up to date make no API calls."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('tickers', nargs='*', help='Tickers to backfill (default: every stock)')
+        parser.add_argument(
+            '--days', type=int, default=settings.DAILY_CLOSE_BACKFILL_DAYS,
+            help='History depth for tickers that have never been backfilled (default: DAILY_CLOSE_BACKFILL_DAYS)',
+        )
+
+    def handle(self, *args, **options):
+        tickers = options['tickers'] or list(Stock.objects.values_list('ticker', flat=True))
+        for ticker in tickers:
+            try:
+                stored = backfill_daily_closes(ticker, days=options['days'])
+                self.stdout.write(f"{ticker}: stored {stored} closes")
+            except RuntimeError as e:
+                # Leave this ticker for the next run
+                self.stderr.write(f"{ticker}: backfill failed: {e}")
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from catalog.trade_ledger import rebuild_positions
+from catalog.valuations import recompute_valuations
+
+
+class Command(BaseCommand):
+    help = (
+        "Replays the trade ledger in one streaming pass and reports every balance or position "
+        "that doesn't match it. With --apply the stored rows are corrected to the ledger."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--apply', action='store_true', help='Rewrite mismatched balances and positions from the ledger')
+
+    def handle(self, *args, **options):
+        differences = rebuild_positions(apply=options['apply'])
+        for difference in differences:
+            self.stdout.write(difference)
+        if options['apply'] and differences:
+            recompute_valuations()
+        self.stdout.write(
+            f"{len(differences)} difference(s) {'corrected' if options['apply'] else 'found'}"
+        )
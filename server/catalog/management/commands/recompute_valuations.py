@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from catalog.models import League
+from catalog.valuations import recompute_valuations
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds every participant valuation (cash, holdings value, net worth, rank) from the "
+        "stored balances, holdings and prices. Run periodically to correct any drift in the "
+        "incrementally maintained values."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('league_ids', nargs='*', help='League UUIDs to recompute (default: all leagues)')
+
+    def handle(self, *args, **options):
+        league_ids = None
+        if options['league_ids']:
+            league_ids = list(League.objects.filter(league_id__in=options['league_ids']).values_list('id', flat=True))
+        written = recompute_valuations(league_ids)
+        self.stdout.write(f"Recomputed {written} valuations")
@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from catalog.providers import breaker_states
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the background stock price refresher. Refreshes prices every --interval seconds "
+        "so API requests only ever read stored prices."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=settings.STOCK_REFRESH_INTERVAL,
+            help='Seconds between refresh attempts (default: STOCK_REFRESH_INTERVAL)',
+        )
+        parser.add_argument('--once', action='store_true', help='Run a single refresh and exit')
+        parser.add_argument('--force', action='store_true', help='Refresh on every cycle while the market is open instead of at 5-minute intervals')
+
+    def handle(self, *args, **options):
+        import update_stocks as update_stocks_module
+
+        interval = options['interval']
+        while True:
+            started = time.monotonic()
+            try:
+                updated = update_stocks_module.update_stocks(force=options['force'])
+                self.stdout.write(
+                    f"Price refresh {'ran' if updated else 'skipped'} in {time.monotonic() - started:.1f}s "
+                    f"(coalesced so far: {update_stocks_module.refresh_flight.stats()['coalesced']})"
+                )
+            except Exception as e:
+                # Keep the refresher alive; the next cycle retries
+                self.stderr.write(f"Price refresh failed: {e}")
+
+            for provider, breaker in breaker_states().items():
+                if breaker['state'] != 'closed':
+                    self.stderr.write(f"Provider {provider} circuit {breaker['state']} (tripped {breaker['trips']} times)")
+
+            if options['once']:
+                return
+            time.sleep(max(interval - (time.monotonic() - started), 0))
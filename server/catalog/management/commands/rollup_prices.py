@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from catalog.price_history import compact_ticks, rollup_ticks
+
+
+class Command(BaseCommand):
+    help = "Rolls intraday price ticks up into 5-minute and daily OHLC bars and compacts old ticks."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since-days', type=int, default=1,
+            help='Rebuild bars for ticks from this many days back (default: 1)',
+        )
+        parser.add_argument(
+            '--retention-days', type=int, default=settings.PRICE_TICK_RETENTION_DAYS,
+            help='Delete raw ticks older than this many days after rolling them up (default: PRICE_TICK_RETENTION_DAYS)',
+        )
+
+    def handle(self, *args, **options):
+        bars = rollup_ticks(start=timezone.now() - timedelta(days=options['since_days']))
+        deleted = compact_ticks(options['retention_days'])
+        self.stdout.write(f"Wrote {bars} bars, compacted {deleted} ticks")
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.23 on 2026-10-17 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0012_alter_stock_start_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apicalltracker',
+            name='day_call_count',
+            field=models.IntegerField(default=0, help_text='Number of API credits used in current day (UTC)'),
+        ),
+        migrations.AddField(
+            model_name='apicalltracker',
+            name='day_window_start',
+            field=models.DateField(blank=True, help_text='Day (UTC) the daily credit count applies to', null=True),
+        ),
+        migrations.AlterField(
+            model_name='apicalltracker',
+            name='api_call_count',
+            field=models.IntegerField(default=0, help_text='Number of API credits used in current minute window'),
+        ),
+        migrations.AlterField(
+            model_name='apicalltracker',
+            name='window_start_time',
+            field=models.DateTimeField(blank=True, help_text='Start time of current minute window', null=True),
+        ),
+    ]
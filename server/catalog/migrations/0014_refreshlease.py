@@ -0,0 +1,21 @@
+# Generated by Django 4.2.23 on 2026-10-17 00:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0013_apicalltracker_daily_window'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RefreshLease',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('owner', models.CharField(blank=True, default='', help_text='Process/thread currently holding the lease', max_length=200)),
+                ('expires_at', models.DateTimeField(blank=True, help_text='Lease is free once this time has passed', null=True)),
+            ],
+        ),
+    ]
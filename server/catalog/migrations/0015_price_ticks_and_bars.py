@@ -0,0 +1,43 @@
+# Generated by Django 4.2.23 on 2026-10-17 00:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0014_refreshlease'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceBar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=10)),
+                ('interval', models.CharField(choices=[('5m', '5 minutes'), ('1d', '1 day')], max_length=2)),
+                ('bucket', models.DateTimeField(help_text="Start of the bar's time bucket (UTC)")),
+                ('open', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('high', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('low', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('close', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('tick_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PriceTick',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=10)),
+                ('timestamp', models.DateTimeField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ticker', 'timestamp'], name='pricetick_ticker_ts_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='pricebar',
+            constraint=models.UniqueConstraint(fields=('ticker', 'interval', 'bucket'), name='unique_price_bar'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.23 on 2026-10-17 00:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0015_price_ticks_and_bars'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyClose',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=10)),
+                ('date', models.DateField()),
+                ('close', models.DecimalField(decimal_places=2, max_digits=10)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyCloseBackfill',
+            fields=[
+                ('ticker', models.CharField(max_length=10, primary_key=True, serialize=False)),
+                ('covered_through', models.DateField(help_text='Every trading day up to and including this date is stored')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dailyclose',
+            constraint=models.UniqueConstraint(fields=('ticker', 'date'), name='unique_daily_close'),
+        ),
+    ]
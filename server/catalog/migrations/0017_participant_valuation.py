@@ -0,0 +1,54 @@
+# Generated by Django 4.2.23 on 2026-10-17 00:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_valuations(apps, schema_editor):
+    """Values existing participants at the stored prices; ranks are filled in on the next
+    price refresh or recompute_valuations run."""
+    LeagueParticipant = apps.get_model('catalog', 'LeagueParticipant')
+    UserLeagueStock = apps.get_model('catalog', 'UserLeagueStock')
+    ParticipantValuation = apps.get_model('catalog', 'ParticipantValuation')
+
+    holdings = {}
+    for holding in UserLeagueStock.objects.select_related('stock'):
+        holdings[holding.league_participant_id] = (
+            holdings.get(holding.league_participant_id, 0) + holding.shares * holding.stock.current_price
+        )
+    ParticipantValuation.objects.bulk_create([
+        ParticipantValuation(
+            participant_id=participant.id,
+            league_id=participant.league_id,
+            cash=participant.current_balance,
+            holdings_value=holdings.get(participant.id, 0),
+            net_worth=participant.current_balance + holdings.get(participant.id, 0),
+        )
+        for participant in LeagueParticipant.objects.all()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0016_daily_close_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParticipantValuation',
+            fields=[
+                ('participant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='valuation', serialize=False, to='catalog.leagueparticipant')),
+                ('cash', models.DecimalField(decimal_places=4, default=0, max_digits=16)),
+                ('holdings_value', models.DecimalField(decimal_places=4, default=0, max_digits=16)),
+                ('net_worth', models.DecimalField(decimal_places=4, default=0, max_digits=16)),
+                ('rank', models.PositiveIntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('league', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='valuations', to='catalog.league')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['league', '-net_worth'], name='valuation_league_worth_idx')],
+            },
+        ),
+        migrations.RunPython(create_valuations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.23 on 2026-10-17 00:57
+
+from django.db import migrations, models
+
+
+def merge_duplicate_positions(apps, schema_editor):
+    """Folds duplicate positions into one row with the combined shares and weighted average price."""
+    UserLeagueStock = apps.get_model('catalog', 'UserLeagueStock')
+    positions = {}
+    for position in UserLeagueStock.objects.order_by('id'):
+        key = (position.league_participant_id, position.stock_id)
+        kept = positions.get(key)
+        if kept is None:
+            positions[key] = position
+            continue
+        shares = kept.shares + position.shares
+        if shares > 0:
+            kept.avg_price_per_share = (
+                kept.avg_price_per_share * kept.shares + position.avg_price_per_share * position.shares
+            ) / shares
+        kept.shares = shares
+        kept.save()
+        position.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0017_participant_valuation'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_positions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='userleaguestock',
+            constraint=models.UniqueConstraint(fields=('league_participant', 'stock'), name='unique_participant_stock'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.23 on 2026-10-17 00:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0018_unique_participant_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trade',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=10)),
+                ('side', models.CharField(choices=[('buy', 'Buy'), ('sell', 'Sell')], max_length=4)),
+                ('shares', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('amount', models.DecimalField(decimal_places=2, help_text='Cash paid (buy) or received (sell)', max_digits=12)),
+                ('executed_at', models.DateTimeField(auto_now_add=True)),
+                ('league', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trades', to='catalog.league')),
+                ('participant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trades', to='catalog.leagueparticipant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['participant', '-id'], name='trade_participant_id_idx'), models.Index(fields=['league', '-id'], name='trade_league_id_idx')],
+            },
+        ),
+    ]
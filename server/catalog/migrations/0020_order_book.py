@@ -0,0 +1,36 @@
+# Generated by Django 4.2.23 on 2026-10-17 01:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0019_trade_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=10)),
+                ('side', models.CharField(choices=[('buy', 'Buy'), ('sell', 'Sell')], max_length=4)),
+                ('order_type', models.CharField(choices=[('limit', 'Limit'), ('stop', 'Stop')], max_length=5)),
+                ('shares', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('trigger_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('trigger_on', models.CharField(choices=[('fall', 'Price at or below trigger'), ('rise', 'Price at or above trigger')], editable=False, max_length=4)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('filled', 'Filled'), ('cancelled', 'Cancelled'), ('rejected', 'Rejected')], default='open', max_length=9)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('reason', models.CharField(blank=True, help_text='Why the order was rejected', max_length=200)),
+                ('league', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='orders', to='catalog.league')),
+                ('participant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='orders', to='catalog.leagueparticipant')),
+                ('trade', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order', to='catalog.trade')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status', 'open')), fields=['ticker', 'trigger_on', 'trigger_price'], name='order_open_trigger_idx'), models.Index(fields=['participant', '-id'], name='order_participant_id_idx')],
+            },
+        ),
+    ]
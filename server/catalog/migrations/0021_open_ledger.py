@@ -0,0 +1,62 @@
+# Generated by Django 4.2.23 on 2026-10-17 01:11
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import migrations, models
+
+# catalog.trade_ledger.STARTING_BALANCE when this migration was written
+STARTING_BALANCE = Decimal('10000.00')
+
+
+def open_ledger(apps, schema_editor):
+    """Writes opening entries so the ledger accounts for state that predates it: for every
+    participant, whatever part of the current balance and positions the recorded trades don't
+    explain becomes one opening cash row and one opening row per position (at its average price).
+    Participants whose state the ledger already explains get no rows."""
+    LeagueParticipant = apps.get_model('catalog', 'LeagueParticipant')
+    UserLeagueStock = apps.get_model('catalog', 'UserLeagueStock')
+    Trade = apps.get_model('catalog', 'Trade')
+
+    traded_cash = {}
+    traded_shares = {}
+    for participant_id, ticker, side, shares, amount in Trade.objects.values_list(
+        'participant_id', 'ticker', 'side', 'shares', 'amount'
+    ).iterator(chunk_size=2000):
+        sign = 1 if side == 'buy' else -1
+        traded_cash[participant_id] = traded_cash.get(participant_id, Decimal('0')) - sign * amount
+        traded_shares[(participant_id, ticker)] = traded_shares.get((participant_id, ticker), Decimal('0')) + sign * shares
+
+    entries = []
+    for participant in LeagueParticipant.objects.all().iterator(chunk_size=2000):
+        cash = participant.current_balance - STARTING_BALANCE - traded_cash.get(participant.id, Decimal('0'))
+        if cash:
+            entries.append(Trade(
+                participant_id=participant.id, league_id=participant.league_id, ticker='', side='open',
+                shares=Decimal('0'), price=Decimal('0'), amount=cash,
+            ))
+    for holding in UserLeagueStock.objects.select_related('league_participant').iterator(chunk_size=2000):
+        participant_id = holding.league_participant_id
+        shares = holding.shares - traded_shares.get((participant_id, holding.stock_id), Decimal('0'))
+        if shares > 0:
+            entries.append(Trade(
+                participant_id=participant_id, league_id=holding.league_participant.league_id,
+                ticker=holding.stock_id, side='open', shares=shares, price=holding.avg_price_per_share,
+                amount=(shares * holding.avg_price_per_share).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+            ))
+    Trade.objects.bulk_create(entries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0020_order_book'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='trade',
+            name='side',
+            field=models.CharField(choices=[('buy', 'Buy'), ('sell', 'Sell'), ('open', 'Opening balance')], max_length=4),
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
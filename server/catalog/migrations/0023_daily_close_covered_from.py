@@ -0,0 +1,33 @@
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def set_covered_from(apps, schema_editor):
+    """Existing backfills are known to cover everything from their earliest stored close."""
+    DailyClose = apps.get_model('catalog', 'DailyClose')
+    DailyCloseBackfill = apps.get_model('catalog', 'DailyCloseBackfill')
+    earliest = dict(DailyClose.objects.values('ticker').annotate(first=Min('date')).values_list('ticker', 'first'))
+    for state in DailyCloseBackfill.objects.all():
+        state.covered_from = earliest.get(state.ticker, state.covered_through)
+        state.save(update_fields=['covered_from'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0022_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyclosebackfill',
+            name='covered_from',
+            field=models.DateField(null=True, help_text='Every trading day from this date on is stored'),
+        ),
+        migrations.RunPython(set_covered_from, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='dailyclosebackfill',
+            name='covered_from',
+            field=models.DateField(help_text='Every trading day from this date on is stored'),
+        ),
+    ]
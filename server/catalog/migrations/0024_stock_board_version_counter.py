@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-17 01:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0023_daily_close_covered_from'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='refreshlease',
+            name='counter',
+            field=models.PositiveBigIntegerField(default=0, help_text='Sequence bumped with F() updates (e.g. the stock board version)'),
+        ),
+    ]
@@ -9,6 +9,7 @@ from django.urls import reverse # Used in get_absolute_url() to get URL for spec
 from django.db.models import UniqueConstraint # Constrains fields to unique values
 from django.db.models.functions import Lower # Returns lower cased value of field
 from django.contrib.auth.models import User # Use django user
+from django.core.serializers.json import DjangoJSONEncoder
     
 class Stock(models.Model):
     """Model representing a specific stock."""
@@ -27,11 +28,84 @@ class Stock(models.Model):
         return (self.current_price - self.start_price) * self.shares
 
 
+class PriceTick(models.Model):
+    """Append-only price observation recorded for each ticker on every refresh."""
+    ticker = models.CharField(max_length=10)
+    timestamp = models.DateTimeField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        indexes = [models.Index(fields=['ticker', 'timestamp'], name='pricetick_ticker_ts_idx')]
+
+    def __str__(self):
+        return f"{self.ticker} @ {self.timestamp}: {self.price}"
+
+
+class PriceBar(models.Model):
+    """OHLC bar rolled up from PriceTick rows (see catalog.price_history)."""
+    FIVE_MINUTES = '5m'
+    DAILY = '1d'
+    INTERVAL_CHOICES = [
+        (FIVE_MINUTES, '5 minutes'),
+        (DAILY, '1 day'),
+    ]
+
+    ticker = models.CharField(max_length=10)
+    interval = models.CharField(max_length=2, choices=INTERVAL_CHOICES)
+    bucket = models.DateTimeField(help_text="Start of the bar's time bucket (UTC)")
+    open = models.DecimalField(max_digits=10, decimal_places=2)
+    high = models.DecimalField(max_digits=10, decimal_places=2)
+    low = models.DecimalField(max_digits=10, decimal_places=2)
+    close = models.DecimalField(max_digits=10, decimal_places=2)
+    tick_count = models.IntegerField(default=0)
+
+    class Meta:
+        # Also serves as the (ticker, bucket) lookup index for a given interval
+        constraints = [
+            UniqueConstraint(fields=['ticker', 'interval', 'bucket'], name='unique_price_bar'),
+        ]
+
+    def __str__(self):
+        return f"{self.ticker} {self.interval} {self.bucket}: O{self.open} H{self.high} L{self.low} C{self.close}"
+
+
+class DailyClose(models.Model):
+    """Official daily closing price. Closes never change once the day is over, so this index
+    answers historical close lookups without calling the provider."""
+    ticker = models.CharField(max_length=10)
+    date = models.DateField()
+    close = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        # Also the index for "latest close on or before a date" lookups
+        constraints = [
+            UniqueConstraint(fields=['ticker', 'date'], name='unique_daily_close'),
+        ]
+
+    def __str__(self):
+        return f"{self.ticker} close on {self.date}: {self.close}"
+
+
+class DailyCloseBackfill(models.Model):
+    """Tracks how far the DailyClose index is complete for each ticker, so backfills resume
+    where they stopped and lookups know when the index can be trusted."""
+    ticker = models.CharField(primary_key=True, max_length=10)
+    covered_from = models.DateField(help_text="Every trading day from this date on is stored")
+    covered_through = models.DateField(help_text="Every trading day up to and including this date is stored")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.ticker} closes stored from {self.covered_from} through {self.covered_through}"
+
+
 class ApiCallTracker(models.Model):
-    """Singleton model to track API call limits (max 5 calls per 30 minutes)."""
+    """Singleton model holding the shared provider API credit budget (per-minute and per-day windows).
+    Updated atomically by catalog.rate_limiter so every worker process draws from one budget."""
     id = models.IntegerField(primary_key=True, default=1, editable=False)
-    api_call_count = models.IntegerField(default=0, help_text="Number of API calls in current window")
-    window_start_time = models.DateTimeField(null=True, blank=True, help_text="Start time of current 30-minute window")
+    api_call_count = models.IntegerField(default=0, help_text="Number of API credits used in current minute window")
+    window_start_time = models.DateTimeField(null=True, blank=True, help_text="Start time of current minute window")
+    day_call_count = models.IntegerField(default=0, help_text="Number of API credits used in current day (UTC)")
+    day_window_start = models.DateField(null=True, blank=True, help_text="Day (UTC) the daily credit count applies to")
     last_api_call_time = models.DateTimeField(null=True, blank=True, help_text="Timestamp of the last API call")
     
     class Meta:
@@ -39,7 +113,7 @@ class ApiCallTracker(models.Model):
         verbose_name_plural = "API Call Tracker"
     
     def __str__(self):
-        return f"API Calls: {self.api_call_count}/5 (Window started: {self.window_start_time})"
+        return f"API Credits: {self.api_call_count} this minute, {self.day_call_count} today (Window started: {self.window_start_time})"
     
     @classmethod
     def get_instance(cls):
@@ -47,6 +121,18 @@ class ApiCallTracker(models.Model):
         instance, created = cls.objects.get_or_create(id=1)
         return instance
     
+
+
+class RefreshLease(models.Model):
+    """Cross-process lease so only one worker runs a given refresh at a time (see catalog.single_flight)."""
+    name = models.CharField(primary_key=True, max_length=50)
+    owner = models.CharField(max_length=200, blank=True, default='', help_text="Process/thread currently holding the lease")
+    expires_at = models.DateTimeField(null=True, blank=True, help_text="Lease is free once this time has passed")
+    counter = models.PositiveBigIntegerField(default=0, help_text="Sequence bumped with F() updates (e.g. the stock board version)")
+
+    def __str__(self):
+        return f"{self.name} held by {self.owner or 'nobody'} until {self.expires_at}"
+    
     
 class League(models.Model):
     """Model representing the settings for the league"""
@@ -75,7 +161,10 @@ class League(models.Model):
     
     @property
     def participant_count(self):
-        """Get the number of participants in the league"""
+        """Get the number of participants in the league.
+        Uses the num_participants annotation when the league was loaded with one."""
+        if hasattr(self, 'num_participants'):
+            return self.num_participants
         return self.participants.count()
     
     def can_set_start_date(self):
@@ -106,6 +195,12 @@ class UserLeagueStock(models.Model):
     avg_price_per_share = models.DecimalField(decimal_places=2, default=0.00, max_digits=10)  # Average purchase price
     shares = models.DecimalField(decimal_places=2, default=0.01, max_digits=10)
 
+    class Meta:
+        constraints = [
+            # One position per stock, so concurrent buys update the same row
+            UniqueConstraint(fields=['league_participant', 'stock'], name='unique_participant_stock'),
+        ]
+
     def __str__(self):
         return f"{self.league_participant} in {self.stock}"
     
@@ -116,3 +211,137 @@ class UserLeagueStock(models.Model):
         if self.avg_price_per_share == 0:
             return 0
         return (self.stock.current_price - self.avg_price_per_share) * self.shares
+
+
+class ParticipantValuation(models.Model):
+    """Materialized net worth of a league participant, kept current incrementally:
+    trades adjust cash and holdings by the trade amount, price refreshes add each holder's
+    per-ticker price delta. catalog.valuations.recompute_valuations rebuilds it from scratch."""
+    participant = models.OneToOneField(LeagueParticipant, on_delete=models.CASCADE, primary_key=True, related_name='valuation')
+    league = models.ForeignKey(League, on_delete=models.CASCADE, related_name='valuations')
+    cash = models.DecimalField(max_digits=16, decimal_places=4, default=0)
+    holdings_value = models.DecimalField(max_digits=16, decimal_places=4, default=0)
+    net_worth = models.DecimalField(max_digits=16, decimal_places=4, default=0)
+    rank = models.PositiveIntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['league', '-net_worth'], name='valuation_league_worth_idx')]
+
+    def __str__(self):
+        return f"{self.participant_id}: {self.net_worth} (#{self.rank})"
+
+
+class Trade(models.Model):
+    """Append-only ledger of executed trades, written in the same transaction as the trade.
+    Positions and balances can be rebuilt from it (manage.py rebuild_positions)."""
+    BUY = 'buy'
+    SELL = 'sell'
+    # Opening state of a participant that predates the ledger (migration 0021): one row per
+    # position (shares at avg price) and one cash row (ticker '', amount = cash adjustment)
+    OPEN = 'open'
+    SIDE_CHOICES = [(BUY, 'Buy'), (SELL, 'Sell'), (OPEN, 'Opening balance')]
+
+    participant = models.ForeignKey(LeagueParticipant, on_delete=models.CASCADE, related_name='trades')
+    league = models.ForeignKey(League, on_delete=models.CASCADE, related_name='trades')
+    ticker = models.CharField(max_length=10)
+    side = models.CharField(max_length=4, choices=SIDE_CHOICES)
+    shares = models.DecimalField(max_digits=10, decimal_places=2)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, help_text="Cash paid (buy) or received (sell)")
+    executed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination (newest first) per participant and per league
+            models.Index(fields=['participant', '-id'], name='trade_participant_id_idx'),
+            models.Index(fields=['league', '-id'], name='trade_league_id_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValidationError("Trades are append-only and cannot be modified")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.side} {self.shares} {self.ticker} @ {self.price}"
+
+
+class Order(models.Model):
+    """Resting limit or stop order, filled at the refreshed price once its trigger price is
+    crossed (catalog.order_book). Buy limits and sell stops fire when the price falls to the
+    trigger, sell limits and buy stops when it rises to it; trigger_on stores that direction so
+    open orders can be range-scanned per ticker on the partial trigger index."""
+    BUY = Trade.BUY
+    SELL = Trade.SELL
+    SIDE_CHOICES = [(BUY, 'Buy'), (SELL, 'Sell')]
+    LIMIT = 'limit'
+    STOP = 'stop'
+    ORDER_TYPE_CHOICES = [(LIMIT, 'Limit'), (STOP, 'Stop')]
+    FALL = 'fall'
+    RISE = 'rise'
+    TRIGGER_CHOICES = [(FALL, 'Price at or below trigger'), (RISE, 'Price at or above trigger')]
+    OPEN = 'open'
+    FILLED = 'filled'
+    CANCELLED = 'cancelled'
+    REJECTED = 'rejected'
+    STATUS_CHOICES = [(OPEN, 'Open'), (FILLED, 'Filled'), (CANCELLED, 'Cancelled'), (REJECTED, 'Rejected')]
+
+    participant = models.ForeignKey(LeagueParticipant, on_delete=models.CASCADE, related_name='orders')
+    league = models.ForeignKey(League, on_delete=models.CASCADE, related_name='orders')
+    ticker = models.CharField(max_length=10)
+    side = models.CharField(max_length=4, choices=SIDE_CHOICES)
+    order_type = models.CharField(max_length=5, choices=ORDER_TYPE_CHOICES)
+    shares = models.DecimalField(max_digits=10, decimal_places=2)
+    trigger_price = models.DecimalField(max_digits=10, decimal_places=2)
+    trigger_on = models.CharField(max_length=4, choices=TRIGGER_CHOICES, editable=False)
+    status = models.CharField(max_length=9, choices=STATUS_CHOICES, default=OPEN)
+    created_at = models.DateTimeField(auto_now_add=True)
+    closed_at = models.DateTimeField(null=True, blank=True)
+    trade = models.OneToOneField(Trade, on_delete=models.SET_NULL, null=True, blank=True, related_name='order')
+    reason = models.CharField(max_length=200, blank=True, help_text="Why the order was rejected")
+
+    class Meta:
+        indexes = [
+            # Only open orders are indexed, sorted by trigger price within each ticker and direction
+            models.Index(
+                fields=['ticker', 'trigger_on', 'trigger_price'], name='order_open_trigger_idx',
+                condition=models.Q(status='open'),
+            ),
+            models.Index(fields=['participant', '-id'], name='order_participant_id_idx'),
+        ]
+
+    @staticmethod
+    def trigger_direction(side, order_type):
+        if (side == Order.BUY) == (order_type == Order.LIMIT):
+            return Order.FALL
+        return Order.RISE
+
+    def save(self, *args, **kwargs):
+        self.trigger_on = self.trigger_direction(self.side, self.order_type)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.side} {self.order_type} {self.shares} {self.ticker} @ {self.trigger_price} ({self.status})"
+
+
+class IdempotencyKey(models.Model):
+    """First response to a request carrying an Idempotency-Key (see api.idempotency).
+    Inserting the row claims the key: the unique constraint lets exactly one request per
+    (user, scope, key) run. status_code stays null while it runs; the response is stored when
+    it finishes and replayed to retries until expires_at."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    scope = models.CharField(max_length=50, help_text="Endpoint the key was used on")
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64, help_text="SHA-256 of the request body")
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    locked_until = models.DateTimeField(help_text="A running request holds the key until then")
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [UniqueConstraint(fields=['user', 'scope', 'key'], name='unique_idempotency_key')]
+
+    def __str__(self):
+        return f"{self.user_id} {self.scope} {self.key} ({self.status_code or 'in flight'})"
@@ -0,0 +1,85 @@
+"""Resting limit / stop orders, evaluated after every price refresh.
+
+Open orders are indexed by (ticker, trigger direction, trigger price) (see Order), so finding
+the orders a new price has crossed is a range scan per ticker and direction: "falling" orders
+with trigger_price >= price and "rising" orders with trigger_price <= price. Untouched orders
+are never read, so each refresh costs in proportion to the orders it triggers.
+
+Crossed orders are filled oldest first at the refreshed price, FILL_BATCH_SIZE orders per
+transaction. Each fill is a normal trade (catalog.trade_execution) in its own savepoint; an
+order whose participant can no longer cover it is rejected with the reason, and an order
+cancelled while the batch ran is left cancelled.
+"""
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from catalog.models import Order, Stock
+from catalog.trade_execution import TradeError, execute_buy, execute_sell
+
+FILL_BATCH_SIZE = 100
+# Tickers per range-scan query, keeping the generated SQL a reasonable size
+SCAN_TICKERS_PER_QUERY = 200
+
+
+class _OrderClosed(Exception):
+    """Raised inside a fill's savepoint to undo the trade of an order that was cancelled."""
+
+
+def crossed_order_ids(prices):
+    """Returns the ids of open orders whose trigger price `prices` ({ticker: price}) has
+    reached, oldest first."""
+    tickers = list(prices)
+    order_ids = []
+    for i in range(0, len(tickers), SCAN_TICKERS_PER_QUERY):
+        crossed = reduce(or_, [
+            Q(ticker=ticker, trigger_on=Order.FALL, trigger_price__gte=prices[ticker])
+            | Q(ticker=ticker, trigger_on=Order.RISE, trigger_price__lte=prices[ticker])
+            for ticker in tickers[i:i + SCAN_TICKERS_PER_QUERY]
+        ])
+        order_ids.extend(Order.objects.filter(crossed, status=Order.OPEN).values_list('id', flat=True))
+    return sorted(order_ids)
+
+
+def fill_orders(order_ids, prices, batch_size=FILL_BATCH_SIZE):
+    """Fills the given open orders at `prices` ({ticker: price}), one transaction per batch.
+    Returns (filled, rejected) counts."""
+    filled = rejected = 0
+    stocks = Stock.objects.in_bulk({ticker for ticker in prices})
+    for i in range(0, len(order_ids), batch_size):
+        with transaction.atomic():
+            orders = Order.objects.select_related('participant').filter(
+                id__in=order_ids[i:i + batch_size], status=Order.OPEN
+            ).order_by('id')
+            for order in orders:
+                now = timezone.now()
+                execute = execute_buy if order.side == Order.BUY else execute_sell
+                try:
+                    with transaction.atomic():
+                        trade, _, _ = execute(order.participant, stocks[order.ticker], order.shares)
+                        closed = Order.objects.filter(pk=order.pk, status=Order.OPEN).update(
+                            status=Order.FILLED, trade=trade, closed_at=now
+                        )
+                        if not closed:
+                            raise _OrderClosed()
+                    filled += 1
+                except _OrderClosed:
+                    continue
+                except TradeError as e:
+                    rejected += Order.objects.filter(pk=order.pk, status=Order.OPEN).update(
+                        status=Order.REJECTED, reason=str(e), closed_at=now
+                    )
+    return filled, rejected
+
+
+def evaluate_orders(prices):
+    """Fills every open order crossed by the refreshed `prices`. Returns (filled, rejected)."""
+    order_ids = crossed_order_ids(prices)
+    if not order_ids:
+        return 0, 0
+    filled, rejected = fill_orders(order_ids, prices)
+    print(f"Order book: filled {filled}, rejected {rejected} of {len(order_ids)} crossed orders")
+    return filled, rejected
@@ -0,0 +1,155 @@
+"""Price history: raw ticks written by each refresh, OHLC bars rolled up from them, and the
+DailyClose index of official closes.
+
+Ticks are bucketed into 5-minute and daily (UTC) bars. Regular US trading hours fall inside
+a single UTC day, so a daily bar covers one trading session. Ticks older than the retention
+period are rolled up and then deleted so the tick table stays bounded.
+
+Daily closes are immutable, so they are downloaded once (backfill_daily_closes, resumable per
+ticker) and answered locally afterwards.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from catalog import trading_calendar
+from catalog.models import DailyClose, DailyCloseBackfill, PriceBar, PriceTick
+
+
+def record_ticks(prices, timestamp=None):
+    """Appends one tick per ticker with a single bulk insert.
+    `prices` is {ticker: Decimal price}."""
+    timestamp = timestamp or timezone.now()
+    PriceTick.objects.bulk_create(
+        [PriceTick(ticker=ticker, timestamp=timestamp, price=price) for ticker, price in prices.items()],
+        batch_size=500,
+    )
+
+
+def _bucket_start(timestamp, interval):
+    if interval == PriceBar.DAILY:
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    return timestamp.replace(minute=timestamp.minute - timestamp.minute % 5, second=0, microsecond=0)
+
+
+def _day_start(timestamp):
+    return _bucket_start(timestamp, PriceBar.DAILY)
+
+
+def rollup_ticks(start=None, end=None):
+    """Builds (or rebuilds) 5-minute and daily bars from the ticks in [start, end).
+    `start` is rounded down to midnight UTC so every bar is computed from all of its ticks.
+    Defaults to the start of yesterday through now. Returns the number of bars written."""
+    end = end or timezone.now()
+    start = _day_start(start or end - timedelta(days=1))
+
+    bars = {}
+    ticks = (
+        PriceTick.objects.filter(timestamp__gte=start, timestamp__lt=end)
+        .order_by('ticker', 'timestamp', 'id')
+        .values_list('ticker', 'timestamp', 'price')
+    )
+    for ticker, timestamp, price in ticks.iterator(chunk_size=2000):
+        for interval in (PriceBar.FIVE_MINUTES, PriceBar.DAILY):
+            key = (ticker, interval, _bucket_start(timestamp, interval))
+            bar = bars.get(key)
+            if bar is None:
+                bars[key] = PriceBar(
+                    ticker=ticker, interval=interval, bucket=key[2],
+                    open=price, high=price, low=price, close=price, tick_count=1,
+                )
+            else:
+                # Ticks arrive in time order, so the latest one is the close
+                bar.high = max(bar.high, price)
+                bar.low = min(bar.low, price)
+                bar.close = price
+                bar.tick_count += 1
+
+    PriceBar.objects.bulk_create(
+        list(bars.values()),
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['ticker', 'interval', 'bucket'],
+        update_fields=['open', 'high', 'low', 'close', 'tick_count'],
+    )
+    return len(bars)
+
+
+def compact_ticks(retention_days=None):
+    """Rolls up every tick older than `retention_days` (whole UTC days) into bars and deletes them.
+    Returns the number of ticks deleted."""
+    retention_days = retention_days if retention_days is not None else settings.PRICE_TICK_RETENTION_DAYS
+    cutoff = _day_start(timezone.now() - timedelta(days=retention_days))
+    oldest = PriceTick.objects.filter(timestamp__lt=cutoff).order_by('timestamp').values_list('timestamp', flat=True).first()
+    if oldest is None:
+        return 0
+
+    with transaction.atomic():
+        rollup_ticks(start=oldest, end=cutoff)
+        deleted, _ = PriceTick.objects.filter(timestamp__lt=cutoff).delete()
+    return deleted
+
+
+def backfill_daily_closes(ticker, days=None, since=None):
+    """Downloads the daily closes missing from the DailyClose index for a ticker, in one API call.
+    The index covers a date range per ticker (DailyCloseBackfill): a backfill extends it forward
+    to the last completed trading session and, when `since` is before it, backward to `since`.
+    The first backfill starts `days` days back (default DAILY_CLOSE_BACKFILL_DAYS), or at
+    `since` if that is earlier. The range only grows to the last close the provider actually
+    returned, so a session it doesn't have yet is asked for again next time. Does nothing if
+    the range already covers what's needed.
+    Returns the number of closes stored."""
+    from catalog.stock_utils import get_daily_closes
+
+    # Today's bar isn't final until the session is over; weekends and holidays add no closes
+    through = trading_calendar.last_session_date()
+    state = DailyCloseBackfill.objects.filter(ticker=ticker).first()
+    if state is None:
+        days = days if days is not None else settings.DAILY_CLOSE_BACKFILL_DAYS
+        start = through - timedelta(days=days)
+        if since is not None:
+            start = min(start, since)
+    elif since is not None and since < state.covered_from:
+        start = since
+    elif state.covered_through < through:
+        start = state.covered_through + timedelta(days=1)
+    else:
+        return 0
+
+    closes = [
+        DailyClose(ticker=ticker, date=close_date, close=Decimal(str(close)).quantize(Decimal('0.01')))
+        for close_date, close in get_daily_closes(ticker, start_date=start)
+        if start <= close_date <= through
+    ]
+    returned_through = max((close.date for close in closes), default=None)
+
+    covered_from = min(start, state.covered_from) if state is not None else start
+    covered_through = state.covered_through if state is not None else start - timedelta(days=1)
+    if returned_through is not None:
+        covered_through = max(covered_through, returned_through)
+
+    with transaction.atomic():
+        DailyClose.objects.bulk_create(closes, batch_size=500, ignore_conflicts=True)
+        DailyCloseBackfill.objects.update_or_create(
+            ticker=ticker, defaults={'covered_from': covered_from, 'covered_through': covered_through}
+        )
+    return len(closes)
+
+
+def get_close_on_or_before(ticker, day):
+    """Returns the latest stored close (Decimal) on or before `day`, or None.
+    Backfills the ticker first only if the index doesn't cover `day` yet."""
+    state = DailyCloseBackfill.objects.filter(ticker=ticker).first()
+    if state is None or state.covered_through < day or state.covered_from > day:
+        # Reach a week before `day` so a trading day is included even across holidays
+        backfill_daily_closes(ticker, since=day - timedelta(days=7))
+
+    return (
+        DailyClose.objects.filter(ticker=ticker, date__lte=day)
+        .order_by('-date')
+        .values_list('close', flat=True)
+        .first()
+    )
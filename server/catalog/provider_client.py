@@ -0,0 +1,84 @@
+"""Shared, pooled HTTP client for the stock price provider.
+
+All calls to the price API go through one requests.Session so TCP/TLS connections
+to the provider are kept alive and reused instead of being re-established per request.
+"""
+import atexit
+import threading
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+
+class ProviderClient:
+    """Wraps a requests.Session with a bounded, keep-alive connection pool."""
+
+    def __init__(self, pool_connections=None, pool_maxsize=None, connect_timeout=None, read_timeout=None):
+        self.timeout = (
+            connect_timeout if connect_timeout is not None else settings.STOCK_API_CONNECT_TIMEOUT,
+            read_timeout if read_timeout is not None else settings.STOCK_API_READ_TIMEOUT,
+        )
+        # pool_connections = number of hosts kept pooled, pool_maxsize = connections per host.
+        # pool_block makes callers wait for a free connection instead of opening extra ones.
+        self._adapter = HTTPAdapter(
+            pool_connections=pool_connections or settings.STOCK_API_POOL_CONNECTIONS,
+            pool_maxsize=pool_maxsize or settings.STOCK_API_POOL_MAXSIZE,
+            pool_block=True,
+        )
+        self.session = requests.Session()
+        self.session.headers.update({'Connection': 'keep-alive'})
+        self.session.mount('https://', self._adapter)
+        self.session.mount('http://', self._adapter)
+
+    def get(self, url, **kwargs):
+        """GET a provider URL through the pooled session (uses the configured timeouts)."""
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def stats(self):
+        """Returns connection reuse counters summed over every pooled host."""
+        pools = self._adapter.poolmanager.pools
+        requests_made = 0
+        connections_opened = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            requests_made += pool.num_requests
+            connections_opened += pool.num_connections
+        return {
+            'requests': requests_made,
+            'connections_opened': connections_opened,
+            'connections_reused': max(requests_made - connections_opened, 0),
+        }
+
+    def close(self):
+        """Closes all pooled connections."""
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Returns the module-level provider client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ProviderClient()
+    return _client
+
+
+def close_client():
+    """Shuts down the module-level provider client. A later get_client() creates a new one."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+atexit.register(close_client)
@@ -0,0 +1,42 @@
+"""Pluggable stock price providers.
+
+The primary provider is chosen with the STOCK_PRICE_PROVIDER setting (a dotted class path)
+and built with STOCK_PRICE_PROVIDER_OPTIONS as keyword arguments. It is wrapped, together
+with any STOCK_PRICE_FALLBACK_PROVIDERS, in a ResilientProvider (circuit breakers, retries
+and fallback - see catalog.providers.resilience).
+"""
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from catalog.providers.base import PriceProvider, ProviderError, TransientProviderError
+from catalog.providers.resilience import ResilientProvider
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    """Returns the configured price provider, creating it on first use."""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                providers = [import_string(settings.STOCK_PRICE_PROVIDER)(**settings.STOCK_PRICE_PROVIDER_OPTIONS)]
+                for fallback in settings.STOCK_PRICE_FALLBACK_PROVIDERS:
+                    providers.append(import_string(fallback['class'])(**fallback.get('options', {})))
+                _provider = ResilientProvider(providers, **settings.STOCK_PROVIDER_RESILIENCE)
+    return _provider
+
+
+def breaker_states():
+    """Returns the circuit breaker state and trip count of every configured provider."""
+    return get_provider().breaker_states()
+
+
+def reset_provider():
+    """Drops the cached provider so the next get_provider() re-reads the settings."""
+    global _provider
+    with _provider_lock:
+        _provider = None
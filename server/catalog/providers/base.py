@@ -0,0 +1,77 @@
+class ProviderError(RuntimeError):
+    """Raised when a price provider cannot return the requested data."""
+    # Transient errors (network failures, timeouts, 5xx responses) are worth retrying
+    transient = False
+    # Set when the provider should not be asked again for now (e.g. out of API credits)
+    exhausted = False
+    # Set when the provider refused the request itself (e.g. HTTP 4xx from an invalid or revoked
+    # API key); it will keep doing so until it is reconfigured
+    rejected = False
+
+
+class TransientProviderError(ProviderError):
+    """A failure that may succeed if the request is retried."""
+    transient = True
+
+
+class PriceProvider:
+    """Interface every stock price provider implements.
+
+    Prices are plain floats; dates are datetime.date objects. Subclasses must implement
+    quote_group and history; quote and batch_quote are built on quote_group.
+    """
+    name = 'provider'
+    # Largest number of tickers quote_group is sent at once
+    batch_size = 100
+
+    def group_size(self, batch_size=None):
+        """Returns how many tickers to send per quote_group call."""
+        return batch_size or self.batch_size
+
+    def quote_group(self, tickers):
+        """Fetches one group of tickers in a single request.
+        Returns ({ticker: (previous_close, last_price)}, {ticker: error message}) and raises
+        ProviderError when the request as a whole fails."""
+        raise NotImplementedError
+
+    def quote(self, ticker):
+        """Returns (previous_close, last_price) for a ticker. Raises ProviderError on failure."""
+        prices, errors = self.quote_group([ticker])
+        if ticker not in prices:
+            raise ProviderError(errors.get(ticker, f"No quote returned for {ticker}"))
+        return prices[ticker]
+
+    def batch_quote(self, tickers, batch_size=None, errors=None):
+        """Returns {ticker: (previous_close, last_price)} for every ticker that could be priced.
+        Error messages for the others are stored in `errors` when a dict is passed. A failed
+        group does not stop the remaining groups unless the provider reports it is exhausted."""
+        tickers = list(dict.fromkeys(tickers))  # Drop duplicates, keep order
+        size = self.group_size(batch_size)
+        prices = {}
+        for i in range(0, len(tickers), size):
+            group = tickers[i:i + size]
+            try:
+                group_prices, group_errors = self.quote_group(group)
+            except ProviderError as e:
+                if e.exhausted:
+                    # Don't keep asking for the remaining groups
+                    record_errors(errors, tickers[i:], str(e))
+                    break
+                record_errors(errors, group, str(e))
+                continue
+            prices.update(group_prices)
+            if errors is not None:
+                errors.update(group_errors)
+        return prices
+
+    def history(self, ticker, start_date=None, outputsize=30):
+        """Returns [(date, close)] daily closes, most recent first. With start_date every bar from
+        that date onward is returned, otherwise the last `outputsize` bars."""
+        raise NotImplementedError
+
+
+def record_errors(errors, tickers, message):
+    """Stores `message` for each ticker if the caller asked for errors."""
+    if errors is not None:
+        for ticker in tickers:
+            errors[ticker] = message
@@ -0,0 +1,103 @@
+import json
+import random
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from catalog.providers.base import PriceProvider, TransientProviderError
+
+
+class FixtureProvider(PriceProvider):
+    """Offline stand-in for load tests and benchmarks; never touches the network.
+
+    Quotes and history are replayed from a recorded JSON file when one is given, otherwise
+    generated deterministically from the ticker and the current 5-minute window, so every
+    process serves the same prices. Configure with STOCK_PRICE_PROVIDER_OPTIONS, e.g.
+    {"latency": 0.05, "error_rate": 0.01, "fixture_file": "fixtures/prices.json"}.
+
+    Recorded file format:
+        {"quotes": {"AAPL": {"previous_close": 188.0, "close": 190.5}},
+         "history": {"AAPL": [["2025-06-23", 188.0], ["2025-06-20", 187.1]]}}
+    """
+    name = 'fixture'
+    batch_size = 500
+
+    def __init__(self, latency=0.0, latency_jitter=0.0, error_rate=0.0, seed=0, fixture_file=None):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.quotes = {}
+        self.histories = {}
+        if fixture_file:
+            with open(fixture_file) as f:
+                recorded = json.load(f)
+            self.quotes = recorded.get('quotes', {})
+            self.histories = recorded.get('history', {})
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def _simulate_call(self, what):
+        """Sleeps for the configured latency and fails at the configured error rate."""
+        with self._random_lock:
+            jitter = self._random.uniform(-self.latency_jitter, self.latency_jitter)
+            failed = self._random.random() < self.error_rate
+        delay = max(self.latency + jitter, 0)
+        if delay:
+            time.sleep(delay)
+        if failed:
+            raise TransientProviderError(f"Fixture provider simulated error fetching {what}")
+
+    @staticmethod
+    def _base_price(ticker):
+        # Stable per ticker across processes (unlike hash())
+        return 20 + zlib.crc32(ticker.encode()) % 48000 / 100
+
+    def _synthetic_close(self, ticker, day):
+        """Deterministic daily close that wanders within +/-5% of the ticker's base price."""
+        seed = zlib.crc32(f'{ticker}:{day.isoformat()}'.encode())
+        return round(self._base_price(ticker) * (0.95 + (seed % 1000) / 10000), 2)
+
+    def _synthetic_quote(self, ticker):
+        now = timezone.now()
+        previous_close = self._synthetic_close(ticker, now.date() - timedelta(days=1))
+        window = int(now.timestamp() // 300)
+        seed = zlib.crc32(f'{ticker}:{window}'.encode())
+        return (previous_close, round(previous_close * (0.98 + (seed % 400) / 10000), 2))
+
+    def quote_group(self, tickers):
+        self._simulate_call(f"quotes for {len(tickers)} symbols")
+        prices = {}
+        errors = {}
+        for ticker in tickers:
+            if ticker in self.quotes:
+                quote = self.quotes[ticker]
+                prices[ticker] = (float(quote['previous_close']), float(quote['close']))
+            elif self.quotes:
+                # Replaying a recording: unknown tickers behave like unknown symbols
+                errors[ticker] = f"No quote recorded for {ticker}"
+            else:
+                prices[ticker] = self._synthetic_quote(ticker)
+        return prices, errors
+
+    def history(self, ticker, start_date=None, outputsize=30):
+        self._simulate_call(f"daily closes for {ticker}")
+        if self.histories:
+            closes = [
+                (datetime.strptime(day, '%Y-%m-%d').date(), float(close))
+                for day, close in self.histories.get(ticker, [])
+            ]
+            closes.sort(reverse=True)
+        else:
+            closes = []
+            day = timezone.localdate()
+            earliest = start_date or day - timedelta(days=outputsize * 2)
+            while day >= earliest:
+                if day.weekday() < 5:
+                    closes.append((day, self._synthetic_close(ticker, day)))
+                day -= timedelta(days=1)
+        if start_date is not None:
+            return [(day, close) for day, close in closes if day >= start_date]
+        return closes[:outputsize]
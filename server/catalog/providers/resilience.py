@@ -0,0 +1,208 @@
+"""Resilience layer around the price providers.
+
+Each provider gets a circuit breaker: after `failure_threshold` consecutive failures it opens
+and calls fail fast for `reset_timeout` seconds, then a single half-open probe decides whether
+it closes again. Transient errors are retried with jittered exponential backoff. Providers
+are tried in order, and single-ticker quotes finally fall back to the last stored price,
+which is raised as StalePrice so it is never mistaken for a fresh quote.
+"""
+import random
+import threading
+import time
+
+from catalog.providers.base import PriceProvider, ProviderError, record_errors
+
+
+class CircuitOpen(ProviderError):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+
+class StalePrice(ProviderError):
+    """Raised by quote when no provider could price the ticker but a stored price exists.
+    `prices` is the stored (previous_close, last_price); a caller may show it, but a refresh
+    must count the ticker as failed rather than save it or touch last_updated."""
+
+    def __init__(self, message, prices):
+        super().__init__(message)
+        self.prices = prices
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Returns True if a call may go through. An open breaker lets one probe through
+        (half-open) once reset_timeout has passed."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold
+            ):
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self.trips += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'trips': self.trips,
+            }
+
+
+def backoff_delay(attempt, base, maximum):
+    """Full-jitter exponential backoff: a random delay up to min(maximum, base * 2**attempt)."""
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
+
+
+class ResilientProvider(PriceProvider):
+    """Wraps an ordered list of providers with circuit breakers, retries and fallback."""
+    name = 'resilient'
+
+    def __init__(self, providers, retries=2, backoff_base=0.5, backoff_max=5.0,
+                 failure_threshold=5, reset_timeout=30.0, stored_price_fallback=True):
+        if not providers:
+            raise ValueError("ResilientProvider needs at least one provider")
+        self.providers = list(providers)
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stored_price_fallback = stored_price_fallback
+        self.breakers = {}
+        for provider in self.providers:
+            key = provider.name
+            while key in self.breakers:
+                key += "'"
+            self.breakers[key] = CircuitBreaker(key, failure_threshold, reset_timeout)
+        self._breaker_for = dict(zip(map(id, self.providers), self.breakers.values()))
+
+    @property
+    def batch_size(self):
+        return self.providers[0].batch_size
+
+    def group_size(self, batch_size=None):
+        return self.providers[0].group_size(batch_size)
+
+    def breaker_states(self):
+        """Returns {provider: {'state', 'consecutive_failures', 'trips'}} for every provider."""
+        return {name: breaker.snapshot() for name, breaker in self.breakers.items()}
+
+    def _call(self, provider, fn, *args, **kwargs):
+        """Calls fn through the provider's breaker, retrying transient errors with backoff."""
+        breaker = self._breaker_for[id(provider)]
+        for attempt in range(self.retries + 1):
+            if not breaker.allow():
+                raise CircuitOpen(f"{breaker.name} circuit is open")
+            try:
+                result = fn(*args, **kwargs)
+            except ProviderError as e:
+                # Only provider-level trouble counts against the breaker, not e.g. an unknown symbol;
+                # a rejected request (bad API key) is permanent, so it counts too and isn't retried
+                if e.transient or e.exhausted or e.rejected:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if not e.transient or attempt == self.retries:
+                    raise
+                time.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_max))
+                continue
+            breaker.record_success()
+            return result
+
+    def quote_group(self, tickers):
+        prices, errors = {}, {}
+        self._quote_chain(list(tickers), None, prices, errors)
+        return prices, errors
+
+    def batch_quote(self, tickers, batch_size=None, errors=None):
+        """Tries each provider in order for the tickers the previous ones could not price.
+        Prices are never filled in from the database here: a refresh that cannot reach any
+        provider should leave stored prices (and their timestamps) alone."""
+        prices, chain_errors = {}, {}
+        self._quote_chain(list(dict.fromkeys(tickers)), batch_size, prices, chain_errors)
+        if errors is not None:
+            errors.update(chain_errors)
+        return prices
+
+    def _quote_chain(self, remaining, batch_size, prices, errors):
+        for provider in self.providers:
+            if not remaining:
+                break
+            provider_errors = {}
+            size = provider.group_size(batch_size)
+            for i in range(0, len(remaining), size):
+                group = remaining[i:i + size]
+                try:
+                    group_prices, group_errors = self._call(provider, provider.quote_group, group)
+                except ProviderError as e:
+                    if e.exhausted or e.rejected or isinstance(e, CircuitOpen):
+                        # Hand everything left straight to the next provider
+                        record_errors(provider_errors, remaining[i:], f"{provider.name}: {e}")
+                        break
+                    record_errors(provider_errors, group, f"{provider.name}: {e}")
+                    continue
+                prices.update(group_prices)
+                provider_errors.update(group_errors)
+            remaining = [ticker for ticker in remaining if ticker not in prices]
+            errors.update({ticker: provider_errors[ticker] for ticker in remaining if ticker in provider_errors})
+        for ticker in prices:
+            errors.pop(ticker, None)
+
+    def quote(self, ticker):
+        """Tries each provider in order. When all of them fail, raises StalePrice carrying the
+        last stored price (if there is one), otherwise the last provider error."""
+        last_error = None
+        for provider in self.providers:
+            try:
+                return self._call(provider, provider.quote, ticker)
+            except ProviderError as e:
+                last_error = e
+        if self.stored_price_fallback:
+            from catalog.models import Stock
+
+            stored = Stock.objects.filter(ticker=ticker).values_list('start_price', 'current_price').first()
+            if stored is not None:
+                raise StalePrice(str(last_error), (float(stored[0]), float(stored[1]))) from last_error
+        raise last_error
+
+    def history(self, ticker, start_date=None, outputsize=30):
+        last_error = None
+        for provider in self.providers:
+            try:
+                return self._call(provider, provider.history, ticker, start_date=start_date, outputsize=outputsize)
+            except ProviderError as e:
+                last_error = e
+        raise last_error
@@ -0,0 +1,181 @@
+import os
+from datetime import datetime
+
+import requests
+from django.conf import settings
+from dotenv import load_dotenv
+
+from catalog.provider_client import get_client
+from catalog.providers.base import PriceProvider, ProviderError, TransientProviderError
+from catalog.rate_limiter import limiter
+
+BASE_URL = 'https://api.twelvedata.com'
+
+
+class TwelveDataProvider(PriceProvider):
+    """Twelve Data REST API. Requests go through the pooled provider client and spend credits
+    from the shared limiter."""
+    name = 'twelvedata'
+    # Twelve Data accepts up to 120 comma-separated symbols per batch request
+    batch_size = 120
+
+    def __init__(self, api_key=None):
+        # Grab api key - use Twelve Data API key
+        load_dotenv()
+        self.api_key = api_key or os.getenv("STOCK_API_KEY", "f99e95eaa5da47d0b01313a81c685c9a") # NEED TO REMOVE HARD CODED  KEY
+
+    def _require_api_key(self):
+        if not self.api_key:
+            error = ProviderError("STOCK_API_KEY is not set in environment; cannot fetch stock prices")
+            error.rejected = True
+            raise error
+
+    def _get_json(self, url, credits, what):
+        """Spends `credits`, GETs a Twelve Data URL and returns the decoded JSON."""
+        limiter.acquire(credits, timeout=settings.STOCK_API_CREDIT_WAIT)
+        try:
+            r = get_client().get(url)
+            r.raise_for_status()
+            return r.json()
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code < 500:
+                error = ProviderError(f"HTTP error fetching {what}: {e}")
+                error.rejected = True
+                raise error
+            raise TransientProviderError(f"HTTP error fetching {what}: {e}")
+        except (requests.RequestException, ValueError) as e:
+            raise TransientProviderError(f"Network error fetching {what}: {e}")
+
+    @staticmethod
+    def _api_error(data):
+        """Builds the exception for an error payload; credit/rate-limit errors mark the provider
+        exhausted, authentication errors rejected and server-side errors retryable."""
+        error = ProviderError(f"Twelve Data API error: {data.get('message', 'Unknown error')}")
+        code = data.get('code') or 0
+        if code == 429:
+            error.exhausted = True
+        elif code in (401, 403):
+            error.rejected = True
+        elif code >= 500:
+            error.transient = True
+        return error
+
+    def quote(self, ticker):
+        """Returns both yesterday's closing price and current price.
+        Uses the time_series endpoint (last 2 days) plus the real-time price endpoint."""
+        self._require_api_key()
+
+        # Single API call to get time series data (last 2 days)
+        # This gives us yesterday's closing price and today's data if available
+        url = f'{BASE_URL}/time_series?symbol={ticker}&interval=1day&outputsize=2&apikey={self.api_key}'
+        print(f"[API CALL] Fetching prices for {ticker} using API key: {self.api_key[:10]}...")
+        data = self._get_json(url, 1, f"prices for {ticker}")
+
+        # Check for API errors
+        if 'status' in data and data['status'] == 'error':
+            raise self._api_error(data)
+
+        # Get current price from price endpoint (real-time)
+        try:
+            price_url = f'{BASE_URL}/price?symbol={ticker}&apikey={self.api_key}'
+            price_data = self._get_json(price_url, 1, f"price for {ticker}")
+
+            if 'status' not in price_data or price_data['status'] != 'error':
+                if 'price' in price_data:
+                    current_price = float(price_data['price'])
+                else:
+                    current_price = None
+            else:
+                current_price = None
+        except Exception:
+            current_price = None
+
+        # Parse time series data
+        if 'values' not in data or len(data['values']) == 0:
+            raise ProviderError(f"No time series data available for {ticker}")
+
+        values = data['values']
+
+        # Get yesterday's closing price (index 1, or index 0 if only one day available)
+        if len(values) >= 2:
+            # Index 0 = most recent (today if market closed, yesterday if market open)
+            # Index 1 = previous day (yesterday)
+            yesterday_close = float(values[1]['close'])
+        else:
+            # Only one day available, use it as yesterday
+            yesterday_close = float(values[0]['close'])
+
+        # If we didn't get current price from price endpoint, use most recent close from time series
+        if current_price is None:
+            current_price = float(values[0]['close'])
+
+        return (yesterday_close, current_price)
+
+    @staticmethod
+    def _parse_quote(ticker, quote):
+        """Returns (previous_close, last_price) from a single Twelve Data quote object."""
+        if quote.get('status') == 'error':
+            raise ProviderError(f"Twelve Data API error for {ticker}: {quote.get('message', 'Unknown error')}")
+        try:
+            return (float(quote['previous_close']), float(quote['close']))
+        except (KeyError, TypeError, ValueError):
+            raise ProviderError(f"Malformed quote for {ticker}: {quote}")
+
+    def group_size(self, batch_size=None):
+        # Each symbol in a quote request costs one credit, so a group can't exceed the per-minute budget
+        return min(batch_size or self.batch_size, limiter.per_minute)
+
+    def quote_group(self, tickers):
+        """Uses the quote endpoint with comma-separated symbols, so a whole group costs one
+        request. Credits for the group are taken from the shared limiter before it is sent."""
+        self._require_api_key()
+
+        symbols = ','.join(tickers)
+        url = f'{BASE_URL}/quote?symbol={symbols}&apikey={self.api_key}'
+        print(f"[API CALL] Fetching quotes for {len(tickers)} symbols using API key: {self.api_key[:10]}...")
+        data = self._get_json(url, len(tickers), f"quotes for {symbols}")
+
+        # An error for the whole request (bad key, out of credits) comes back un-keyed
+        if data.get('status') == 'error':
+            raise self._api_error(data)
+
+        # A single symbol returns a flat quote, several symbols return {symbol: quote}
+        if len(tickers) == 1:
+            data = {tickers[0]: data}
+
+        prices = {}
+        errors = {}
+        for ticker in tickers:
+            quote = data.get(ticker)
+            try:
+                if quote is None:
+                    raise ProviderError(f"No quote returned for {ticker}")
+                prices[ticker] = self._parse_quote(ticker, quote)
+            except ProviderError as e:
+                errors[ticker] = str(e)
+        return prices, errors
+
+    def history(self, ticker, start_date=None, outputsize=30):
+        """Fetches daily closes with a single time_series call."""
+        self._require_api_key()
+
+        url = f'{BASE_URL}/time_series?symbol={ticker}&interval=1day&apikey={self.api_key}'
+        if start_date is not None:
+            url += f'&start_date={start_date.strftime("%Y-%m-%d")}&outputsize=5000'
+        else:
+            url += f'&outputsize={outputsize}'
+        print(f"[API CALL] Fetching daily closes for {ticker} using API key: {self.api_key[:10]}...")
+        data = self._get_json(url, 1, f"daily closes for {ticker}")
+
+        # Check for API errors ("No data is available" just means there are no new bars yet)
+        if 'status' in data and data['status'] == 'error':
+            error_msg = data.get('message', 'Unknown error')
+            if 'no data' in error_msg.lower():
+                return []
+            raise self._api_error(data)
+
+        closes = []
+        for value in data.get('values', []):
+            value_date = datetime.strptime(value['datetime'].split()[0], '%Y-%m-%d').date()
+            closes.append((value_date, float(value['close'])))
+        return closes
@@ -0,0 +1,105 @@
+"""Cross-process API credit limiter for the stock price provider.
+
+The budget lives in the ApiCallTracker singleton row. Every acquire is a single conditional
+UPDATE that rolls expired windows and spends credits only if both the per-minute and
+per-day windows have room, so all gunicorn workers and the refresher share one budget
+without read-modify-write races.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Case, DateField, DateTimeField, F, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from catalog.models import ApiCallTracker
+from catalog.providers.base import ProviderError
+
+
+class ApiCreditsExhausted(ProviderError):
+    """Raised when no API credits could be acquired in time."""
+    exhausted = True
+
+
+class ApiCreditLimiter:
+    """Fixed-window limiter (per minute and per UTC day) backed by ApiCallTracker."""
+
+    window = timedelta(minutes=1)
+
+    def __init__(self, per_minute=None, per_day=None, poll_interval=0.5):
+        self._per_minute = per_minute
+        self._per_day = per_day
+        self.poll_interval = poll_interval
+
+    @property
+    def per_minute(self):
+        return self._per_minute or settings.STOCK_API_CREDITS_PER_MINUTE
+
+    @property
+    def per_day(self):
+        return self._per_day or settings.STOCK_API_CREDITS_PER_DAY
+
+    def try_acquire(self, n=1):
+        """Spends n credits if the budget allows it. Never blocks. Returns True on success."""
+        self._check_request(n)
+        now = timezone.now()
+        today = now.date()
+        minute_expired = Q(window_start_time__isnull=True) | Q(window_start_time__lte=now - self.window)
+        day_expired = Q(day_window_start__isnull=True) | Q(day_window_start__lt=today)
+
+        for _ in range(2):
+            updated = ApiCallTracker.objects.filter(
+                minute_expired | Q(api_call_count__lte=self.per_minute - n),
+                day_expired | Q(day_call_count__lte=self.per_day - n),
+                id=1,
+            ).update(
+                api_call_count=Case(When(minute_expired, then=Value(n)), default=F('api_call_count') + n, output_field=IntegerField()),
+                window_start_time=Case(When(minute_expired, then=Value(now)), default=F('window_start_time'), output_field=DateTimeField()),
+                day_call_count=Case(When(day_expired, then=Value(n)), default=F('day_call_count') + n, output_field=IntegerField()),
+                day_window_start=Case(When(day_expired, then=Value(today)), default=F('day_window_start'), output_field=DateField()),
+                last_api_call_time=now,
+            )
+            if updated:
+                return True
+            # Nothing matched: either the budget is spent or the singleton row doesn't exist yet
+            if ApiCallTracker.objects.filter(id=1).exists():
+                return False
+            ApiCallTracker.get_instance()
+        return False
+
+    def acquire(self, n=1, timeout=None):
+        """Spends n credits, waiting up to `timeout` seconds (forever if None) for the budget
+        to free up. Raises ApiCreditsExhausted if the credits could not be acquired in time."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.try_acquire(n):
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise ApiCreditsExhausted(f"Out of API credits: could not acquire {n} credit(s) within {timeout}s")
+                time.sleep(min(self.poll_interval, remaining))
+            else:
+                time.sleep(self.poll_interval)
+
+    def remaining(self):
+        """Returns the credits left in the current minute and day windows."""
+        tracker = ApiCallTracker.get_instance()
+        now = timezone.now()
+        minute_used = tracker.api_call_count
+        if tracker.window_start_time is None or tracker.window_start_time <= now - self.window:
+            minute_used = 0
+        day_used = tracker.day_call_count
+        if tracker.day_window_start is None or tracker.day_window_start < now.date():
+            day_used = 0
+        return {
+            'minute': max(self.per_minute - minute_used, 0),
+            'day': max(self.per_day - day_used, 0),
+        }
+
+    def _check_request(self, n):
+        if n < 1:
+            raise ValueError("Must acquire at least one credit")
+        if n > self.per_minute or n > self.per_day:
+            raise ValueError(f"Cannot acquire {n} credits: exceeds the per-minute ({self.per_minute}) or per-day ({self.per_day}) limit")
+
+
+limiter = ApiCreditLimiter()
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from catalog.models import LeagueParticipant
+from catalog.valuations import create_valuation
+
+
+@receiver(post_save, sender=LeagueParticipant)
+def create_participant_valuation(sender, instance, created, **kwargs):
+    """Every participant starts with a valuation row equal to their starting cash."""
+    if created:
+        create_valuation(instance)
@@ -0,0 +1,102 @@
+"""Single-flight coalescing for expensive refreshes.
+
+Only one caller runs the refresh at a time: inside a process a lock picks the leader, and
+across processes (gunicorn workers, the refresher command) a RefreshLease row acts as an
+advisory lock taken with a conditional UPDATE. Everyone else waits briefly for the leader to
+finish and then uses the last stored snapshot instead of starting their own refresh.
+"""
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from catalog.models import RefreshLease
+
+
+class SingleFlight:
+    def __init__(self, name, lease_seconds=None, wait_seconds=None, poll_interval=0.25):
+        self.name = name
+        self._lease_seconds = lease_seconds
+        self._wait_seconds = wait_seconds
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'leader_runs': 0,
+            'coalesced_local': 0,
+            'coalesced_remote': 0,
+            'wait_timeouts': 0,
+        }
+
+    @property
+    def lease_seconds(self):
+        # A crashed leader's lease expires so the next caller can take over
+        return self._lease_seconds or settings.STOCK_REFRESH_DEADLINE + 30
+
+    @property
+    def wait_seconds(self):
+        return self._wait_seconds if self._wait_seconds is not None else settings.STOCK_REFRESH_COALESCE_WAIT
+
+    def run(self, fn, *args, **kwargs):
+        """Runs fn(*args, **kwargs) unless another caller is already running it.
+        Returns (True, result) for the caller that ran it and (False, None) for coalesced callers,
+        who return once the leader is done or after waiting `wait_seconds`."""
+        if not self._lock.acquire(blocking=False):
+            # Another thread in this process is refreshing - wait for it, then reuse its result
+            self._count('coalesced_local')
+            if self._lock.acquire(timeout=self.wait_seconds):
+                self._lock.release()
+            else:
+                self._count('wait_timeouts')
+            return False, None
+
+        try:
+            owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+            if not self._acquire_lease(owner):
+                self._count('coalesced_remote')
+                self._wait_for_lease()
+                return False, None
+
+            try:
+                self._count('leader_runs')
+                return True, fn(*args, **kwargs)
+            finally:
+                RefreshLease.objects.filter(name=self.name, owner=owner).update(owner='', expires_at=None)
+        finally:
+            self._lock.release()
+
+    def stats(self):
+        """Returns counters of leader runs and coalesced callers."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['coalesced'] = stats['coalesced_local'] + stats['coalesced_remote']
+        return stats
+
+    def _acquire_lease(self, owner):
+        now = timezone.now()
+        RefreshLease.objects.get_or_create(name=self.name)
+        return RefreshLease.objects.filter(
+            Q(expires_at__isnull=True) | Q(expires_at__lte=now),
+            name=self.name,
+        ).update(owner=owner, expires_at=now + timedelta(seconds=self.lease_seconds)) == 1
+
+    def _wait_for_lease(self):
+        deadline = time.monotonic() + self.wait_seconds
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            if RefreshLease.objects.filter(
+                Q(expires_at__isnull=True) | Q(expires_at__lte=timezone.now()),
+                name=self.name,
+            ).exists():
+                return
+        self._count('wait_timeouts')
+
+    def _count(self, key):
+        with self._stats_lock:
+            self._stats[key] += 1
@@ -0,0 +1,129 @@
+"""Stock board: the snapshot of every stock's price served by /api/stocks/ and used to value
+owned stocks, shared by all worker processes through Django's cache.
+
+Snapshots live under a versioned key. The refresher publishes a new version after each price
+refresh, so every worker switches to the new prices at once. Versions come from a database
+counter, so they stay unique across processes whatever the cache backend. The TTL (STOCK_BOARD_CACHE_TTL)
+only bounds how long a snapshot can outlive a refresher that stopped running; on a miss the
+board is rebuilt from the stored prices, never from the provider.
+
+Each snapshot also carries the rendered JSON body with a strong ETag and a Last-Modified
+timestamp, so /api/stocks/ serves the same bytes until the next version and answers
+conditional requests with 304.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from catalog.models import RefreshLease, Stock
+
+VERSION_KEY = 'stock_board:version'
+# RefreshLease row whose counter issues board versions
+VERSION_COUNTER = 'stock_board'
+
+
+def _board_key(version):
+    return f'stock_board:v{version}'
+
+
+def _current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # The cached version was lost; the database counter still holds the latest one
+        version = RefreshLease.objects.filter(name=VERSION_COUNTER).values_list('counter', flat=True).first() or 0
+        cache.add(VERSION_KEY, version, timeout=None)
+        version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def build_board():
+    """Reads the stored prices. Returns {"stocks": [...], "prices_as_of": datetime or None}
+    plus the rendered "body" bytes, its "etag" and "last_modified" (a Unix timestamp)."""
+    stock_queryset = Stock.objects.all()
+    prices_as_of = stock_queryset.aggregate(prices_as_of=Max('last_updated'))['prices_as_of']
+    stocks = []
+
+    for stock in stock_queryset:
+        try:
+            # Ensure we have valid numeric values
+            current = float(stock.current_price) if stock.current_price else 0.0
+            start = float(stock.start_price) if stock.start_price else 0.0
+        except (ValueError, TypeError):
+            current = 0.0
+            start = 0.0
+
+        # Calculate daily change based on start_price (which is yesterday's closing price)
+        if start > 0:
+            daily_change = current - start
+            daily_change_percent = (daily_change / start) * 100
+        else:
+            daily_change = None
+            daily_change_percent = None
+
+        stocks.append({
+            "ticker": stock.ticker,
+            "name": stock.name,
+            "start_price": start,  # Yesterday's closing price (updated daily)
+            "current_price": current,  # Current price
+            "daily_change": daily_change,
+            "daily_change_percent": daily_change_percent,
+        })
+
+    payload = {
+        "stocks": stocks,
+        "prices_as_of": prices_as_of,
+    }
+    body = JSONRenderer().render(payload)
+    return {
+        **payload,
+        "body": body,
+        "etag": f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+        "last_modified": (prices_as_of or timezone.now()).timestamp(),
+    }
+
+
+def get_board():
+    """Returns the current snapshot, building it from the database if no worker has yet."""
+    key = _board_key(_current_version())
+    board = cache.get(key)
+    if board is None:
+        board = build_board()
+        cache.set(key, board, settings.STOCK_BOARD_CACHE_TTL)
+    return board
+
+
+def get_board_prices():
+    """Returns the current snapshot as {ticker: stock data}."""
+    return {stock["ticker"]: stock for stock in get_board()["stocks"]}
+
+
+def _next_version():
+    """Bumps the version counter (a RefreshLease row, with an F() update) and caches the new
+    version. The cache is written while the row is still locked, so concurrent publishers in
+    any process get distinct versions and the cached version never goes backwards."""
+    RefreshLease.objects.get_or_create(name=VERSION_COUNTER)
+    with transaction.atomic():
+        RefreshLease.objects.filter(name=VERSION_COUNTER).update(counter=F('counter') + 1)
+        version = RefreshLease.objects.values_list('counter', flat=True).get(name=VERSION_COUNTER)
+        cache.set(VERSION_KEY, version, timeout=None)
+    return version
+
+
+def publish_board():
+    """Builds a snapshot from the stored prices and makes it the current version.
+    A reader that gets the new version before its snapshot is stored simply builds the same
+    snapshot from the database."""
+    board = build_board()
+    version = _next_version()
+    cache.set(_board_key(version), board, settings.STOCK_BOARD_CACHE_TTL)
+    return board
+
+
+def invalidate_board():
+    """Drops the current snapshot for every worker; the next read rebuilds it."""
+    _next_version()
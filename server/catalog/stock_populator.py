@@ -1,7 +1,18 @@
 # Write code here to populate a stock model
 
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
 from django.forms import ValidationError
 from catalog.models import LeagueParticipant, Stock, League, UserLeagueStock
+from catalog.order_book import evaluate_orders
+from catalog.price_history import record_ticks
+from catalog.valuations import apply_price_changes
 from catalog.views import get_daily_closing_price
 from catalog.stock_utils import get_current_stock_price
 
@@ -26,33 +37,173 @@ def create_new_stock(ticker: str, name: str, start_date: str):
     return stock
 
 
-def update_stock_prices(stock_list):
+@dataclass
+class RefreshResult:
+    """Outcome of a price refresh.
+    updated: tickers whose new prices were saved
+    unchanged: tickers priced by the API at their stored prices (only last_updated is touched)
+    skipped: tickers left unchanged because the API was out of credits / rate limited
+    failed: {ticker: error message} for every other error, timeout or missed deadline
+    latency: {ticker: seconds} spent fetching each ticker (batched tickers share their group's time)
+    orders_filled / orders_rejected: resting orders the new prices triggered (catalog.order_book)"""
+    updated: list = field(default_factory=list)
+    unchanged: list = field(default_factory=list)
+    skipped: list = field(default_factory=list)
+    failed: dict = field(default_factory=dict)
+    latency: dict = field(default_factory=dict)
+    orders_filled: int = 0
+    orders_rejected: int = 0
+
+
+def _to_price(value):
+    """Rounds a provider price to the 2 decimal places stored on Stock."""
+    return Decimal(str(value)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def _save_prices(stocks, prices, result):
+    """Writes fetched prices in one transaction: a single bulk_update of the price fields for
+    stocks whose prices changed, one UPDATE touching last_updated for the rest so the
+    board still shows when prices were last confirmed, and one bulk insert of price ticks.
+    Participant valuations are moved by each changed ticker's price delta in the same transaction."""
+    now = timezone.now()
+    changed = []
+    price_deltas = {}
+    ticks = {}
+    for ticker, (yesterday_close, current_price) in prices.items():
+        stock = stocks[ticker]
+        start_price = _to_price(yesterday_close)
+        current_price = _to_price(current_price)
+        ticks[ticker] = current_price
+        if stock.start_price == start_price and stock.current_price == current_price:
+            result.unchanged.append(ticker)
+            continue
+        price_deltas[ticker] = current_price - stock.current_price
+        stock.start_price = start_price
+        stock.current_price = current_price
+        stock.last_updated = now
+        changed.append(stock)
+        result.updated.append(ticker)
+
+    with transaction.atomic():
+        if changed:
+            Stock.objects.bulk_update(changed, ['start_price', 'current_price', 'last_updated'], batch_size=500)
+        if result.unchanged:
+            Stock.objects.filter(ticker__in=result.unchanged).update(last_updated=now)
+        if ticks:
+            record_ticks(ticks, now)
+        apply_price_changes(price_deltas)
+
+
+def _is_rate_limit_error(message):
+    return "API credits" in message or "rate limit" in message.lower()
+
+
+def _fetch_unit(tickers, bulk, started):
+    """Fetches prices for one unit of work (a symbol group in bulk mode, otherwise a single
+    ticker). Runs on a worker thread; the only database access is the credit limiter, and the
+    thread's connection is closed before returning.
+    Returns ({ticker: (yesterday_close, current_price)}, {ticker: error message})."""
+    from catalog.stock_utils import get_stock_prices, get_stock_prices_bulk
+
+    started[tuple(tickers)] = time.monotonic()
+    errors = {}
+    try:
+        if bulk:
+            prices = get_stock_prices_bulk(tickers, batch_size=len(tickers), errors=errors)
+        else:
+            prices = {}
+            try:
+                prices[tickers[0]] = get_stock_prices(tickers[0])
+            except RuntimeError as e:
+                # Includes StalePrice: a stored price is not a fresh quote and must not be saved
+                errors[tickers[0]] = str(e)
+    finally:
+        connections.close_all()
+    return prices, errors
+
+
+def update_stock_prices(stock_list, bulk=True, max_workers=None, ticker_timeout=None, deadline=None):
     """Update both start_price (yesterday's closing) and current_price for all stocks.
-    Uses a single API call per stock to get both values."""
-    from catalog.stock_utils import get_stock_prices
-    
-    for stock in stock_list:
-        try:
-            # Get both yesterday's closing price and current price in a single API call
-            yesterday_close, current_price = get_stock_prices(stock.ticker)
-            
-            # Update both prices
-            stock.start_price = yesterday_close
-            stock.current_price = current_price
-            stock.save()
-        except RuntimeError as e:
-            # If API error (like rate limit), skip this stock and continue
-            # Don't crash the whole update process
-            if "API credits" in str(e) or "rate limit" in str(e).lower():
-                # Skip this stock if we're out of API credits
-                continue
-            # For other errors, also skip but don't spam errors
-            pass
-        except Exception as e:
-            # Log and continue so a single failing symbol or missing API key
-            # doesn't abort the entire update process.
-            import traceback
-            traceback.print_exc()
-
-    return stock_list
-    
\ No newline at end of file
+
+    By default prices are fetched in batched quote requests (see get_stock_prices_bulk);
+    bulk=False falls back to one time_series + price request pair per stock. Work units
+    (symbol groups or single tickers) are fetched concurrently on up to `max_workers` threads.
+    A unit still running `ticker_timeout` seconds after it started is given up on, and units
+    unfinished when the total `deadline` (seconds) passes are abandoned. All successful
+    prices are written in one transaction once fetching is done (see _save_prices); stocks
+    that failed keep their stored prices. Resting orders crossed by the new prices are then
+    filled (see catalog.order_book). Returns a RefreshResult."""
+    from catalog.providers import get_provider
+
+    max_workers = max_workers or settings.STOCK_REFRESH_MAX_WORKERS
+    ticker_timeout = ticker_timeout or settings.STOCK_REFRESH_TICKER_TIMEOUT
+    deadline = deadline or settings.STOCK_REFRESH_DEADLINE
+
+    result = RefreshResult()
+    stocks = {stock.ticker: stock for stock in stock_list}
+    tickers = list(stocks)
+    if not tickers:
+        return result
+
+    unit_size = get_provider().batch_size if bulk else 1
+    units = [tickers[i:i + unit_size] for i in range(0, len(tickers), unit_size)]
+
+    prices = {}
+    errors = {}
+    started = {}
+    refresh_start = time.monotonic()
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='price-refresh')
+    try:
+        pending = {executor.submit(_fetch_unit, unit, bulk, started): unit for unit in units}
+        while pending:
+            now = time.monotonic()
+            if now - refresh_start >= deadline:
+                for unit in pending.values():
+                    for ticker in unit:
+                        errors[ticker] = f"Refresh deadline of {deadline}s exceeded"
+                break
+
+            done, _ = wait(pending, timeout=min(1.0, deadline - (now - refresh_start)), return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+            for future in done:
+                unit = pending.pop(future)
+                latency = now - started.get(tuple(unit), now)
+                try:
+                    unit_prices, unit_errors = future.result()
+                except Exception as e:
+                    unit_prices, unit_errors = {}, {ticker: str(e) for ticker in unit}
+                prices.update(unit_prices)
+                errors.update(unit_errors)
+                for ticker in unit:
+                    result.latency[ticker] = latency
+
+            # Give up on units that have been running longer than the per-ticker timeout
+            for future, unit in list(pending.items()):
+                unit_start = started.get(tuple(unit))
+                if unit_start is not None and now - unit_start >= ticker_timeout:
+                    del pending[future]
+                    for ticker in unit:
+                        errors[ticker] = f"Timed out after {ticker_timeout}s"
+                        result.latency[ticker] = now - unit_start
+    finally:
+        # Don't wait on abandoned requests; they finish (or time out) in the background
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    _save_prices(stocks, prices, result)
+    if prices:
+        result.orders_filled, result.orders_rejected = evaluate_orders(
+            {ticker: stocks[ticker].current_price for ticker in prices}
+        )
+
+    for ticker, error in errors.items():
+        if ticker in prices:
+            continue
+        if _is_rate_limit_error(error):
+            result.skipped.append(ticker)
+        else:
+            result.failed[ticker] = error
+            print(f"Failed to update {ticker}: {error}")
+    if result.skipped:
+        print(f"Skipped {len(result.skipped)} stocks: out of API credits")
+
+    return result
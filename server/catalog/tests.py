@@ -1,5 +1,632 @@
-from django.test import TestCase
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock, patch
 
-from server.catalog.stock_utils import get_current_price
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from catalog import trading_calendar
+from catalog.models import (
+    ApiCallTracker, League, LeagueParticipant, Order, ParticipantValuation, PriceBar, PriceTick, RefreshLease, Stock,
+    UserLeagueStock,
+)
+from catalog.order_book import crossed_order_ids
+from catalog.price_history import compact_ticks, rollup_ticks
+from catalog.provider_client import ProviderClient
+from catalog.providers import ProviderError, get_provider, reset_provider
+from catalog.providers.base import PriceProvider, TransientProviderError
+from catalog.providers.fixture import FixtureProvider
+from catalog.providers.resilience import CircuitBreaker, CircuitOpen, ResilientProvider, StalePrice
+from catalog.rate_limiter import ApiCreditLimiter, ApiCreditsExhausted
+from catalog.single_flight import SingleFlight
+from catalog.stock_populator import update_stock_prices
+from catalog.stock_utils import get_current_stock_price, get_profit_float, get_stock_closing_price, get_stock_prices_bulk
+from catalog.valuations import recompute_valuations
 
 # Create your tests here.
+
+
+def _response(payload):
+    response = MagicMock()
+    response.json.return_value = payload
+    response.raise_for_status.return_value = None
+    return response
+
+
+class StockPricesBulkTests(TestCase):
+    @patch('catalog.provider_client.ProviderClient.get')
+    def test_parses_multi_symbol_response(self, mock_get):
+        mock_get.return_value = _response({
+            'AAPL': {'symbol': 'AAPL', 'close': '190.50', 'previous_close': '188.00'},
+            'MSFT': {'symbol': 'MSFT', 'close': '410.00', 'previous_close': '405.25'},
+            'BAD': {'code': 404, 'message': 'symbol not found', 'status': 'error'},
+        })
+        errors = {}
+
+        prices = get_stock_prices_bulk(['AAPL', 'MSFT', 'BAD'], errors=errors)
+
+        self.assertEqual(prices, {'AAPL': (188.0, 190.5), 'MSFT': (405.25, 410.0)})
+        self.assertIn('BAD', errors)
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertIn('symbol=AAPL,MSFT,BAD', mock_get.call_args[0][0])
+
+    @patch('catalog.provider_client.ProviderClient.get')
+    def test_single_symbol_groups_and_request_errors(self, mock_get):
+        mock_get.side_effect = [
+            _response({'symbol': 'AAPL', 'close': '190.50', 'previous_close': '188.00'}),
+            _response({'code': 429, 'message': 'You have run out of API credits', 'status': 'error'}),
+        ]
+        errors = {}
+
+        prices = get_stock_prices_bulk(['AAPL', 'MSFT'], batch_size=1, errors=errors)
+
+        self.assertEqual(prices, {'AAPL': (188.0, 190.5)})
+        self.assertIn('API credits', errors['MSFT'])
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{"price": "1.00"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ProviderClientTests(SimpleTestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _KeepAliveHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/price'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_are_reused(self):
+        client = ProviderClient(pool_maxsize=2)
+        for _ in range(5):
+            self.assertEqual(client.get(self.url).json(), {'price': '1.00'})
+
+        stats = client.stats()
+        client.close()
+
+        self.assertEqual(stats['requests'], 5)
+        self.assertEqual(stats['connections_opened'], 1)
+        self.assertEqual(stats['connections_reused'], 4)
+
+
+class ConcurrentRefreshTests(TestCase):
+    def setUp(self):
+        for ticker in ['AAPL', 'MSFT', 'LIM', 'BAD', 'SLOW']:
+            Stock.objects.create(ticker=ticker, name=ticker, start_price=Decimal('1.00'), current_price=Decimal('1.00'))
+
+    @staticmethod
+    def _fake_prices(ticker):
+        if ticker == 'SLOW':
+            time.sleep(1.5)
+        if ticker == 'LIM':
+            raise RuntimeError('You have run out of API credits for the current minute')
+        if ticker == 'BAD':
+            raise RuntimeError('symbol not found')
+        return (100.0, 101.5)
+
+    @patch('catalog.stock_utils.get_stock_prices')
+    def test_structured_result_with_timeout(self, mock_prices):
+        mock_prices.side_effect = self._fake_prices
+
+        result = update_stock_prices(list(Stock.objects.all()), bulk=False, max_workers=5, ticker_timeout=0.5, deadline=5)
+
+        self.assertEqual(sorted(result.updated), ['AAPL', 'MSFT'])
+        self.assertEqual(result.skipped, ['LIM'])
+        self.assertEqual(sorted(result.failed), ['BAD', 'SLOW'])
+        self.assertIn('Timed out', result.failed['SLOW'])
+        self.assertEqual(set(result.latency), {'AAPL', 'MSFT', 'LIM', 'BAD', 'SLOW'})
+        self.assertEqual(Stock.objects.get(ticker='AAPL').current_price, Decimal('101.50'))
+        self.assertEqual(Stock.objects.get(ticker='SLOW').current_price, Decimal('1.00'))
+
+
+class ApiCreditLimiterTests(TestCase):
+    def test_minute_window(self):
+        limiter = ApiCreditLimiter(per_minute=3, per_day=100, poll_interval=0.01)
+
+        self.assertTrue(limiter.try_acquire(2))
+        self.assertFalse(limiter.try_acquire(2))
+        self.assertTrue(limiter.try_acquire(1))
+        with self.assertRaises(ApiCreditsExhausted):
+            limiter.acquire(1, timeout=0.05)
+        with self.assertRaises(ValueError):
+            limiter.try_acquire(4)
+
+        # Once the window has expired the full budget is available again
+        ApiCallTracker.objects.filter(id=1).update(window_start_time=timezone.now() - timedelta(seconds=61))
+        self.assertTrue(limiter.try_acquire(3))
+        self.assertEqual(limiter.remaining(), {'minute': 0, 'day': 94})
+
+    def test_day_window(self):
+        limiter = ApiCreditLimiter(per_minute=5, per_day=5)
+
+        self.assertTrue(limiter.try_acquire(5))
+        ApiCallTracker.objects.filter(id=1).update(window_start_time=timezone.now() - timedelta(seconds=61))
+        self.assertFalse(limiter.try_acquire(1))
+
+        ApiCallTracker.objects.filter(id=1).update(day_window_start=timezone.now().date() - timedelta(days=1))
+        self.assertTrue(limiter.try_acquire(1))
+
+
+class SingleFlightTests(TransactionTestCase):
+    def test_concurrent_callers_in_process_are_coalesced(self):
+        flight = SingleFlight('test_refresh', lease_seconds=30, wait_seconds=5)
+        calls = []
+        results = []
+
+        def slow_refresh():
+            calls.append(1)
+            time.sleep(0.3)
+            return 'refreshed'
+
+        leader = threading.Thread(target=lambda: results.append(flight.run(slow_refresh)))
+        leader.start()
+        time.sleep(0.1)
+        follower = flight.run(slow_refresh)
+        leader.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [(True, 'refreshed')])
+        self.assertEqual(follower, (False, None))
+        self.assertEqual(flight.stats()['coalesced_local'], 1)
+        self.assertEqual(flight.stats()['leader_runs'], 1)
+
+    def test_lease_held_by_another_process(self):
+        flight = SingleFlight('test_refresh', lease_seconds=30, wait_seconds=0.1, poll_interval=0.02)
+        RefreshLease.objects.create(name='test_refresh', owner='other-host:1', expires_at=timezone.now() + timedelta(seconds=30))
+
+        self.assertEqual(flight.run(lambda: 'refreshed'), (False, None))
+        self.assertEqual(flight.stats()['coalesced_remote'], 1)
+
+        # An expired lease (crashed leader) is taken over
+        RefreshLease.objects.filter(name='test_refresh').update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(flight.run(lambda: 'refreshed'), (True, 'refreshed'))
+        self.assertEqual(RefreshLease.objects.get(name='test_refresh').owner, '')
+
+
+class BulkPriceWriteTests(TestCase):
+    def setUp(self):
+        for ticker in ['AAPL', 'MSFT', 'TSLA']:
+            Stock.objects.create(ticker=ticker, name=ticker, start_price=Decimal('100.00'), current_price=Decimal('100.00'))
+
+    @patch('catalog.stock_utils.get_stock_prices_bulk')
+    def test_changed_rows_written_in_one_statement(self, mock_bulk):
+        mock_bulk.return_value = {'AAPL': (100.0, 101.234), 'MSFT': (100.0, 99.5), 'TSLA': (100.0, 100.0)}
+        stock_list = list(Stock.objects.all())
+
+        # SAVEPOINT, bulk UPDATE, last_updated UPDATE, tick INSERT, holders SELECT, RELEASE,
+        # crossed-orders SELECT
+        with self.assertNumQueries(7):
+            result = update_stock_prices(stock_list, max_workers=1)
+
+        self.assertEqual(sorted(result.updated), ['AAPL', 'MSFT'])
+        self.assertEqual(result.unchanged, ['TSLA'])
+        self.assertEqual(Stock.objects.get(ticker='AAPL').current_price, Decimal('101.23'))
+        self.assertEqual(PriceTick.objects.count(), 3)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ParticipantValuationTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from django.core.cache import cache
+
+        cache.clear()
+
+        self.league = League.objects.create(name='Test League')
+        self.alice = LeagueParticipant.objects.create(league=self.league, user=User.objects.create(username='alice'), current_balance=Decimal('1000.00'))
+        self.bob = LeagueParticipant.objects.create(league=self.league, user=User.objects.create(username='bob'), current_balance=Decimal('1000.00'))
+        Stock.objects.create(ticker='AAPL', name='Apple Inc.', start_price=Decimal('100.00'), current_price=Decimal('100.00'))
+        Stock.objects.create(ticker='MSFT', name='Microsoft', start_price=Decimal('50.00'), current_price=Decimal('50.00'))
+
+    def _valuation(self, participant):
+        valuation = ParticipantValuation.objects.get(participant=participant)
+        return (valuation.cash, valuation.holdings_value, valuation.net_worth, valuation.rank)
+
+    @patch('catalog.stock_utils.get_stock_prices_bulk')
+    def test_trades_and_refreshes_update_incrementally(self, mock_bulk):
+        from api.apiUtils.buySellStock import buy_stock, sell_stock
+
+        self.assertEqual(self._valuation(self.alice), (Decimal('1000'), Decimal('0'), Decimal('1000'), 1))
+
+        buy_stock(self.league.league_id, self.alice.user, 'AAPL', 3)
+        buy_stock(self.league.league_id, self.alice.user, 'MSFT', 2)
+        sell_stock(self.league.league_id, self.alice.user, 'AAPL', 1)
+        self.assertEqual(self._valuation(self.alice), (Decimal('700'), Decimal('300'), Decimal('1000'), 1))
+
+        # AAPL +10, MSFT -5: alice holds 2 of each
+        mock_bulk.return_value = {'AAPL': (100.0, 110.0), 'MSFT': (50.0, 45.0)}
+        update_stock_prices(list(Stock.objects.all()), max_workers=1)
+        self.assertEqual(self._valuation(self.alice), (Decimal('700'), Decimal('310'), Decimal('1010'), 1))
+        self.assertEqual(self._valuation(self.bob)[2:], (Decimal('1000'), 2))
+
+        # A full recompute agrees with the incremental result
+        ParticipantValuation.objects.filter(participant=self.alice).update(net_worth=0, holdings_value=0)
+        recompute_valuations()
+        self.assertEqual(self._valuation(self.alice), (Decimal('700'), Decimal('310'), Decimal('1010'), 1))
+
+    def test_trade_prices_at_execution_not_at_load(self):
+        from catalog.trade_execution import execute_buy
+
+        stale = Stock.objects.get(ticker='AAPL')
+        # A refresh reprices AAPL after the endpoint loaded the stock
+        Stock.objects.filter(ticker='AAPL').update(current_price=Decimal('120.00'))
+
+        trade, _, _ = execute_buy(self.alice, stale, Decimal('2'))
+        self.assertEqual((trade.price, trade.amount), (Decimal('120.00'), Decimal('240.00')))
+        self.assertEqual(self._valuation(self.alice)[:3], (Decimal('760'), Decimal('240'), Decimal('1000')))
+        recompute_valuations()
+        self.assertEqual(self._valuation(self.alice)[:3], (Decimal('760'), Decimal('240'), Decimal('1000')))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class OrderBookTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+
+        league = League.objects.create(name='Test League')
+        self.alice = LeagueParticipant.objects.create(league=league, user=User.objects.create(username='alice'), current_balance=Decimal('1000.00'))
+        Stock.objects.create(ticker='AAPL', name='Apple Inc.', start_price=Decimal('100.00'), current_price=Decimal('100.00'))
+        Stock.objects.create(ticker='MSFT', name='Microsoft', start_price=Decimal('50.00'), current_price=Decimal('50.00'))
+
+    def _order(self, ticker, side, order_type, shares, trigger_price):
+        return Order.objects.create(
+            participant=self.alice, league_id=self.alice.league_id, ticker=ticker, side=side,
+            order_type=order_type, shares=Decimal(shares), trigger_price=Decimal(trigger_price),
+        )
+
+    def test_range_scan_finds_only_crossed_orders(self):
+        buy_limit = self._order('AAPL', Order.BUY, Order.LIMIT, 1, '95.00')
+        sell_stop = self._order('AAPL', Order.SELL, Order.STOP, 1, '92.00')
+        self._order('AAPL', Order.BUY, Order.STOP, 1, '120.00')
+        self._order('AAPL', Order.SELL, Order.LIMIT, 1, '110.00')
+        for i in range(50):
+            self._order('MSFT', Order.SELL, Order.LIMIT, 1, f'{60 + i}.00')
+
+        with self.assertNumQueries(1):
+            crossed = crossed_order_ids({'AAPL': Decimal('90.00'), 'MSFT': Decimal('55.00')})
+        self.assertEqual(crossed, [buy_limit.id, sell_stop.id])
+        self.assertEqual(crossed_order_ids({'AAPL': Decimal('100.00')}), [])
+
+    @patch('catalog.stock_utils.get_stock_prices_bulk')
+    def test_refresh_fills_crossed_orders(self, mock_bulk):
+        filled = self._order('AAPL', Order.BUY, Order.LIMIT, 2, '95.00')
+        too_big = self._order('AAPL', Order.BUY, Order.LIMIT, 100, '95.00')
+        cancelled = self._order('AAPL', Order.BUY, Order.LIMIT, 1, '95.00')
+        Order.objects.filter(pk=cancelled.pk).update(status=Order.CANCELLED)
+        resting = self._order('AAPL', Order.BUY, Order.STOP, 1, '120.00')
+        no_shares = self._order('MSFT', Order.SELL, Order.STOP, 1, '49.00')
+
+        mock_bulk.return_value = {'AAPL': (100.0, 90.0), 'MSFT': (50.0, 45.0)}
+        result = update_stock_prices(list(Stock.objects.all()), max_workers=1)
+        self.assertEqual((result.orders_filled, result.orders_rejected), (1, 2))
+
+        statuses = dict(Order.objects.values_list('id', 'status'))
+        self.assertEqual(statuses[filled.id], Order.FILLED)
+        self.assertEqual(statuses[too_big.id], Order.REJECTED)
+        self.assertEqual(statuses[cancelled.id], Order.CANCELLED)
+        self.assertEqual(statuses[resting.id], Order.OPEN)
+        self.assertEqual(statuses[no_shares.id], Order.REJECTED)
+
+        filled.refresh_from_db()
+        self.assertEqual((filled.trade.price, filled.trade.amount), (Decimal('90.00'), Decimal('180.00')))
+        self.alice.refresh_from_db()
+        self.assertEqual(self.alice.current_balance, Decimal('820.00'))
+        self.assertEqual(UserLeagueStock.objects.get(league_participant=self.alice).shares, Decimal('2'))
+        self.assertEqual(self.alice.valuation.net_worth, Decimal('1000'))
+
+
+class PriceHistoryTests(TestCase):
+    def _tick(self, timestamp, price):
+        PriceTick.objects.create(ticker='AAPL', timestamp=timestamp, price=Decimal(price))
+
+    def test_rollup_and_compaction(self):
+        day = (timezone.now() - timedelta(days=10)).replace(hour=14, minute=30, second=0, microsecond=0)
+        for minutes, price in [(0, '10.00'), (2, '12.00'), (4, '9.00'), (6, '11.00')]:
+            self._tick(day + timedelta(minutes=minutes), price)
+        self._tick(timezone.now() - timedelta(minutes=1), '20.00')
+
+        deleted = compact_ticks(retention_days=7)
+
+        self.assertEqual(deleted, 4)
+        self.assertEqual(PriceTick.objects.count(), 1)
+        first_bar = PriceBar.objects.get(ticker='AAPL', interval=PriceBar.FIVE_MINUTES, bucket=day)
+        self.assertEqual(
+            (first_bar.open, first_bar.high, first_bar.low, first_bar.close, first_bar.tick_count),
+            (Decimal('10.00'), Decimal('12.00'), Decimal('9.00'), Decimal('9.00'), 3),
+        )
+        daily = PriceBar.objects.get(ticker='AAPL', interval=PriceBar.DAILY, bucket=day.replace(hour=0, minute=0))
+        self.assertEqual((daily.open, daily.close, daily.tick_count), (Decimal('10.00'), Decimal('11.00'), 4))
+
+        # Re-running the rollup rewrites bars instead of duplicating them
+        rollup_ticks()
+        rollup_ticks()
+        self.assertEqual(PriceBar.objects.filter(interval=PriceBar.DAILY).count(), 2)
+
+
+class DailyCloseIndexTests(TestCase):
+    @patch('catalog.provider_client.ProviderClient.get')
+    def test_closes_answered_locally_after_backfill(self, mock_get):
+        today = timezone.localdate()
+        values = [
+            {'datetime': (today - timedelta(days=delta)).strftime('%Y-%m-%d'), 'close': f'{100 + delta}.00'}
+            for delta in range(0, 10)
+            if (today - timedelta(days=delta)).weekday() < 5
+        ]
+        mock_get.return_value = _response({'status': 'ok', 'values': values})
+        last_weekday = next(today - timedelta(days=d) for d in range(1, 10) if (today - timedelta(days=d)).weekday() < 5)
+        saturday = next(today - timedelta(days=d) for d in range(1, 10) if (today - timedelta(days=d)).weekday() == 5)
+        friday = saturday - timedelta(days=1)
+
+        self.assertEqual(get_stock_closing_price('AAPL', last_weekday.strftime('%Y-%m-%d')), 100 + (today - last_weekday).days)
+        self.assertEqual(mock_get.call_count, 1)
+
+        # Weekends resolve to the previous trading day, with no further API calls
+        self.assertEqual(get_stock_closing_price('AAPL', saturday.strftime('%Y-%m-%d')), 100 + (today - friday).days)
+        Stock.objects.create(ticker='AAPL', name='Apple Inc.', start_price=Decimal('100.00'), current_price=Decimal('150.00'))
+        self.assertEqual(get_profit_float('AAPL', friday.strftime('%Y-%m-%d')), 150 - (100 + (today - friday).days))
+        self.assertEqual(mock_get.call_count, 1)
+
+
+class DailyCloseCoverageTests(TestCase):
+    def setUp(self):
+        # Weekday closes for June 2025; 2025-06-19 (Juneteenth) is a holiday
+        self.closes = [
+            (date(2025, 6, d), 100 + d) for d in range(30, 0, -1)
+            if date(2025, 6, d).weekday() < 5 and d != 19
+        ]
+
+    def _history(self, available_through):
+        def history(ticker, start_date=None, outputsize=30):
+            return [(day, close) for day, close in self.closes if start_date <= day <= available_through]
+        return patch('catalog.stock_utils.get_daily_closes', side_effect=history)
+
+    @patch('catalog.price_history.trading_calendar.last_session_date', return_value=date(2025, 6, 27))
+    def test_coverage_extends_backwards_and_retries_missing_sessions(self, _):
+        from catalog.models import DailyCloseBackfill
+        from catalog.price_history import backfill_daily_closes, get_close_on_or_before
+
+        # The provider doesn't have the last session yet
+        with self._history(date(2025, 6, 26)) as history:
+            backfill_daily_closes('AAPL', days=5)
+        state = DailyCloseBackfill.objects.get(ticker='AAPL')
+        self.assertEqual((state.covered_from, state.covered_through), (date(2025, 6, 22), date(2025, 6, 26)))
+
+        with self._history(date(2025, 6, 26)) as history:
+            # Before the first backfill window: the range is extended backwards
+            self.assertEqual(get_close_on_or_before('AAPL', date(2025, 6, 3)), Decimal('103'))
+            self.assertEqual(history.call_args.kwargs['start_date'], date(2025, 5, 27))
+            self.assertEqual(get_close_on_or_before('AAPL', date(2025, 6, 19)), Decimal('118'))
+            self.assertEqual(history.call_count, 1)
+        state.refresh_from_db()
+        self.assertEqual((state.covered_from, state.covered_through), (date(2025, 5, 27), date(2025, 6, 26)))
+
+        with self._history(date(2025, 6, 27)) as history:
+            # The missing session is asked for again and stored once the provider has it
+            self.assertEqual(get_close_on_or_before('AAPL', date(2025, 6, 27)), Decimal('127'))
+            self.assertEqual(history.call_args.kwargs['start_date'], date(2025, 6, 27))
+            self.assertEqual(get_close_on_or_before('AAPL', date(2025, 6, 27)), Decimal('127'))
+            self.assertEqual(history.call_count, 1)
+        state.refresh_from_db()
+        self.assertEqual((state.covered_from, state.covered_through), (date(2025, 5, 27), date(2025, 6, 27)))
+
+
+class TradingCalendarTests(SimpleTestCase):
+    def test_holidays_and_early_closes(self):
+        self.assertFalse(trading_calendar.is_trading_day(date(2025, 4, 18)))   # Good Friday
+        self.assertFalse(trading_calendar.is_trading_day(date(2026, 7, 3)))    # July 4th on a Saturday
+        self.assertFalse(trading_calendar.is_trading_day(date(2022, 12, 26)))  # Christmas on a Sunday
+        self.assertTrue(trading_calendar.is_trading_day(date(2021, 12, 31)))   # New Year's on a Saturday isn't observed
+        self.assertTrue(trading_calendar.is_trading_day(date(2021, 6, 18)))    # Before Juneteenth was a holiday
+        self.assertFalse(trading_calendar.is_trading_day(date(2023, 6, 19)))
+        self.assertEqual(trading_calendar.session(date(2025, 11, 28))[1].hour, 13)
+        self.assertEqual(trading_calendar.session(date(2025, 7, 3))[1].hour, 13)
+        self.assertEqual(trading_calendar.session(date(2025, 7, 2))[1].hour, 16)
+
+    def test_sessions_follow_daylight_saving_time(self):
+        # US clocks moved forward on 2025-03-09: the open moves from 14:30 to 13:30 UTC
+        self.assertEqual(trading_calendar.session(date(2025, 3, 7))[0].astimezone(dt_timezone.utc).hour, 14)
+        self.assertEqual(trading_calendar.session(date(2025, 3, 10))[0].astimezone(dt_timezone.utc).hour, 13)
+        self.assertTrue(trading_calendar.is_market_open(datetime(2025, 3, 10, 13, 45, tzinfo=dt_timezone.utc)))
+        self.assertFalse(trading_calendar.is_market_open(datetime(2025, 3, 7, 14, 15, tzinfo=dt_timezone.utc)))
+
+    def test_next_open_and_last_close_skip_closed_days(self):
+        # Thursday before Good Friday, after the close
+        thursday_evening = datetime(2025, 4, 17, 18, 0, tzinfo=trading_calendar.EASTERN)
+        self.assertEqual(trading_calendar.next_open(thursday_evening), datetime(2025, 4, 21, 9, 30, tzinfo=trading_calendar.EASTERN))
+        self.assertEqual(trading_calendar.last_close(datetime(2025, 4, 20, 12, 0, tzinfo=trading_calendar.EASTERN)),
+                         datetime(2025, 4, 17, 16, 0, tzinfo=trading_calendar.EASTERN))
+        self.assertEqual(trading_calendar.last_session_date(thursday_evening), date(2025, 4, 17))
+
+
+class UpdateStocksScheduleTests(TestCase):
+    def setUp(self):
+        Stock.objects.create(ticker='AAPL', name='Apple Inc.', start_price=Decimal('100.00'), current_price=Decimal('150.00'))
+
+    def _update_stocks(self, now, last_updated, force=False):
+        import update_stocks as update_stocks_module
+
+        Stock.objects.update(last_updated=last_updated)
+        with patch.object(update_stocks_module, '_refresh', return_value=True) as refresh, \
+                patch('django.utils.timezone.now', return_value=now):
+            update_stocks_module.update_stocks(force=force)
+        return refresh.call_count
+
+    def test_closed_market_keeps_final_quotes_even_when_forced(self):
+        eastern = trading_calendar.EASTERN
+        saturday = datetime(2025, 6, 21, 12, 0, tzinfo=eastern)
+        friday_close = datetime(2025, 6, 20, 16, 0, tzinfo=eastern)
+
+        self.assertEqual(self._update_stocks(saturday, friday_close + timedelta(minutes=10), force=True), 0)
+        # The closing prices were never captured: one final refresh is still due
+        self.assertEqual(self._update_stocks(saturday, friday_close - timedelta(minutes=10)), 1)
+
+    def test_open_market_refreshes_every_five_minutes(self):
+        eastern = trading_calendar.EASTERN
+        now = datetime(2025, 6, 20, 11, 7, tzinfo=eastern)
+
+        self.assertEqual(self._update_stocks(now, now - timedelta(minutes=1)), 0)
+        self.assertEqual(self._update_stocks(now, now - timedelta(minutes=1), force=True), 1)
+        self.assertEqual(self._update_stocks(now, now - timedelta(minutes=3)), 1)
+
+    @override_settings(VALUATION_RECOMPUTE_EVERY=3)
+    def test_valuations_recomputed_periodically_and_after_the_close(self):
+        import update_stocks as update_stocks_module
+
+        update_stocks_module._refreshes_since_recompute = 0
+        with patch.object(update_stocks_module.refresh_flight, 'run', return_value=(True, None)), \
+                patch.object(update_stocks_module, 'publish_board'), \
+                patch.object(update_stocks_module, 'recompute_valuations') as recompute:
+            for _ in range(5):
+                update_stocks_module._refresh([])
+            self.assertEqual(recompute.call_count, 1)
+            update_stocks_module._refresh([], closing=True)
+            self.assertEqual(recompute.call_count, 2)
+
+
+class FixtureProviderTests(TestCase):
+    def tearDown(self):
+        reset_provider()
+
+    @override_settings(
+        STOCK_PRICE_PROVIDER='catalog.providers.fixture.FixtureProvider',
+        STOCK_PRICE_PROVIDER_OPTIONS={'seed': 1},
+    )
+    def test_selected_via_settings_and_deterministic(self):
+        reset_provider()
+        provider = get_provider()
+
+        self.assertIsInstance(provider.providers[0], FixtureProvider)
+        first = get_stock_prices_bulk(['AAPL', 'MSFT'])
+        self.assertEqual(first, FixtureProvider(seed=2).batch_quote(['AAPL', 'MSFT']))
+        self.assertEqual(len(provider.history('AAPL', outputsize=5)), 5)
+
+    def test_error_rate(self):
+        provider = FixtureProvider(error_rate=1.0)
+        errors = {}
+
+        self.assertEqual(provider.batch_quote(['AAPL'], errors=errors), {})
+        self.assertIn('simulated error', errors['AAPL'])
+        with self.assertRaises(ProviderError):
+            provider.quote('AAPL')
+
+
+class _FlakyProvider(PriceProvider):
+    name = 'flaky'
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def quote_group(self, tickers):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise TransientProviderError('connection reset')
+        return {ticker: (1.0, 2.0) for ticker in tickers}, {}
+
+
+class _RejectingProvider(PriceProvider):
+    """Answers every request like a provider whose API key was revoked, or with an unknown symbol."""
+    name = 'rejecting'
+
+    def __init__(self, rejected=True):
+        self.rejected = rejected
+        self.calls = 0
+
+    def quote_group(self, tickers):
+        self.calls += 1
+        error = ProviderError('401 Unauthorized' if self.rejected else 'symbol not found')
+        error.rejected = self.rejected
+        raise error
+
+
+class ResilienceTests(TestCase):
+    def test_breaker_opens_and_half_open_probe(self):
+        breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=0.05)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())   # the single half-open probe
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.snapshot(), {'state': 'closed', 'consecutive_failures': 0, 'trips': 1})
+
+    def test_retries_then_falls_back_to_secondary(self):
+        flaky = _FlakyProvider(failures=1)
+        provider = ResilientProvider([flaky], retries=1, backoff_base=0)
+        self.assertEqual(provider.batch_quote(['AAPL']), {'AAPL': (1.0, 2.0)})
+        self.assertEqual(flaky.calls, 2)
+
+        down = _FlakyProvider(failures=100)
+        provider = ResilientProvider(
+            [down, FixtureProvider()],
+            retries=0, failure_threshold=1, reset_timeout=60,
+        )
+        errors = {}
+        self.assertEqual(set(provider.batch_quote(['AAPL', 'MSFT'], batch_size=1, errors=errors)), {'AAPL', 'MSFT'})
+        self.assertEqual(errors, {})
+        # The breaker opened after the first failure, so the second group skipped the dead provider
+        self.assertEqual(down.calls, 1)
+        self.assertEqual(provider.breaker_states()['flaky']['state'], 'open')
+
+    def test_rejected_requests_open_the_breaker(self):
+        rejecting = _RejectingProvider()
+        provider = ResilientProvider([rejecting], retries=2, failure_threshold=3, stored_price_fallback=False)
+        for _ in range(3):
+            with self.assertRaises(ProviderError):
+                provider.quote('AAPL')
+        self.assertEqual(rejecting.calls, 3)  # Not retried
+        self.assertEqual(provider.breaker_states()['rejecting']['state'], 'open')
+
+        with self.assertRaises(CircuitOpen):
+            provider.quote('AAPL')
+        self.assertEqual(rejecting.calls, 3)
+
+        # An unknown symbol is the provider working normally
+        unknown = ResilientProvider([_RejectingProvider(rejected=False)], failure_threshold=3, stored_price_fallback=False)
+        for _ in range(5):
+            with self.assertRaises(ProviderError):
+                unknown.quote('NOPE')
+        self.assertEqual(unknown.breaker_states()['rejecting']['state'], 'closed')
+
+    def test_quote_falls_back_to_stored_price(self):
+        Stock.objects.create(ticker='AAPL', name='Apple Inc.', start_price=Decimal('100.00'), current_price=Decimal('105.00'))
+        provider = ResilientProvider([_FlakyProvider(failures=100)], retries=0)
+
+        with self.assertRaises(StalePrice) as stale:
+            provider.quote('AAPL')
+        self.assertEqual(stale.exception.prices, (100.0, 105.0))
+        with self.assertRaises(ProviderError):
+            provider.quote('MSFT')
+
+    def test_refresh_does_not_save_stored_price_fallback(self):
+        last_updated = timezone.now() - timedelta(hours=1)
+        Stock.objects.create(ticker='AAPL', name='Apple Inc.', start_price=Decimal('100.00'), current_price=Decimal('105.00'))
+        Stock.objects.filter(ticker='AAPL').update(last_updated=last_updated)
+        provider = ResilientProvider([_FlakyProvider(failures=100)], retries=0)
+
+        with patch('catalog.stock_utils.get_provider', return_value=provider):
+            result = update_stock_prices(list(Stock.objects.all()), bulk=False)
+            self.assertEqual(get_current_stock_price('AAPL'), 105.0)
+
+        self.assertEqual((result.updated, result.unchanged), ([], []))
+        self.assertIn('AAPL', result.failed)
+        self.assertEqual(Stock.objects.get(ticker='AAPL').last_updated, last_updated)
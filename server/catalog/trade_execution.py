@@ -0,0 +1,142 @@
+"""Executes a single buy or sell for a league participant.
+
+Shared by the buy/sell endpoints and by resting orders filled during a price refresh. Each
+trade runs in its own atomic block (a savepoint when the caller already holds a transaction):
+the balance and position are moved with conditional F() updates, so concurrent trades can
+never overdraw cash or shares, and the valuation and ledger are written in the same block.
+A trade that can't go ahead raises TradeError and leaves nothing behind.
+
+The price is read inside that block with the stock row locked, never taken from a Stock loaded
+earlier: a refresh that reprices the stock either commits before the read or waits for the
+trade, so the holdings booked into the valuation always match what apply_price_changes moves.
+"""
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, FloatField
+from django.db.models.functions import Cast
+
+from catalog.models import LeagueParticipant, Stock, Trade, UserLeagueStock
+from catalog.trade_ledger import record_trade
+from catalog.valuations import apply_trade
+
+
+class TradeError(Exception):
+    """A trade was refused (insufficient balance or shares). `status` is the HTTP status
+    the endpoints answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def money(amount):
+    """Rounds a trade amount to cents, the precision balances are stored with."""
+    return amount.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+# Largest share count or price the 2-decimal-place columns (max_digits=10) can store
+MAX_QUANTITY = Decimal('99999999.99')
+
+
+def parse_quantity(value):
+    """Parses a requested share count or price, rounded to cents like money(). Returns None
+    unless it is a finite number from 0.01 to MAX_QUANTITY."""
+    try:
+        quantity = money(Decimal(str(value)))
+        return quantity if 0 < quantity <= MAX_QUANTITY else None
+    except InvalidOperation:
+        return None
+
+
+def lock_prices(tickers):
+    """Locks the stock rows for `tickers` for the rest of the transaction, in primary key order
+    so concurrent lockers can't deadlock, and returns {ticker: current_price}.
+    Backends with row locks use SELECT ... FOR UPDATE. SQLite has none, so there the lock is a
+    no-op UPDATE: being a write, it takes the database write lock up front, where a read
+    followed by the trade's writes would fail with "database is locked" under concurrent trades."""
+    stocks = Stock.objects.filter(pk__in=tickers).order_by('pk')
+    if connection.features.has_select_for_update:
+        return dict(stocks.select_for_update().values_list('ticker', 'current_price'))
+    stocks.update(current_price=F('current_price'))
+    return dict(stocks.values_list('ticker', 'current_price'))
+
+
+def _average_price(cost, shares):
+    """New average price of a position after buying `shares` for `cost`, computed from the
+    stored row. The division is done in floating point: SQLite stores whole-number decimals
+    as integers and would otherwise truncate it."""
+    return ExpressionWrapper(
+        Cast(F('avg_price_per_share') * F('shares') + cost, FloatField()) / (F('shares') + shares),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+
+
+def execute_buy(participant, stock, shares, price=None):
+    """Buys `shares` of `stock` at its current price. A caller that already holds the stock's
+    lock (see lock_prices) in its own transaction passes the price it read under that lock.
+    Returns (trade, new_balance, total_shares)."""
+    with transaction.atomic():
+        if price is None:
+            price = lock_prices([stock.pk])[stock.pk]
+        cost = money(price * shares)
+
+        # Debit only if the balance covers it; the row lock is held for the rest of the trade
+        debited = LeagueParticipant.objects.filter(pk=participant.pk, current_balance__gte=cost).update(
+            current_balance=F('current_balance') - cost
+        )
+        if not debited:
+            raise TradeError('Insufficient balance')
+
+        # Add the shares; the new weighted average price is computed from the stored row in SQL
+        holding = UserLeagueStock.objects.filter(league_participant=participant, stock=stock)
+        added = holding.update(avg_price_per_share=_average_price(cost, shares), shares=F('shares') + shares)
+        if not added:
+            try:
+                with transaction.atomic():
+                    UserLeagueStock.objects.create(
+                        league_participant=participant,
+                        stock=stock,
+                        shares=shares,
+                        avg_price_per_share=price,
+                    )
+            except IntegrityError:
+                # A concurrent buy created the position first
+                holding.update(avg_price_per_share=_average_price(cost, shares), shares=F('shares') + shares)
+
+        # Cash turns into holdings worth the same at the current price
+        apply_trade(participant, -cost, cost)
+        trade = record_trade(participant, stock.ticker, Trade.BUY, shares, price, cost)
+
+        new_balance = LeagueParticipant.objects.values_list('current_balance', flat=True).get(pk=participant.pk)
+        total_shares = holding.values_list('shares', flat=True).get()
+    return trade, new_balance, total_shares
+
+
+def execute_sell(participant, stock, shares, price=None):
+    """Sells `shares` of `stock` at its current price (or the `price` read under the caller's
+    lock, as for execute_buy). Returns (trade, new_balance, remaining_shares)."""
+    with transaction.atomic():
+        if price is None:
+            price = lock_prices([stock.pk])[stock.pk]
+        revenue = money(price * shares)
+
+        # Remove the shares only if the position still holds enough of them
+        holding = UserLeagueStock.objects.filter(league_participant=participant, stock=stock)
+        removed = holding.filter(shares__gte=shares).update(shares=F('shares') - shares)
+        if not removed:
+            owned_shares = holding.values_list('shares', flat=True).first()
+            if owned_shares is None:
+                raise TradeError('You do not own this stock', status=404)
+            raise TradeError(f'Insufficient shares. You own {owned_shares} shares')
+        holding.filter(shares__lte=0).delete()
+        remaining_shares = holding.values_list('shares', flat=True).first() or Decimal('0.00')
+
+        LeagueParticipant.objects.filter(pk=participant.pk).update(current_balance=F('current_balance') + revenue)
+
+        # Holdings turn into the same amount of cash at the current price
+        apply_trade(participant, revenue, -revenue)
+        trade = record_trade(participant, stock.ticker, Trade.SELL, shares, price, revenue)
+
+        new_balance = LeagueParticipant.objects.values_list('current_balance', flat=True).get(pk=participant.pk)
+    return trade, new_balance, remaining_shares
@@ -0,0 +1,115 @@
+"""Trade ledger: records every executed trade and replays the ledger to verify (or restore)
+participants' balances and positions.
+
+Trades are appended inside the trade's own transaction, so the ledger never disagrees with
+the balance and position it produced. History is read newest first with keyset pagination on
+the trade id (see the participant/league indexes on Trade). Participants that existed before
+the ledger start from opening entries (Trade.OPEN) instead of the starting balance.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import Case, Value, When
+
+from catalog.models import LeagueParticipant, Stock, Trade, UserLeagueStock
+
+# Cash every participant starts a league with
+STARTING_BALANCE = Decimal('10000.00')
+CENT = Decimal('0.01')
+
+
+def record_trade(participant, ticker, side, shares, price, amount):
+    """Appends a trade. Call inside the trade's transaction."""
+    return Trade.objects.create(
+        participant=participant, league_id=participant.league_id, ticker=ticker,
+        side=side, shares=shares, price=price, amount=amount,
+    )
+
+
+def trade_history(trades, before=None, limit=50):
+    """Returns (page, next_cursor) for a Trade queryset, newest first.
+    `before` is the next_cursor of the previous page; next_cursor is None on the last page."""
+    if before is not None:
+        trades = trades.filter(id__lt=before)
+    page = list(trades.order_by('-id')[:limit + 1])
+    if len(page) > limit:
+        page = page[:limit]
+        return page, page[-1].id
+    return page, None
+
+
+def replay_ledger(chunk_size=2000):
+    """Replays every trade in order in one streaming pass, starting from the opening entries
+    of participants that predate the ledger (Trade.OPEN, written by migration 0021).
+    Returns {participant_id: {'balance': Decimal, 'positions': {ticker: [shares, avg_price]}}}
+    for every participant; those without trades keep the starting balance."""
+    state = {
+        participant_id: {'balance': STARTING_BALANCE, 'positions': {}}
+        for participant_id in LeagueParticipant.objects.values_list('id', flat=True)
+    }
+    trades = Trade.objects.order_by(
+        Case(When(side=Trade.OPEN, then=Value(0)), default=Value(1)), 'id'
+    ).values_list('participant_id', 'ticker', 'side', 'shares', 'price', 'amount')
+    for participant_id, ticker, side, shares, price, amount in trades.iterator(chunk_size=chunk_size):
+        account = state.setdefault(participant_id, {'balance': STARTING_BALANCE, 'positions': {}})
+        if side == Trade.OPEN:
+            if ticker:
+                account['positions'][ticker] = [shares, price]
+            else:
+                account['balance'] += amount
+            continue
+        position = account['positions'].setdefault(ticker, [Decimal('0'), price])
+        if side == Trade.BUY:
+            account['balance'] -= amount
+            total_shares = position[0] + shares
+            position[1] = ((position[1] * position[0] + amount) / total_shares).quantize(CENT, rounding=ROUND_HALF_UP)
+            position[0] = total_shares
+        else:
+            account['balance'] += amount
+            position[0] -= shares
+            if position[0] <= 0:
+                del account['positions'][ticker]
+    return state
+
+
+def rebuild_positions(apply=False):
+    """Compares stored balances and positions with the replayed ledger.
+    Returns a list of human-readable differences; with apply=True the stored rows are
+    corrected to match the ledger."""
+    replayed = replay_ledger()
+    differences = []
+    stored_positions = {}
+    for participant_id, ticker, shares, avg_price in UserLeagueStock.objects.values_list(
+        'league_participant_id', 'stock_id', 'shares', 'avg_price_per_share'
+    ):
+        stored_positions.setdefault(participant_id, {})[ticker] = (shares, avg_price)
+
+    with transaction.atomic():
+        for participant_id, balance in LeagueParticipant.objects.values_list('id', 'current_balance'):
+            account = replayed[participant_id]
+            if balance != account['balance']:
+                differences.append(f"participant {participant_id}: balance {balance} != ledger {account['balance']}")
+                if apply:
+                    LeagueParticipant.objects.filter(id=participant_id).update(current_balance=account['balance'])
+
+            stored = stored_positions.get(participant_id, {})
+            for ticker in sorted(set(stored) | set(account['positions'])):
+                shares, avg_price = stored.get(ticker, (Decimal('0'), None))
+                ledger_shares, ledger_avg = account['positions'].get(ticker, (Decimal('0'), None))
+                if shares == ledger_shares and (
+                    avg_price is None or ledger_avg is None or abs(avg_price - ledger_avg) <= CENT
+                ):
+                    continue
+                differences.append(
+                    f"participant {participant_id} {ticker}: {shares} @ {avg_price} != ledger {ledger_shares} @ {ledger_avg}"
+                )
+                if not apply:
+                    continue
+                if ledger_shares <= 0:
+                    UserLeagueStock.objects.filter(league_participant_id=participant_id, stock_id=ticker).delete()
+                elif Stock.objects.filter(ticker=ticker).exists():
+                    UserLeagueStock.objects.update_or_create(
+                        league_participant_id=participant_id, stock_id=ticker,
+                        defaults={'shares': ledger_shares, 'avg_price_per_share': ledger_avg},
+                    )
+    return differences
@@ -0,0 +1,149 @@
+"""NYSE trading calendar: regular sessions, early closes and exchange holidays.
+
+All session arithmetic is done in America/New_York, so the 9:30-16:00 session lands on the
+right UTC instants on both sides of a DST change. Each year's holidays and early closes are
+computed once and cached. Functions accept aware datetimes (any zone) and return aware
+datetimes in Eastern time.
+"""
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+from django.utils import timezone
+
+EASTERN = ZoneInfo('America/New_York')
+OPEN_TIME = time(9, 30)
+CLOSE_TIME = time(16, 0)
+EARLY_CLOSE_TIME = time(13, 0)
+
+# Closing prints can take a few minutes to settle, so a refresh this soon after the close
+# doesn't count as having captured the closing prices
+CLOSE_SETTLE = timedelta(minutes=5)
+
+
+def _nth_weekday(year, month, weekday, n):
+    """Returns the nth (1-based) given weekday of a month; n=-1 is the last one."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year, month + 1, 1) - timedelta(days=1) if month < 12 else date(year, 12, 31)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year):
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _observed(day):
+    """Fixed-date holidays on a Saturday are observed on Friday, on a Sunday on Monday."""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=None)
+def holidays(year):
+    """Returns {date: name} of the exchange holidays that fall in `year`."""
+    days = {}
+    # NYSE doesn't close on the preceding Friday when New Year's Day is a Saturday
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        days[_observed(new_year)] = "New Year's Day"
+    days[_nth_weekday(year, 1, 0, 3)] = 'Martin Luther King Jr. Day'
+    days[_nth_weekday(year, 2, 0, 3)] = "Washington's Birthday"
+    days[_easter(year) - timedelta(days=2)] = 'Good Friday'
+    days[_nth_weekday(year, 5, 0, -1)] = 'Memorial Day'
+    if year >= 2022:
+        days[_observed(date(year, 6, 19))] = 'Juneteenth'
+    days[_observed(date(year, 7, 4))] = 'Independence Day'
+    days[_nth_weekday(year, 9, 0, 1)] = 'Labor Day'
+    days[_nth_weekday(year, 11, 3, 4)] = 'Thanksgiving Day'
+    days[_observed(date(year, 12, 25))] = 'Christmas Day'
+    return days
+
+
+@lru_cache(maxsize=None)
+def early_closes(year):
+    """Returns the set of days in `year` on which the market closes at 13:00."""
+    candidates = (
+        date(year, 7, 3),                                    # Day before Independence Day
+        _nth_weekday(year, 11, 3, 4) + timedelta(days=1),    # Day after Thanksgiving
+        date(year, 12, 24),                                  # Christmas Eve
+    )
+    return frozenset(day for day in candidates if day.weekday() < 5 and day not in holidays(year))
+
+
+def is_trading_day(day):
+    """Returns True if the exchange has a session on `day` (a date)."""
+    return day.weekday() < 5 and day not in holidays(day.year)
+
+
+def session(day):
+    """Returns the (open, close) Eastern datetimes for `day`, or None if the market is closed."""
+    if not is_trading_day(day):
+        return None
+    close_time = EARLY_CLOSE_TIME if day in early_closes(day.year) else CLOSE_TIME
+    return (
+        datetime.combine(day, OPEN_TIME, tzinfo=EASTERN),
+        datetime.combine(day, close_time, tzinfo=EASTERN),
+    )
+
+
+def _eastern(at):
+    return (at or timezone.now()).astimezone(EASTERN)
+
+
+def is_market_open(at=None):
+    """Returns True if `at` (default now) falls inside a trading session."""
+    at = _eastern(at)
+    hours = session(at.date())
+    return hours is not None and hours[0] <= at < hours[1]
+
+
+def next_open(at=None):
+    """Returns the start of the first session that opens after `at` (default now)."""
+    at = _eastern(at)
+    day = at.date()
+    while True:
+        hours = session(day)
+        if hours is not None and hours[0] > at:
+            return hours[0]
+        day += timedelta(days=1)
+
+
+def last_close(at=None):
+    """Returns the end of the most recent session that closed at or before `at` (default now)."""
+    at = _eastern(at)
+    day = at.date()
+    while True:
+        hours = session(day)
+        if hours is not None and hours[1] <= at:
+            return hours[1]
+        day -= timedelta(days=1)
+
+
+def last_session_date(at=None):
+    """Returns the date of the most recent completed session, i.e. the newest final daily close."""
+    return last_close(_eastern(at) - CLOSE_SETTLE).date()
+
+
+def quotes_are_final(last_refresh, at=None):
+    """Returns True if the market is closed at `at` (default now) and a refresh at
+    `last_refresh` already captured the last session's closing prices. Stored quotes then
+    stay valid until next_open()."""
+    if last_refresh is None or is_market_open(at):
+        return False
+    return last_refresh >= last_close(at) + CLOSE_SETTLE
@@ -0,0 +1,139 @@
+"""Materialized participant valuations (cash, holdings value, net worth and rank per league).
+
+Rows are created with the participant and then adjusted incrementally:
+- apply_trade moves the trade amount between cash and holdings inside the trade transaction;
+- apply_price_changes adds shares * price delta for every holder of a repriced ticker, found
+  through the UserLeagueStock stock index, inside the refresh transaction.
+Both use F() updates so concurrent writers never lose each other's deltas. Ranks are
+recomputed for the affected leagues after price changes; recompute_valuations rebuilds every
+row from the holdings to catch any drift. The refresher runs it periodically and after the
+close (update_stocks), and it can be run by hand (manage.py recompute_valuations).
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from catalog.models import LeagueParticipant, ParticipantValuation, UserLeagueStock
+
+MONEY = DecimalField(max_digits=16, decimal_places=4)
+UPDATE_BATCH_SIZE = 500
+
+
+def create_valuation(participant):
+    """Creates the valuation row for a new participant (no holdings yet)."""
+    ParticipantValuation.objects.get_or_create(
+        participant=participant,
+        defaults={
+            'league_id': participant.league_id,
+            'cash': participant.current_balance,
+            'net_worth': participant.current_balance,
+        },
+    )
+    rerank_leagues([participant.league_id])
+
+
+def get_valuation(participant):
+    """Returns the participant's valuation, rebuilding the league's rows if it is missing."""
+    try:
+        return participant.valuation
+    except ParticipantValuation.DoesNotExist:
+        recompute_valuations([participant.league_id])
+        return ParticipantValuation.objects.get(participant=participant)
+
+
+def apply_trade(participant, cash_delta, holdings_delta):
+    """Adjusts a participant's valuation by a trade's effect on cash and holdings value.
+    Call inside the trade's transaction."""
+    ParticipantValuation.objects.filter(participant=participant).update(
+        cash=F('cash') + Value(cash_delta, output_field=MONEY),
+        holdings_value=F('holdings_value') + Value(holdings_delta, output_field=MONEY),
+        net_worth=F('net_worth') + Value(cash_delta + holdings_delta, output_field=MONEY),
+    )
+
+
+def apply_price_changes(price_deltas):
+    """Adds shares * delta to every holder of each repriced ticker and reranks their leagues.
+    `price_deltas` is {ticker: new price - old price}. Returns the number of participants updated."""
+    price_deltas = {ticker: delta for ticker, delta in price_deltas.items() if delta}
+    if not price_deltas:
+        return 0
+
+    per_ticker = Case(
+        *[When(stock_id=ticker, then=Value(delta)) for ticker, delta in price_deltas.items()],
+        output_field=MONEY,
+    )
+    holders = list(
+        UserLeagueStock.objects.filter(stock_id__in=price_deltas)
+        .values('league_participant_id', 'league_participant__league_id')
+        .annotate(delta=Sum(F('shares') * per_ticker, output_field=MONEY))
+        .values_list('league_participant_id', 'league_participant__league_id', 'delta')
+    )
+    deltas = [(participant_id, delta) for participant_id, _, delta in holders if delta]
+    for i in range(0, len(deltas), UPDATE_BATCH_SIZE):
+        batch = deltas[i:i + UPDATE_BATCH_SIZE]
+        per_participant = Case(
+            *[When(participant_id=participant_id, then=Value(delta)) for participant_id, delta in batch],
+            output_field=MONEY,
+        )
+        ParticipantValuation.objects.filter(participant_id__in=[participant_id for participant_id, _ in batch]).update(
+            holdings_value=F('holdings_value') + per_participant,
+            net_worth=F('net_worth') + per_participant,
+        )
+    if deltas:
+        rerank_leagues({league_id for _, league_id, delta in holders if delta})
+    return len(deltas)
+
+
+def rerank_leagues(league_ids):
+    """Recomputes ranks (1 = highest net worth, ties share a rank) for the given leagues and
+    writes only the ranks that changed."""
+    rows = (
+        ParticipantValuation.objects.filter(league_id__in=league_ids)
+        .order_by('league_id', '-net_worth')
+        .values_list('participant_id', 'league_id', 'net_worth', 'rank')
+    )
+    changed = []
+    league_id = previous_worth = None
+    position = rank = 0
+    for participant_id, row_league_id, net_worth, current_rank in rows:
+        if row_league_id != league_id:
+            league_id, position, previous_worth = row_league_id, 0, None
+        position += 1
+        if net_worth != previous_worth:
+            rank, previous_worth = position, net_worth
+        if rank != current_rank:
+            changed.append(ParticipantValuation(participant_id=participant_id, rank=rank))
+    ParticipantValuation.objects.bulk_update(changed, ['rank'], batch_size=UPDATE_BATCH_SIZE)
+    return len(changed)
+
+
+def recompute_valuations(league_ids=None):
+    """Rebuilds valuations from balances and holdings at the stored prices (one aggregate
+    query), creating missing rows, then reranks. Returns the number of rows written."""
+    participants = LeagueParticipant.objects.all()
+    if league_ids is not None:
+        participants = participants.filter(league_id__in=league_ids)
+    rows = participants.annotate(
+        stock_value=Coalesce(
+            Sum(F('userleaguestock__shares') * F('userleaguestock__stock__current_price'), output_field=MONEY),
+            Value(Decimal('0')),
+            output_field=MONEY,
+        ),
+    ).values_list('id', 'league_id', 'current_balance', 'stock_value')
+
+    valuations = [
+        ParticipantValuation(
+            participant_id=participant_id, league_id=league_id, cash=cash,
+            holdings_value=stock_value, net_worth=cash + stock_value,
+        )
+        for participant_id, league_id, cash, stock_value in rows
+    ]
+    with transaction.atomic():
+        ParticipantValuation.objects.bulk_create(
+            valuations, batch_size=UPDATE_BATCH_SIZE, update_conflicts=True,
+            unique_fields=['participant'], update_fields=['league', 'cash', 'holdings_value', 'net_worth'],
+        )
+        rerank_leagues({valuation.league_id for valuation in valuations})
+    return len(valuations)
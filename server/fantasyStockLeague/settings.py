@@ -10,7 +10,10 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import json
 import os
+import sys
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -56,6 +59,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.apiUtils.leagueResolver.LeagueResolverMiddleware',
 ]
 
 ROOT_URLCONF = 'fantasyStockLeague.urls'
@@ -88,6 +92,9 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # File-backed test database: the default in-memory one uses shared-cache table locks,
+        # which fail immediately instead of waiting, so concurrent trade tests can't run on it
+        "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
     }
 }
 
@@ -95,6 +102,29 @@ DATABASES = {
 if os.getenv("DATABASE_URL"):
     DATABASES["default"] = dj_database_url.parse(os.getenv("DATABASE_URL"))
 
+# True while running manage.py test
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
+# Shared cache for data every worker process must agree on (e.g. the stock board snapshot).
+# File-based by default so all workers on a host share it; set CACHE_BACKEND/CACHE_LOCATION
+# to use memcached or redis instead. Test runs get a private in-memory cache so they never
+# share board versions, auth versions or locks with a local server.
+# CACHE_MAX_ENTRIES bounds the cache before it starts culling; keep it well above the number
+# of live keys (board versions, per-user auth versions, league memberships).
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '20000'))
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", os.path.join(tempfile.gettempdir(), "fantasy_stock_league_cache")),
+        "OPTIONS": {"MAX_ENTRIES": CACHE_MAX_ENTRIES},
+    }
+}
+if TESTING and not os.getenv("CACHE_BACKEND"):
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "OPTIONS": {"MAX_ENTRIES": CACHE_MAX_ENTRIES},
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -145,10 +175,76 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     )
 }
 
+# Authenticated users are cached per process for this many seconds (bounded LRU, invalidated
+# across processes when the user changes) so requests skip the auth_user lookup
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', '60'))
+AUTH_USER_CACHE_SIZE = int(os.getenv('AUTH_USER_CACHE_SIZE', '1024'))
+
+# Stock price provider: dotted path of a catalog.providers.base.PriceProvider subclass and the
+# keyword arguments it is built with. Use catalog.providers.fixture.FixtureProvider to run offline.
+STOCK_PRICE_PROVIDER = os.getenv('STOCK_PRICE_PROVIDER', 'catalog.providers.twelvedata.TwelveDataProvider')
+STOCK_PRICE_PROVIDER_OPTIONS = json.loads(os.getenv('STOCK_PRICE_PROVIDER_OPTIONS', '{}'))
+# Providers tried in order when the primary fails, e.g. [{"class": "...", "options": {...}}]
+STOCK_PRICE_FALLBACK_PROVIDERS = json.loads(os.getenv('STOCK_PRICE_FALLBACK_PROVIDERS', '[]'))
+# Circuit breaker / retry settings applied to every provider (delays in seconds)
+STOCK_PROVIDER_RESILIENCE = {
+    'retries': int(os.getenv('STOCK_PROVIDER_RETRIES', '2')),
+    'backoff_base': float(os.getenv('STOCK_PROVIDER_BACKOFF_BASE', '0.5')),
+    'backoff_max': float(os.getenv('STOCK_PROVIDER_BACKOFF_MAX', '5')),
+    'failure_threshold': int(os.getenv('STOCK_PROVIDER_BREAKER_THRESHOLD', '5')),
+    'reset_timeout': float(os.getenv('STOCK_PROVIDER_BREAKER_RESET', '30')),
+    'stored_price_fallback': os.getenv('STOCK_PROVIDER_STORED_PRICE_FALLBACK', 'True') == 'True',
+}
+
+# Stock price provider HTTP client (pooled keep-alive connections, timeouts in seconds)
+STOCK_API_POOL_CONNECTIONS = int(os.getenv('STOCK_API_POOL_CONNECTIONS', '4'))
+STOCK_API_POOL_MAXSIZE = int(os.getenv('STOCK_API_POOL_MAXSIZE', '10'))
+STOCK_API_CONNECT_TIMEOUT = float(os.getenv('STOCK_API_CONNECT_TIMEOUT', '3.05'))
+STOCK_API_READ_TIMEOUT = float(os.getenv('STOCK_API_READ_TIMEOUT', '10'))
+
+# Provider API credit budget shared by all processes (Twelve Data free plan: 8/minute, 800/day)
+# and how long a fetch waits for credits before giving up
+STOCK_API_CREDITS_PER_MINUTE = int(os.getenv('STOCK_API_CREDITS_PER_MINUTE', '8'))
+STOCK_API_CREDITS_PER_DAY = int(os.getenv('STOCK_API_CREDITS_PER_DAY', '800'))
+STOCK_API_CREDIT_WAIT = float(os.getenv('STOCK_API_CREDIT_WAIT', '10'))
+
+# Seconds between runs of the background price refresher (manage.py refresh_prices)
+STOCK_REFRESH_INTERVAL = float(os.getenv('STOCK_REFRESH_INTERVAL', '300'))
+
+# Participant valuations are fully recomputed every this many refreshes (and after the closing
+# refresh) to correct any drift in the incremental updates
+VALUATION_RECOMPUTE_EVERY = int(os.getenv('VALUATION_RECOMPUTE_EVERY', '12'))
+
+# Seconds league UUID -> pk and league membership lookups stay cached (invalidated on changes)
+LEAGUE_RESOLVER_CACHE_TTL = int(os.getenv('LEAGUE_RESOLVER_CACHE_TTL', '60'))
+
+# Seconds the first response to an Idempotency-Key is kept for replays (stored in the
+# IdempotencyKey table; manage.py purge_idempotency_keys deletes expired ones), and how long a
+# request holding a key blocks duplicates before its claim can be taken over (e.g. if the
+# worker died mid-request)
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', '86400'))
+IDEMPOTENCY_LOCK_TTL = int(os.getenv('IDEMPOTENCY_LOCK_TTL', '30'))
+
+# Seconds a stock board snapshot stays cached. The refresher publishes a new snapshot after every
+# refresh, so this only matters if it stops running.
+STOCK_BOARD_CACHE_TTL = int(os.getenv('STOCK_BOARD_CACHE_TTL', str(int(STOCK_REFRESH_INTERVAL * 2))))
+
+# Price refresh concurrency (worker threads, per-ticker timeout and total deadline in seconds)
+STOCK_REFRESH_MAX_WORKERS = int(os.getenv('STOCK_REFRESH_MAX_WORKERS', '4'))
+STOCK_REFRESH_TICKER_TIMEOUT = float(os.getenv('STOCK_REFRESH_TICKER_TIMEOUT', '15'))
+STOCK_REFRESH_DEADLINE = float(os.getenv('STOCK_REFRESH_DEADLINE', '60'))
+
+# Seconds a caller waits for an in-flight refresh before falling back to stored prices
+STOCK_REFRESH_COALESCE_WAIT = float(os.getenv('STOCK_REFRESH_COALESCE_WAIT', '5'))
+# Raw price ticks older than this are rolled up into OHLC bars and deleted (manage.py rollup_prices)
+PRICE_TICK_RETENTION_DAYS = int(os.getenv('PRICE_TICK_RETENTION_DAYS', '7'))
+# How many days of daily closes the first backfill of a ticker downloads (manage.py backfill_closes)
+DAILY_CLOSE_BACKFILL_DAYS = int(os.getenv('DAILY_CLOSE_BACKFILL_DAYS', '365'))
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -191,6 +287,7 @@ CORS_ALLOW_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'idempotency-key',
     'origin',
     'user-agent',
     'x-csrftoken',
@@ -12,57 +12,76 @@ from asyncio import sleep
 from datetime import datetime, timedelta
 from django.utils import timezone
 from catalog.stock_populator import update_stock_prices
+from catalog.single_flight import SingleFlight
+from catalog import trading_calendar
+from catalog.stock_board import publish_board
+from catalog.valuations import recompute_valuations
+from django.conf import settings
+
+# Coalesces concurrent refreshes (threads and worker processes) into a single provider refresh.
+# refresh_flight.stats() reports how many callers were coalesced.
+refresh_flight = SingleFlight('stock_refresh')
+
+
+# Refreshes this process has run since the last full valuation recompute
+_refreshes_since_recompute = 0
+
+
+def _refresh(stock_list, closing=False):
+    """Runs update_stock_prices unless another caller is already refreshing, then publishes
+    the new stock board snapshot to every worker. Every VALUATION_RECOMPUTE_EVERY refreshes,
+    and after the `closing` refresh, valuations are fully recomputed to correct any drift in
+    the incremental updates. Returns True if this caller ran the refresh."""
+    global _refreshes_since_recompute
+
+    ran, _ = refresh_flight.run(update_stock_prices, stock_list)
+    if ran:
+        publish_board()
+        _refreshes_since_recompute += 1
+        if closing or _refreshes_since_recompute >= settings.VALUATION_RECOMPUTE_EVERY:
+            _refreshes_since_recompute = 0
+            recompute_valuations()
+    return ran
 
 
 def update_stocks(force=False):
     """Grabs stocks from database and updates them.
-    By default this function keeps the original behavior of updating only during market windows
-    and at 5-minute intervals. If `force=True` it will always perform an update.
+    Refreshes follow the NYSE trading calendar (catalog.trading_calendar): while the market is
+    open prices are updated at 5-minute intervals, or on every call if `force=True`. Once the
+    market closes one final update captures the closing prices, and the stored prices are then
+    treated as valid until the next open - even for forced calls.
+    
+    Concurrent calls are coalesced: only one caller refreshes while the others wait briefly
+    and then read the stored prices.
     
     Returns True if updated and False if not.
     """
     
     # Grab the stock's last updated time and see if it needs to be changed
     current_datetime = timezone.now()
-    current_time = current_datetime.time()
     stocks = Stock.objects.all() # Grab all stocks from the database
     stock_list = list(stocks)
 
-    # If caller requested a forced update, do it and return
-    if force:
-        update_stock_prices(stock_list)
-        return True
-
-    # Check if market is open (9:30 AM - 4:00 PM EST)
-    market_open = current_time.hour == 9 and current_time.minute >= 30
-    market_hours = current_time.hour >= 10 and current_time.hour < 16
-    market_just_closed = current_time.hour == 16 and current_time.minute <= 5  # 4:00 PM - 4:05 PM
-    
-    if not (market_open or market_hours or market_just_closed):
-        return False  # Market closed, don't update
-    
     # Check if there are any stocks in the database
     if not stock_list:
         return False  # No stocks to update
-        
+
     # Get the most recently updated stock
-    most_recent = stocks.order_by('-last_updated').first()
-    if most_recent is None:
-        return False  # No stocks to update
-    last_update_time = most_recent.last_updated
-    
-    # Calculate how long ago the last update was
-    time_since_update = current_datetime - last_update_time
-    current_interval = (current_time.minute // 5) * 5
-    last_update_interval = (last_update_time.minute // 5) * 5
-     # Special case: Market just closed (4:01 PM), do final update
-    if market_just_closed and last_update_time.hour < 16:
-        update_stock_prices(stock_list)
-        return True
-    
+    last_update_time = max(stock.last_updated for stock in stock_list)
+
+    # Market closed and the closing prices are already stored: nothing changes until the next open
+    if trading_calendar.quotes_are_final(last_update_time, current_datetime):
+        return False
+
+    # Forced update, or the final update after the close
+    if force or not trading_calendar.is_market_open(current_datetime):
+        return _refresh(stock_list, closing=not trading_calendar.is_market_open(current_datetime))
+
     # Check if we're in a new 5-minute interval
-    if time_since_update >= timedelta(minutes=5) or current_time.hour != last_update_time.hour or current_interval != last_update_interval:
-        update_stock_prices(stock_list)
-        return True
+    time_since_update = current_datetime - last_update_time
+    current_interval = int(current_datetime.timestamp() // 300)
+    last_update_interval = int(last_update_time.timestamp() // 300)
+    if time_since_update >= timedelta(minutes=5) or current_interval != last_update_interval:
+        return _refresh(stock_list)
     else:
         return False